@@ -0,0 +1,245 @@
+"""
+Throughput benchmarks for the normalization hot paths.
+
+Feeds the recorded actor datasets in "Data original/", replicated to the requested sizes,
+through each normalizer and reports items/s, peak RSS and traced allocations per item.
+Every case runs in a fresh process so peak RSS is not polluted by earlier cases. The normalizers
+are fed the full recorded items, as the Apify client returns them; --partial-decode feeds the
+items pruned by src.ingest instead.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_normalizers --sizes 10000 100000 --output bench_normalizers.json
+    python -m benchmarks.bench_normalizers --compare bench_normalizers.json
+    python -m benchmarks.bench_normalizers --partial-decode --compare bench_normalizers.json
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+CASES = {
+    "x.extract_tweets": "quacker/twitter-scraper",
+    "facebook.extract_posts": "apify/facebook-posts-scraper",
+    "instagram.process_items": "apify/instagram-scraper",
+    "linkedin.extract_posts": "curious_coder/linkedin-post-search-scraper",
+    "convert_timestamp": None,
+}
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+TRACE_SAMPLE = 10_000
+# Seconds a single case may run before the benchmark gives up on it.
+DEFAULT_TIMEOUT = 3600
+
+
+def _normalizer(case):
+    from src import FacebookPostScraper, InstagramPostScraper, LinkedInPostScraper, ReplayClient, XScraper
+
+    client = ReplayClient()
+    if case == "x.extract_tweets":
+        return XScraper(None, client=client).extract_tweets
+    if case == "facebook.extract_posts":
+        return FacebookPostScraper(None, client=client).extract_posts
+    if case == "instagram.process_items":
+        return InstagramPostScraper(None, client=client).process_items
+    if case == "linkedin.extract_posts":
+        return LinkedInPostScraper(None, "cookies", client=client).extract_posts
+    if case == "convert_timestamp":
+        from main import SocialMediaScrapper
+        from src import normalize_timestamp
+
+        scrapper = SocialMediaScrapper.__new__(SocialMediaScrapper)
+
+        def convert(timestamps):
+            normalize_timestamp.cache_clear()
+            return [scrapper.convert_timestamp(timestamp, platform) for timestamp, platform in timestamps]
+
+        return convert
+    raise ValueError(f"Unknown benchmark case: {case}")
+
+
+def _inputs(case, size, partial_decode):
+    from src import ReplayClient
+
+    client = ReplayClient(partial_decode=partial_decode)
+    if CASES[case] is not None:
+        recording = client.recording(CASES[case])
+        return list(itertools.islice(itertools.cycle(recording), size))
+
+    # Timestamps as they come out of every platform's normalizer, in the recorded proportions.
+    timestamps = []
+    for actor_id, field, platform in [
+        ("quacker/twitter-scraper", "created_at", "x"),
+        ("apify/instagram-scraper", "timestamp", "instagram"),
+        ("apify/facebook-posts-scraper", "time", "facebook"),
+        ("curious_coder/linkedin-post-search-scraper", "postedAtISO", "linkedin"),
+    ]:
+        timestamps.extend((item[field], platform) for item in client.recording(actor_id) if item.get(field))
+    return list(itertools.islice(itertools.cycle(timestamps), size))
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_case(case, size, partial_decode, queue):
+    normalize = _normalizer(case)
+    items = _inputs(case, size, partial_decode)
+    baseline_rss = _peak_rss_bytes()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        outputs = normalize(items)
+        elapsed = time.perf_counter() - start
+        peak_rss = _peak_rss_bytes()
+        output_count = len(outputs)
+        del outputs
+
+        # tracemalloc slows allocation down considerably, so it only runs on a sample.
+        sample = items[:TRACE_SAMPLE]
+        tracemalloc.start()
+        before_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        sample_outputs = normalize(sample)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        after_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        tracemalloc.stop()
+        del sample_outputs
+
+    queue.put({
+        "case": case,
+        "items": size,
+        "partial_decode": partial_decode,
+        "outputs": output_count,
+        "seconds": elapsed,
+        "items_per_second": size / elapsed if elapsed else None,
+        "peak_rss_bytes": peak_rss,
+        "peak_rss_delta_bytes": peak_rss - baseline_rss,
+        "traced_peak_bytes_per_item": traced_peak / len(sample),
+        "retained_blocks_per_item": (after_blocks - before_blocks) / len(sample),
+    })
+
+
+def _wait_for_result(process, queue, timeout):
+    """
+    Waits for the result of a case process, raising if it exits without one or runs too long.
+
+    :param process: The case process.
+    :param queue: The queue the process puts its result on.
+    :param timeout: The seconds the case may run.
+    :return: The result dictionary.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return queue.get(timeout=1.0)
+        except queue_module.Empty:
+            pass
+        if not process.is_alive():
+            raise RuntimeError(f"The benchmark process exited with code {process.exitcode} before reporting.")
+        if time.monotonic() > deadline:
+            process.terminate()
+            raise TimeoutError(f"The benchmark process did not finish within {timeout} seconds.")
+
+
+def run_benchmarks(cases, sizes, partial_decode=False, timeout=DEFAULT_TIMEOUT):
+    """
+    Runs every (case, size) pair in its own process.
+
+    :param cases: The benchmark case names to run.
+    :param sizes: The numbers of items to feed each normalizer.
+    :param partial_decode: Whether to feed the items pruned by src.ingest instead of the full recorded items.
+    :param timeout: The seconds a single case may run.
+    :return: A list of result dictionaries.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases:
+        for size in sizes:
+            queue = context.Queue()
+            process = context.Process(target=_run_case, args=(case, size, partial_decode, queue))
+            process.start()
+            try:
+                result = _wait_for_result(process, queue, timeout)
+            finally:
+                process.join()
+            results.append(result)
+            print(
+                f"{case:<26} {size:>9} items  {result['items_per_second']:>12,.0f} items/s  "
+                f"peak RSS {result['peak_rss_bytes'] / 2**20:>8.1f} MiB  "
+                f"{result['traced_peak_bytes_per_item']:>8.1f} B/item  "
+                f"{result['retained_blocks_per_item']:>6.2f} blocks/item"
+            )
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous_path, results):
+    """
+    Prints the throughput change of every case against a previously saved results file.
+
+    :param previous_path: The JSON file written by an earlier run.
+    :param results: The current results.
+    """
+    with open(previous_path, "r") as f:
+        previous = {(r["case"], r["items"], r.get("partial_decode", True)): r for r in json.load(f)["results"]}
+    for result in results:
+        # Results saved before the partial_decode key were measured on pruned items.
+        before = previous.get((result["case"], result["items"], result["partial_decode"]))
+        if not before or not before["items_per_second"]:
+            continue
+        change = result["items_per_second"] / before["items_per_second"] - 1
+        print(f"{result['case']:<26} {result['items']:>9} items  {change:+.1%} items/s vs {previous_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--output", default="bench_normalizers.json", help="Where to save the JSON results.")
+    parser.add_argument("--compare", help="A previous results file to compare throughput against.")
+    parser.add_argument(
+        "--partial-decode", action="store_true", help="Feed the items pruned by src.ingest instead of the full ones."
+    )
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds a single case may run.")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.cases, args.sizes, partial_decode=args.partial_decode, timeout=args.timeout)
+    if args.compare:
+        compare(args.compare, results)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
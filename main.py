@@ -1,27 +1,53 @@
 import asyncio
 import os
-import re
-from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor
-from dotenv import load_dotenv
 from src import (
-    FacebookPostScraper,
-    InstagramPostScraper,
-    LinkedInPostScraper,
-    XScraper,
+    AsyncFacebookPostScraper,
+    AsyncInstagramPostScraper,
+    AsyncLinkedInPostScraper,
+    AsyncXScraper,
+    IMAGE_MEDIA_TYPES,
     get_date_7_days_before_today,
-    GeminiRunnerClass,
+    create_client,
+    load_config,
+    normalize_timestamp,
+    normalize_post_timestamps,
 )
 
-load_dotenv()
+load_config()
+
+
+class ScrapeError(Exception):
+    """Raised when every platform requested for a profile failed to scrape."""
+
 
 class SocialMediaScrapper:
-    def __init__(self, api_key, cookies=None) -> None:
-        self.fb = FacebookPostScraper(api_key)
-        self.ins = InstagramPostScraper(api_key)
-        self.x = XScraper(api_key)
+    def __init__(
+        self,
+        api_key,
+        cookies=None,
+        image_request_strategy="window",
+        image_window_size=8,
+        description_cache=None,
+        state_store=None,
+        client=None,
+        platform_limits=None,
+        media_types=None,
+        sink=None,
+        describe_videos=False,
+        keyframe_extractor=None,
+        result_cache=None,
+    ) -> None:
+        # The async scrapers start, poll and page actor runs on the event loop, so any number of
+        # profiles can be in flight without tying up threads. `client` must be an async backend.
+        # `media_types` (see src.media) keeps unwanted media from ever being built, e.g.
+        # IMAGE_MEDIA_TYPES when only the image stories are needed. An optional `result_cache`
+        # (ActorResultCache) is shared by the four scrapers, so repeated profiles within its TTL
+        # skip the actor run and concurrent requests for the same input share one run.
+        self.fb = AsyncFacebookPostScraper(api_key, client=client, media_types=media_types, result_cache=result_cache)
+        self.ins = AsyncInstagramPostScraper(api_key, client=client, media_types=media_types, result_cache=result_cache)
+        self.x = AsyncXScraper(api_key, client=client, media_types=media_types, result_cache=result_cache)
         self.cookies = cookies
-        self.li = LinkedInPostScraper(api_key, cookies) if cookies else None
+        self.li = AsyncLinkedInPostScraper(api_key, cookies, client=client, media_types=media_types, result_cache=result_cache) if cookies else None
         self.prompt = (
             "Craft a compelling narrative around the individual's personality, interests, and "
             "experiences based on the images shared on various social media platforms. Uncover layers "
@@ -29,33 +55,36 @@ class SocialMediaScrapper:
             "presented. Remember to intrigue and engage with concise, impactful observations in a Json "
             "format."
         )
-        self.gem = GeminiRunnerClass()
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.description_cache = description_cache
+        self._gem = None
+        # "window" (the default) lets each platform's images be downloaded and described while
+        # the other actors still run; "all" packs every image into one request, so the pipeline
+        # holds them until scraping ends.
+        self.image_request_strategy = image_request_strategy
+        self.image_window_size = image_window_size
+        self.state_store = state_store
+        # An optional PartitionedSink that get_stories_from_social_media streams posts and descriptions to.
+        self.sink = sink
+        # Whether video posts are uploaded and described too (media_types must keep VIDEO).
+        self.describe_videos = describe_videos
+        # An optional KeyframeExtractor: video posts are then described from a few range-read
+        # keyframes through the image path instead of being uploaded whole.
+        self.keyframe_extractor = keyframe_extractor
+        # Maximum number of concurrent actor calls per platform, e.g. {"x": 2, "linkedin": 1}.
+        self.platform_semaphores = {
+            platform: asyncio.Semaphore(limit) for platform, limit in (platform_limits or {}).items()
+        }
 
-    def convert_timestamp(self, timestamp_str):
-        timestamp_processed = timestamp_str.strip()
-        if timestamp_processed.endswith('Z'):
-            timestamp_processed = timestamp_processed[:-1] + '+0000'
-        else:
-            timestamp_processed = re.sub(
-                r'([+-]\d{2})(\d{2})$',
-                r'\1:\2',
-                timestamp_processed
-            )
-        possible_formats = [
-            '%Y-%m-%dT%H:%M:%S.%f%z',
-            '%Y-%m-%dT%H:%M:%S%z',
-            '%a %b %d %H:%M:%S %z %Y',
-        ]
-        for fmt in possible_formats:
-            try:
-                dt = datetime.strptime(timestamp_processed, fmt)
-                dt_in_utc = dt.astimezone(timezone.utc)
-                formatted_ts = dt_in_utc.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-                return formatted_ts
-            except ValueError:
-                continue
-        raise ValueError('Timestamp format not recognized')
+    @property
+    def gem(self):
+        # Built on first use, so scrape-only callers never load the Gemini stack.
+        if self._gem is None:
+            from src import GeminiRunnerClass
+            self._gem = GeminiRunnerClass(cache=self.description_cache)
+        return self._gem
+
+    def convert_timestamp(self, timestamp_str, platform=None):
+        return normalize_timestamp(timestamp_str, platform)
 
     async def scrape_all_social_media(
         self,
@@ -64,78 +93,228 @@ class SocialMediaScrapper:
         facebook_username=None,
         linkedin_username=None,
         max_n=10,
-        newer_than=get_date_7_days_before_today(),
+        newer_than=None,
+        scraped=None,
     ):
-        loop = asyncio.get_running_loop()
-        tasks = []
+        """
+        Scrapes every given handle concurrently and returns all of their posts.
+
+        :param scraped: An optional list that receives the (platform, handle, posts) tuples; the
+                        caller then advances the high-water marks with commit_scraped once the
+                        posts are safely stored. Without it they are committed before returning.
+        :return: A list of MediaPost records.
+        """
+        ans = []
+        batches = scraped if scraped is not None else []
+        async for platform, handle, posts in self.scrape_all_social_media_stream(
+            x_username, instgram_username, facebook_username, linkedin_username, max_n, newer_than
+        ):
+            batches.append((platform, handle, posts))
+            ans.extend(posts)
+        if scraped is None:
+            for platform, handle, posts in batches:
+                self.commit_scraped(platform, handle, posts)
+        return ans
+
+    async def scrape_all_social_media_stream(
+        self,
+        x_username=None,
+        instgram_username=None,
+        facebook_username=None,
+        linkedin_username=None,
+        max_n=10,
+        newer_than=None,
+    ):
+        """
+        Scrapes every given handle concurrently and yields each platform's posts as soon as
+        that platform finishes, instead of waiting for the slowest one.
+
+        A platform whose scrape fails is skipped; if every requested platform fails, ScrapeError
+        is raised once they have all finished, so that callers such as the worker retry the job.
+
+        With a state store, already-seen posts are dropped but the high-water marks are left
+        alone: the consumer calls commit_scraped once it has finished with the posts. The X and
+        LinkedIn actors take no date input, so newer_than does not narrow their runs and they
+        rely on the seen-ID filter alone.
+
+        :param newer_than: The 'YYYY-MM-DD' start of the scrape window; defaults to 7 days before the call.
+        :return: An async generator of (platform, handle, posts) tuples.
+        """
+        if newer_than is None:
+            newer_than = get_date_7_days_before_today()
+        scrapes = []
 
         if x_username:
-            tasks.append(
-                loop.run_in_executor(
-                    self.executor,
-                    self.x.scrape_tweets,
-                    x_username,
-                    newer_than,
-                    max_n,
-                )
-            )
+            scrapes.append(("x", x_username, self.x.scrape_tweets))
         if instgram_username:
-            tasks.append(
-                loop.run_in_executor(
-                    self.executor,
-                    self.ins.scrape_profile,
-                    instgram_username,
-                    newer_than,
-                    max_n,
-                )
-            )
+            scrapes.append(("instagram", instgram_username, self.ins.scrape_profile))
         if facebook_username:
-            tasks.append(
-                loop.run_in_executor(
-                    self.executor,
-                    self.fb.scrape_page_posts,
-                    facebook_username,
-                    newer_than,
-                    max_n,
-                )
-            )
+            scrapes.append(("facebook", facebook_username, self.fb.scrape_page_posts))
         if linkedin_username and self.li:
-            tasks.append(
-                loop.run_in_executor(
-                    self.executor,
-                    self.li.scrape_profile_posts,
-                    linkedin_username,
-                    newer_than,
-                    max_n,
-                )
-            )
+            scrapes.append(("linkedin", linkedin_username, self.li.scrape_profile_posts))
+
+        async def run(platform, handle, scrape):
+            try:
+                posts = await self._limited(platform, scrape(handle, self._newer_than(platform, handle, newer_than), max_n))
+            except Exception as e:
+                return platform, handle, e
+            return platform, handle, posts
+
+        failures = []
+        tasks = [asyncio.ensure_future(run(platform, handle, scrape)) for platform, handle, scrape in scrapes]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                platform, handle, result = await next_done
+                if result is None or isinstance(result, Exception):
+                    # The scrapers return None when the actor run failed.
+                    error = result if result is not None else "the actor run failed"
+                    print(f"Scraping {platform} handle {handle} failed: {error}")
+                    failures.append(f"{platform} ({handle}): {error}")
+                    continue
+                posts = normalize_post_timestamps(result)
+                yield platform, handle, self._keep_new_posts(platform, handle, posts)
+        finally:
+            for task in tasks:
+                task.cancel()
+        if scrapes and len(failures) == len(scrapes):
+            raise ScrapeError(f"Every platform failed: {'; '.join(failures)}")
+
+    async def _limited(self, platform, coroutine):
+        """Await a platform scrape under that platform's concurrency limit, if one is configured."""
+        semaphore = self.platform_semaphores.get(platform)
+        if semaphore is None:
+            return await coroutine
+        async with semaphore:
+            return await coroutine
+
+    def _newer_than(self, platform, handle, newer_than):
+        """Narrow the requested window to what is newer than the handle's high-water mark."""
+        if self.state_store is None:
+            return newer_than
+        return self.state_store.newer_than(platform, handle, newer_than)
+
+    def _keep_new_posts(self, platform, handle, posts):
+        """Drop already-seen posts (the high-water mark is only advanced by commit_scraped)."""
+        if self.state_store is None:
+            return posts
+        return self.state_store.filter_new(platform, handle, posts)
+
+    def commit_scraped(self, platform, handle, posts):
+        """
+        Advances a handle's high-water mark past posts that were fully processed, so later runs
+        skip them. Call it only after the posts were described or stored: a failure before that
+        leaves them to be scraped again.
+
+        :param platform: The social media platform.
+        :param handle: The handle on that platform.
+        :param posts: The handle's posts, as yielded by scrape_all_social_media_stream.
+        """
+        if self.state_store is not None:
+            self.state_store.update(platform, handle, posts)
+
+    async def scrape_all_social_media_batch(
+        self,
+        handles_list,
+        max_n=10,
+        newer_than=None,
+        chunk_size=50,
+        scraped=None,
+    ):
+        """
+        Scrapes many users at once, running one batched actor job per platform (split into
+        chunks of `chunk_size` handles) instead of one actor run per handle.
+
+        :param handles_list: A list of handle dicts, as accepted by `scrape_all_social_media`.
+        :param scraped: An optional list that receives the (platform, handle, posts) tuples to
+                        commit with commit_scraped; without it they are committed before returning.
+        :return: A list of post lists, one per entry of `handles_list`, in the same order.
+        """
+        if newer_than is None:
+            newer_than = get_date_7_days_before_today()
+        platforms = {
+            "x_username": ("x", self.x.scrape_tweets_batch),
+            "instgram_username": ("instagram", self.ins.scrape_profiles_batch),
+            "facebook_username": ("facebook", self.fb.scrape_pages_batch),
+            "linkedin_username": ("linkedin", self.li.scrape_profiles_posts_batch if self.li else None),
+        }
+
+        keys = []
+        tasks = []
+        for key, (platform, scrape_batch) in platforms.items():
+            handles = [handles_dict[key] for handles_dict in handles_list if handles_dict.get(key)]
+            if not handles or scrape_batch is None:
+                continue
+            # A shared run can only take one window, so use the oldest one needed by any handle
+            # and let the seen-ID filter drop what the newer handles already have.
+            platform_newer_than = min(self._newer_than(platform, handle, newer_than) for handle in handles)
+            keys.append(key)
+            tasks.append(self._limited(platform, scrape_batch(handles, platform_newer_than, max_n, chunk_size)))
 
         results = await asyncio.gather(*tasks, return_exceptions=True)
-        ans = []
-        for result in results:
+        per_platform = {}
+        batches = scraped if scraped is not None else []
+        for key, result in zip(keys, results):
             if isinstance(result, Exception):
                 print(f"An exception occurred: {result}")
-            else:
-                ans.extend(result or [])
-        for post in ans:
-            post['timestamp'] = self.convert_timestamp(post['timestamp'])
-        return ans
+                continue
+            platform = platforms[key][0]
+            per_platform[key] = {}
+            for handle, posts in result.items():
+                posts = normalize_post_timestamps(posts or [])
+                per_platform[key][handle] = self._keep_new_posts(platform, handle, posts)
+                batches.append((platform, handle, per_platform[key][handle]))
+
+        outputs = []
+        for handles_dict in handles_list:
+            ans = []
+            for key, result in per_platform.items():
+                handle = handles_dict.get(key)
+                if handle:
+                    ans.extend(result.get(handle) or [])
+            outputs.append(ans)
+        if scraped is None:
+            for platform, handle, posts in batches:
+                self.commit_scraped(platform, handle, posts)
+        return outputs
+
+    async def get_stories_from_social_media(self, handles_dict, scraped=None):
+        # Scraping, downloading and describing overlap: each platform's images move on to the
+        # download and Gemini stages as soon as that platform's actor finishes. The high-water
+        # marks advance only once the pipeline succeeded, or are left to the caller when it
+        # passes a `scraped` list (see scrape_all_social_media).
+        from src import StoryPipeline
+        pipeline = StoryPipeline(
+            self.gem,
+            strategy=self.image_request_strategy,
+            window_size=self.image_window_size,
+            sink=self.sink,
+            describe_videos=self.describe_videos,
+            keyframe_extractor=self.keyframe_extractor,
+        )
+        batches = scraped if scraped is not None else []
+
+        async def stream():
+            async for platform, handle, posts in self.scrape_all_social_media_stream(**handles_dict):
+                batches.append((platform, handle, posts))
+                yield platform, handle, posts
 
-    async def get_stories_from_social_media(self, handles_dict):
-        data = await self.scrape_all_social_media(**handles_dict)
-        to_process = [i for i in data if i['type'].lower() == "photo"]
-        if to_process:
-            output = await self.gem.get_gemini_response_image(self.prompt, to_process)
+        output = await pipeline.run(stream(), self.prompt)
+        if scraped is None:
+            for platform, handle, posts in batches:
+                self.commit_scraped(platform, handle, posts)
+        if output:
             print(output)
         else:
             print("No Images to process")
-            output = []
+        print(f"Pipeline stage latency: {pipeline.stats()}")
         return output
 
 if __name__ == "__main__":
     api_key = os.getenv("APIFY_API_KEY")
     cookies = ""
-    sm = SocialMediaScrapper(api_key)
+    # Set SCRAPER_BACKEND=replay to run against the recorded datasets in "Data original/"
+    client = create_client(os.getenv("SCRAPER_BACKEND", "apify"), api_key, asynchronous=True)
+    sm = SocialMediaScrapper(api_key, client=client, media_types=IMAGE_MEDIA_TYPES)
     handles = {
         "instgram_username": "steveyeun",
         # "facebook_username": "elon.musk.436479",
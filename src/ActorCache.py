@@ -0,0 +1,294 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .ingest import ACTOR_FIELDS, loads, project
+from .tracing import increment
+
+# Handed to the followers of a cancelled leader so that they elect a new one.
+_RETRY = object()
+
+
+def canonical_run_input(run_input):
+    """
+    Canonicalizes an Actor input so that equivalent inputs share a cache key: object keys are
+    sorted and lists are treated as sets (every list in these actors' inputs is a list of
+    profiles, whose order does not change the dataset).
+
+    Parameters:
+    - run_input (dict): The Actor input.
+
+    Returns:
+    - str: A compact JSON encoding.
+    """
+    def canonical(value):
+        if isinstance(value, dict):
+            return {key: canonical(value[key]) for key in sorted(value)}
+        if isinstance(value, (list, tuple)):
+            elements = [canonical(element) for element in value]
+            return sorted(elements, key=lambda element: json.dumps(element, sort_keys=True))
+        return value
+
+    return json.dumps(canonical(run_input), sort_keys=True, separators=(",", ":"), default=str)
+
+
+class MemoryResultStore:
+    def __init__(self, max_entries=256):
+        """
+        Initializes an in-process LRU store of actor results.
+
+        :param max_entries: The number of results kept; the least recently used are evicted.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        :param key: The cache key.
+        :return: (items, expires_at), or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, items, expires_at):
+        with self._lock:
+            self._entries[key] = (items, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteResultStore:
+    def __init__(self, path="actor_results.sqlite3", max_bytes=256 * 1024 * 1024):
+        """
+        Initializes an on-disk store of actor results, shared by every process using the same file.
+
+        :param path: The SQLite file backing the store.
+        :param max_bytes: The total size of stored results above which the least recently used
+                          entries are evicted.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS actor_results (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_actor_results_accessed ON actor_results (accessed_at)")
+        self.conn.commit()
+
+    def get(self, key):
+        """
+        :param key: The cache key.
+        :return: (items, expires_at), or None on a miss.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT value, expires_at FROM actor_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE actor_results SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        return loads(row[0]), row[1]
+
+    def set(self, key, items, expires_at):
+        value = json.dumps(items, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO actor_results (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), expires_at, time.time()),
+            )
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM actor_results").fetchone()[0]
+            if total > self.max_bytes:
+                # Evict the least recently used entries until the store fits again.
+                rows = self.conn.execute("SELECT key, size FROM actor_results ORDER BY accessed_at").fetchall()
+                for old_key, size in rows:
+                    if total <= self.max_bytes or old_key == key:
+                        break
+                    self.conn.execute("DELETE FROM actor_results WHERE key = ?", (old_key,))
+                    total -= size
+            self.conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self.conn.execute("DELETE FROM actor_results WHERE key = ?", (key,))
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class ActorResultCache:
+    def __init__(self, store=None, ttl_seconds=600):
+        """
+        Initializes a cache of actor results, keyed by actor ID and canonicalized run_input, that
+        sits under the scrapers: a fresh entry serves the run's dataset items without starting the
+        actor, and concurrent identical requests share a single run (single-flight).
+
+        Only the fields the normalizers read are stored (see ingest.ACTOR_FIELDS), and only for
+        runs whose status is SUCCEEDED and whose dataset was paged to the end (get_items must
+        raise rather than stop early); the normalizers run on the cached items as on fresh ones.
+
+        :param store: Where results are kept: a MemoryResultStore (the default) or a
+                      SQLiteResultStore to share them across processes and restarts.
+        :param ttl_seconds: How long a result stays fresh (None disables expiry).
+        """
+        self.store = store if store is not None else MemoryResultStore()
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._async_in_flight = {}
+
+    def make_key(self, actor_id, run_input):
+        """
+        Builds the cache key of an actor run.
+
+        :param actor_id: The Actor ID.
+        :param run_input: The Actor input dictionary.
+        :return: A hex SHA-256 digest.
+        """
+        payload = f"{actor_id}\n{canonical_run_input(run_input)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key, actor_id):
+        entry = self.store.get(key)
+        if entry is not None:
+            items, expires_at = entry
+            if expires_at is None or expires_at > time.time():
+                self.hits += 1
+                increment("actor_cache", result="hit", actor=actor_id)
+                return items
+            self.store.delete(key)
+        return None
+
+    def _store(self, key, actor_id, run, items):
+        """Projects the items to the fields the normalizers read and stores them if the run SUCCEEDED."""
+        fields = ACTOR_FIELDS.get(actor_id)
+        if fields is not None:
+            items = [project(item, fields) for item in items]
+        if run.get("status") == "SUCCEEDED":
+            expires_at = time.time() + self.ttl_seconds if self.ttl_seconds is not None else None
+            self.store.set(key, items, expires_at)
+        return items
+
+    def fetch(self, actor_id, run_input, run_actor, get_items):
+        """
+        Returns the dataset items of an actor run, from the cache or from a new run.
+
+        :param actor_id: The Actor ID.
+        :param run_input: The Actor input dictionary.
+        :param run_actor: The scraper's _run_actor (returns the run, or None on failure).
+        :param get_items: Pages the run's dataset, raising if it cannot be paged to the end
+                          (the error propagates and nothing is cached).
+        :return: A list of dataset items, or None if the run failed (failures are not cached).
+        """
+        key = self.make_key(actor_id, run_input)
+        items = self._lookup(key, actor_id)
+        if items is not None:
+            return items
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = concurrent.futures.Future()
+        if not leader:
+            self.shared += 1
+            increment("actor_cache", result="shared", actor=actor_id)
+            return future.result()
+
+        try:
+            # Another leader may have stored the result between the lookup and the election.
+            items = self._lookup(key, actor_id)
+            if items is None:
+                self.misses += 1
+                increment("actor_cache", result="miss", actor=actor_id)
+                run = run_actor(run_input)
+                items = self._store(key, actor_id, run, list(get_items(run))) if run is not None else None
+            future.set_result(items)
+            return items
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    async def fetch_async(self, actor_id, run_input, run_actor, get_items):
+        """
+        Async counterpart of fetch for the Async* scrapers: run_actor is a coroutine function
+        and get_items an async generator function.
+
+        :return: A list of dataset items, or None if the run failed.
+        """
+        key = self.make_key(actor_id, run_input)
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        while True:
+            items = self._lookup(key, actor_id)
+            if items is not None:
+                return items
+            future = self._async_in_flight.get(flight_key)
+            if future is None:
+                break
+            # Shielded: a follower being cancelled must not cancel the leader's run.
+            items = await asyncio.shield(future)
+            if items is not _RETRY:
+                self.shared += 1
+                increment("actor_cache", result="shared", actor=actor_id)
+                return items
+
+        future = self._async_in_flight[flight_key] = loop.create_future()
+        try:
+            self.misses += 1
+            increment("actor_cache", result="miss", actor=actor_id)
+            run = await run_actor(run_input)
+            items = None
+            if run is not None:
+                items = self._store(key, actor_id, run, [item async for item in get_items(run)])
+            future.set_result(items)
+            return items
+        except asyncio.CancelledError:
+            # Only the leader was cancelled: its followers go round again and one of them leads.
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no follower is waiting on it.
+            future.exception()
+            raise
+        finally:
+            del self._async_in_flight[flight_key]
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        :return: A dictionary with the hits, misses (actor runs started) and requests that
+                 shared another request's run.
+        """
+        return {"hits": self.hits, "misses": self.misses, "shared": self.shared}
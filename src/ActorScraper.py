@@ -0,0 +1,303 @@
+import asyncio
+from .RateLimiter import get_limiter
+from .tracing import atraced_items, span, traced_items
+from .utils import aiterate, chunked, handle_resolver, iter_items_by_handle
+
+DEFAULT_CHUNK_SIZE = 50
+
+
+class ActorScraper:
+    # The Apify actor the scraper runs; set by each platform scraper.
+    ACTOR_ID = None
+
+    def __init__(self, api_token, client=None, media_types=None, result_cache=None):
+        """
+        Initializes a scraper that runs ACTOR_ID on Apify and normalizes its dataset items.
+
+        Platform scrapers subclass it and provide the actor input (_run_input), the field that
+        tells which requested handle an item belongs to (_item_url) and the item normalizer
+        (_posts_from_item); running the actor, paging its dataset, the result cache and the
+        batching of handles into runs are shared.
+
+        :param api_token: Your Apify API token.
+        :param client: An optional backend exposing the ApifyClient interface (e.g. a ReplayClient)
+                       to run actors on instead of the Apify platform.
+        :param media_types: The shared media types (see src.media) to extract, or None for all of them.
+        :param result_cache: An optional ActorResultCache that serves repeated runs of the same input.
+        """
+        if client is None and not api_token:
+            raise ValueError("API token must be provided.")
+        if client is None:
+            # Imported on first use: replay-backed runs never load the Apify SDK.
+            from apify_client import ApifyClient
+            client = ApifyClient(api_token)
+        self.client = client
+        self.media_types = media_types
+        self.result_cache = result_cache
+
+    def _validate_handle(self, handle):
+        """
+        Raises ValueError for a handle the platform cannot scrape.
+
+        :param handle: A requested handle.
+        """
+
+    def _run_input(self, handles, newer_than, max_n):
+        """
+        Prepares the Actor input for the given (validated) handles.
+
+        :param handles: The handles to scrape in a single run.
+        :param newer_than: The 'YYYY-MM-DD' start of the scrape window, if the actor takes one.
+        :param max_n: The maximum number of posts to retrieve per handle.
+        :return: The Actor input dictionary.
+        """
+        raise NotImplementedError
+
+    def _item_url(self, item):
+        """
+        :param item: A single item from the dataset.
+        :return: The input/profile URL the item was scraped from.
+        """
+        raise NotImplementedError
+
+    def _posts_from_item(self, item):
+        """
+        Normalizes a single dataset item.
+
+        :param item: A single item from the dataset.
+        :return: A list of MediaPost records.
+        """
+        raise NotImplementedError
+
+    def _scrape_stream(self, handle, newer_than, max_n):
+        """
+        Scrapes one handle, yielding each normalized post as soon as its dataset item has been fetched.
+
+        :return: A generator of MediaPost records.
+        """
+        self._validate_handle(handle)
+        items = self._items(self._run_input([handle], newer_than, max_n))
+        if items is None:
+            return
+        for item in items:
+            yield from self._posts_from_item(item)
+
+    def _scrape_batch(self, handles, newer_than, max_n, chunk_size):
+        """
+        Scrapes many handles, packing them into as few actor runs as the chunk size allows and
+        splitting the dataset items back out per handle.
+
+        :return: A dict mapping each handle to its list of posts (None if its run failed).
+        """
+        handles = list(dict.fromkeys(handles))
+        for handle in handles:
+            self._validate_handle(handle)
+
+        results = {}
+        for chunk in chunked(handles, chunk_size):
+            items = self._items(self._run_input(chunk, newer_than, max_n))
+            if items is None:
+                results.update({handle: None for handle in chunk})
+                continue
+
+            results.update({handle: [] for handle in chunk})
+            for handle, item in iter_items_by_handle(items, chunk, self._item_url):
+                results[handle].extend(self._posts_from_item(item))
+        return results
+
+    def _items(self, run_input):
+        """
+        Runs the Actor and returns its dataset items, served from the result cache when one is
+        configured and holds a fresh result for the same input.
+
+        :param run_input: The Actor input dictionary.
+        :return: An iterable of dataset items, or None if the run failed.
+        """
+        if self.result_cache is not None:
+            try:
+                return self.result_cache.fetch(self.ACTOR_ID, run_input, self._run_actor, self._dataset_items)
+            except Exception as e:
+                # A dataset that could not be paged to the end is neither cached nor served.
+                print(f"An error occurred while fetching items from the dataset: {e}")
+                return None
+        run = self._run_actor(run_input)
+        return self.get_items(run) if run is not None else None
+
+    def _run_actor(self, run_input):
+        """
+        Runs the Actor, within the actor's shared rate limit, and waits for it to finish.
+
+        :param run_input: The Actor input dictionary.
+        :return: The Actor run object, or None if the run failed.
+        """
+        try:
+            with span("actor.run", actor=self.ACTOR_ID) as actor_span:
+                with get_limiter(self.ACTOR_ID):
+                    run = self.client.actor(self.ACTOR_ID).call(run_input=run_input)
+                actor_span.set(status=run.get("status") if run else None)
+                return run
+        except Exception as e:
+            print(f"An error occurred while running the actor: {e}")
+            return None
+
+    def get_items(self, run):
+        """
+        Retrieves items from the dataset associated with the Actor run, one at a time. A paging
+        error is printed and ends the items early.
+
+        :param run: The Actor run object.
+        :return: A generator of items retrieved from the dataset.
+        """
+        try:
+            yield from self._dataset_items(run)
+        except Exception as e:
+            print(f"An error occurred while fetching items from the dataset: {e}")
+
+    def _dataset_items(self, run):
+        """
+        Retrieves items from the dataset associated with the Actor run, raising if the dataset
+        cannot be paged to the end, so that a truncated dataset is never cached as complete.
+
+        :param run: The Actor run object.
+        :return: A generator of items retrieved from the dataset.
+        """
+        dataset_id = run.get("defaultDatasetId")
+        if not dataset_id:
+            raise ValueError("No dataset ID found in the run object.")
+        dataset_client = self.client.dataset(dataset_id)
+        yield from traced_items(dataset_client.iterate_items(), actor=self.ACTOR_ID)
+
+
+class AsyncActorScraper:
+    def __init__(self, api_token, *args, client=None, **kwargs):
+        """
+        Mixin, listed before a platform scraper, that runs its actor on the async Apify client
+        so that starting, polling and paging never block a thread.
+
+        :param api_token: Your Apify API token.
+        :param client: An optional async backend exposing the ApifyClientAsync interface
+                       (e.g. an AsyncReplayClient).
+        The other arguments are those of the platform scraper.
+        """
+        if client is None and api_token:
+            from apify_client import ApifyClientAsync
+            client = ApifyClientAsync(api_token)
+        super().__init__(api_token, *args, client=client, **kwargs)
+
+    async def _scrape_stream(self, handle, newer_than, max_n):
+        """
+        Scrapes one handle, yielding each post as soon as its dataset item has been fetched.
+
+        :return: An async generator of MediaPost records.
+        """
+        self._validate_handle(handle)
+        items = await self._items(self._run_input([handle], newer_than, max_n))
+        if items is None:
+            return
+        async for item in items:
+            for post in self._posts_from_item(item):
+                yield post
+
+    async def _scrape_batch(self, handles, newer_than, max_n, chunk_size):
+        """
+        Scrapes many handles, packing them into as few concurrent actor runs as the chunk size
+        allows and splitting the dataset items back out per handle.
+
+        :return: A dict mapping each handle to its list of posts (None if its run failed).
+        """
+        handles = list(dict.fromkeys(handles))
+        for handle in handles:
+            self._validate_handle(handle)
+
+        chunk_results = await asyncio.gather(
+            *(self._scrape_chunk(chunk, newer_than, max_n) for chunk in chunked(handles, chunk_size))
+        )
+        results = {}
+        for chunk_result in chunk_results:
+            results.update(chunk_result)
+        return results
+
+    async def _scrape_chunk(self, chunk, newer_than, max_n):
+        """
+        Runs the actor for one chunk of handles and normalizes its items as they are paged in.
+
+        :param chunk: The handles packed into this run.
+        :return: A dict mapping each handle of the chunk to its list of posts (None if the run failed).
+        """
+        items = await self._items(self._run_input(chunk, newer_than, max_n))
+        if items is None:
+            return {key: None for key in chunk}
+
+        results = {key: [] for key in chunk}
+        resolve = handle_resolver(chunk, self._item_url)
+        async for item in items:
+            key = resolve(item)
+            if key is not None:
+                results[key].extend(self._posts_from_item(item))
+        return results
+
+    async def _items(self, run_input):
+        """
+        Runs the Actor and returns its dataset items, served from the result cache when one is
+        configured and holds a fresh result for the same input.
+
+        :param run_input: The Actor input dictionary.
+        :return: An async iterable of dataset items, or None if the run failed.
+        """
+        if self.result_cache is not None:
+            try:
+                items = await self.result_cache.fetch_async(
+                    self.ACTOR_ID, run_input, self._run_actor, self._dataset_items
+                )
+            except Exception as e:
+                # A dataset that could not be paged to the end is neither cached nor served.
+                print(f"An error occurred while fetching items from the dataset: {e}")
+                return None
+            return aiterate(items) if items is not None else None
+        run = await self._run_actor(run_input)
+        return self.get_items(run) if run is not None else None
+
+    async def _run_actor(self, run_input):
+        """
+        Starts the Actor, within the actor's shared rate limit, and polls it until it finishes.
+
+        :param run_input: The Actor input dictionary.
+        :return: The Actor run object, or None if the run failed.
+        """
+        try:
+            with span("actor.run", actor=self.ACTOR_ID) as actor_span:
+                async with get_limiter(self.ACTOR_ID):
+                    run = await self.client.actor(self.ACTOR_ID).call(run_input=run_input)
+                actor_span.set(status=run.get("status") if run else None)
+                return run
+        except Exception as e:
+            print(f"An error occurred while running the actor: {e}")
+            return None
+
+    async def get_items(self, run):
+        """
+        Pages through the dataset associated with the Actor run. A paging error is printed and
+        ends the items early.
+
+        :param run: The Actor run object.
+        :return: An async generator of items retrieved from the dataset.
+        """
+        try:
+            async for item in self._dataset_items(run):
+                yield item
+        except Exception as e:
+            print(f"An error occurred while fetching items from the dataset: {e}")
+
+    async def _dataset_items(self, run):
+        """
+        Pages through the dataset associated with the Actor run, raising if the dataset cannot
+        be paged to the end, so that a truncated dataset is never cached as complete.
+
+        :param run: The Actor run object.
+        :return: An async generator of items retrieved from the dataset.
+        """
+        dataset_id = run.get("defaultDatasetId")
+        if not dataset_id:
+            raise ValueError("No dataset ID found in the run object.")
+        async for item in atraced_items(self.client.dataset(dataset_id).iterate_items(), actor=self.ACTOR_ID):
+            yield item
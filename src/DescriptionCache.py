@@ -0,0 +1,164 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+
+class DescriptionCache:
+    def __init__(self, path="gemini_descriptions.sqlite3", max_bytes=64 * 1024 * 1024, ttl_seconds=30 * 24 * 3600):
+        """
+        Initializes an on-disk, content-addressed cache of Gemini image descriptions.
+
+        :param path: The SQLite file backing the cache.
+        :param max_bytes: The total size of stored descriptions above which the least
+                          recently used entries are evicted.
+        :param ttl_seconds: How long an entry stays valid after it was stored (None disables expiry).
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS descriptions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_descriptions_accessed ON descriptions (accessed_at)")
+        self.conn.commit()
+
+    def make_key(self, image_keys, prompt, model_name):
+        """
+        Builds the cache key of a Gemini request.
+
+        :param image_keys: The canonical URLs or byte digests of the images sent in the request, in order.
+        :param prompt: The prompt sent with the images.
+        :param model_name: The Gemini model name.
+        :return: A hex SHA-256 digest.
+        """
+        payload = json.dumps([list(image_keys), prompt, model_name], separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key, count_miss=True):
+        """
+        Looks up a cached description and marks it as recently used.
+
+        :param key: A key built with make_key.
+        :param count_miss: Whether a miss is counted in the statistics (False for a lookup that
+                           falls back to other keys, which count the miss themselves).
+        :return: The cached value, or None on a miss or an expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, created_at FROM descriptions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self.conn.execute("DELETE FROM descriptions WHERE key = ?", (key,))
+                self.conn.commit()
+                row = None
+            if row is None:
+                if count_miss:
+                    self.misses += 1
+                return None
+            self.conn.execute("UPDATE descriptions SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """
+        Stores a description and evicts least recently used entries past max_bytes.
+
+        :param key: A key built with make_key.
+        :param value: A JSON-serializable description.
+        """
+        encoded = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO descriptions (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, now),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """
+        Deletes expired entries, then least recently used ones until the cache fits in max_bytes.
+        """
+        if self.ttl_seconds is not None:
+            self.conn.execute("DELETE FROM descriptions WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM descriptions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        to_delete = []
+        for key, size in self.conn.execute("SELECT key, size FROM descriptions ORDER BY accessed_at ASC"):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM descriptions WHERE key = ?", to_delete)
+
+    def stats(self):
+        """
+        Returns the hit/miss counters and the current size of the cache.
+
+        :return: A dictionary of cache statistics.
+        """
+        with self._lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM descriptions"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        """
+        Closes the underlying SQLite connection.
+        """
+        with self._lock:
+            self.conn.close()
+
+
+def canonical_url(url):
+    """
+    Normalizes a media URL so that re-signed CDN links of the same file share a cache key.
+
+    Parameters:
+    - url (str): The media URL.
+
+    Returns:
+    - str: The URL with a lower-cased scheme and host, and without query string or fragment.
+    """
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, "", ""))
+
+
+def image_digest(content):
+    """
+    Computes the content address of an image.
+
+    Parameters:
+    - content (bytes): The encoded image bytes.
+
+    Returns:
+    - str: The hex SHA-256 digest of the bytes.
+    """
+    return hashlib.sha256(content).hexdigest()
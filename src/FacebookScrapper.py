@@ -1,19 +1,13 @@
-from apify_client import ApifyClient
 import re
 import os
-from dotenv import load_dotenv
-load_dotenv()
+from .ActorScraper import DEFAULT_CHUNK_SIZE, ActorScraper, AsyncActorScraper
+from .media import PHOTO, is_wanted, media_type
+from .models import MediaPost
 
-class FacebookPostScraper:
-    def __init__(self, api_token):
-        """
-        Initializes the FacebookPostScraper with the provided Apify API token.
+ACTOR_ID = "apify/facebook-posts-scraper"
 
-        :param api_token: Your Apify API token.
-        """
-        if not api_token:
-            raise ValueError("API token must be provided.")
-        self.client = ApifyClient(api_token)
+class FacebookPostScraper(ActorScraper):
+    ACTOR_ID = ACTOR_ID
 
     def scrape_page_posts(self, fb_username,newer_than =None,  max_n=20 ):
         """
@@ -21,16 +15,55 @@ class FacebookPostScraper:
 
         :param page_url: The URL of the Facebook page to scrape.
         :param max_n: The maximum number of posts to retrieve.
-        :return: A list of dictionaries containing post details.
+        :return: A list of MediaPost records containing post details.
+        """
+        return self.scrape_pages_batch([fb_username], newer_than, max_n)[fb_username]
+
+    def scrape_page_posts_stream(self, fb_username, newer_than=None, max_n=20):
+        """
+        Scrapes posts from the given Facebook page, yielding each post as soon as its
+        dataset item has been fetched.
+
+        :param fb_username: The Facebook page username to scrape.
+        :param max_n: The maximum number of posts to retrieve.
+        :return: A generator of MediaPost records containing post details.
+        """
+        return self._scrape_stream(fb_username, newer_than, max_n)
+
+    def scrape_pages_batch(self, fb_usernames, newer_than=None, max_n=20, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Scrapes posts for many Facebook pages, packing them into as few actor runs as
+        the chunk size allows and splitting the dataset items back out per page.
+
+        :param fb_usernames: A list of Facebook page usernames to scrape.
+        :param max_n: The maximum number of posts to retrieve per page.
+        :param chunk_size: The maximum number of pages packed into a single actor run.
+        :return: A dict mapping each username to its list of posts (None if its run failed).
+        """
+        return self._scrape_batch(fb_usernames, newer_than, max_n, chunk_size)
+
+    def _page_url(self, fb_username):
+        """
+        Builds and validates the page URL of a Facebook username.
+
+        :param fb_username: The Facebook page username.
+        :return: The page URL.
         """
         page_url = f'https://www.facebook.com/{fb_username}/'
-        # Validate the page URL
         if not self._is_valid_facebook_page_url(page_url):
-            raise ValueError("Invalid Facebook page URL.")
+            raise ValueError(f"Invalid Facebook page URL: {page_url}")
+        return page_url
+
+    def _build_run_input(self, page_urls, newer_than, max_n):
+        """
+        Prepares the Actor input for the given page URLs.
 
-        # Prepare the Actor input
-        run_input = {
-            "startUrls": [{"url": page_url}],
+        :param page_urls: The page URLs to scrape in a single run.
+        :param max_n: The maximum number of posts to retrieve per page.
+        :return: The Actor input dictionary.
+        """
+        return {
+            "startUrls": [{"url": page_url} for page_url in page_urls],
             "resultsLimit": max_n,
             "maxPosts": max_n,
             "proxyConfiguration": {
@@ -42,71 +75,62 @@ class FacebookPostScraper:
             "onlyPostsNewerThan": newer_than
         }
 
-        try:
-            # Run the Actor and wait for it to finish
-            run = self.client.actor("apify/facebook-posts-scraper").call(run_input=run_input)
-        except Exception as e:
-            print(f"An error occurred while running the actor: {e}")
-            return None
+    def _validate_handle(self, fb_username):
+        self._page_url(fb_username)
 
-        items = self.get_items(run)
-        posts = self.extract_posts(items)
-        return posts
+    def _run_input(self, fb_usernames, newer_than, max_n):
+        return self._build_run_input([self._page_url(fb_username) for fb_username in fb_usernames], newer_than, max_n)
+
+    def _item_url(self, item):
+        return item.get("inputUrl") or item.get("facebookUrl")
 
-    def get_items(self, run):
+    def extract_posts(self, items):
         """
-        Retrieves items from the dataset associated with the Actor run.
+        Extracts posts from the scraped page data.
 
-        :param run: The Actor run object.
-        :return: A list of items retrieved from the dataset.
+        :param items: An iterable of items from the dataset.
+        :return: A list of MediaPost records containing post details.
         """
-        items = []
-        try:
-            dataset_id = run.get("defaultDatasetId")
-            if not dataset_id:
-                print("No dataset ID found in the run object.")
-                return items
+        return list(self.iter_posts(items))
 
-            dataset_client = self.client.dataset(dataset_id)
-            for item in dataset_client.iterate_items():
-                items.append(item)
-        except Exception as e:
-            print(f"An error occurred while fetching items from the dataset: {e}")
+    def iter_posts(self, items):
+        """
+        Lazily extracts posts from the scraped page data, one item at a time.
 
-        return items
+        :param items: An iterable of items from the dataset.
+        :return: A generator of MediaPost records containing post details.
+        """
+        for item in items:
+            yield from self._posts_from_item(item)
 
-    def extract_posts(self, items):
+    def _posts_from_item(self, item):
         """
-        Extracts posts from the scraped page data.
+        Extracts the photo and video posts of a single dataset item.
 
-        :param items: A list of items from the dataset.
-        :return: A list of dictionaries containing post details.
+        :param item: A single item from the dataset.
+        :return: A list of MediaPost records containing post details.
         """
         posts = []
-        for item in items:
-            output_format['social_media'] = "facebook"
-            timestamp = item.get("time", None)
-            location = item.get("location", None)
-            output_format['location'] = location
-            output_format['timestamp'] = timestamp
-            if item.get("media", None):
-                media = item.get("media", None)
-                for me in media:
-                    if me.get("__typename"):
-                        if me.get("__typename") == "Photo":
-
-                            if me.get("image"):
-                                output_format = {
-                                    "type" : me.get("__typename"),
-                                    "content_urls" : [me['image']['uri']]
-                                        }
-                            elif me.get("photo_image"):
-                                output_format = {
-                                    "type" : me.get("__typename"),
-                                    "content_urls" : [me['photo_image']['uri']]
-                                        }
-
-                            posts.append(output_format)
+        timestamp = item.get("time", None)
+        location = item.get("location", None)
+        post_id = item.get("postId", None)
+        for me in item.get("media", None) or []:
+            kind = media_type("facebook", me.get("__typename"))
+            if kind is None or not is_wanted(kind, self.media_types):
+                continue
+            if kind == PHOTO:
+                if me.get("image"):
+                    content_urls = [me['image']['uri']]
+                elif me.get("photo_image"):
+                    content_urls = [me['photo_image']['uri']]
+                else:
+                    continue
+            else:
+                video_url = me.get("browser_native_hd_url") or me.get("browser_native_sd_url")
+                if not video_url:
+                    continue
+                content_urls = [video_url]
+            posts.append(MediaPost(me.get("__typename"), kind, "facebook", content_urls, timestamp, location, post_id))
         return posts
 
     def _is_valid_facebook_page_url(self, url):
@@ -119,6 +143,53 @@ class FacebookPostScraper:
         pattern = r'^https?://(www\.)?facebook\.com/[^/]+/?$'
         return re.match(pattern, url) is not None
 
+class AsyncFacebookPostScraper(AsyncActorScraper, FacebookPostScraper):
+    def __init__(self, api_token, client=None, media_types=None, result_cache=None):
+        """
+        Initializes the AsyncFacebookPostScraper, which runs actors on the async Apify client so that
+        starting, polling and paging never block a thread.
+
+        :param api_token: Your Apify API token.
+        :param client: An optional async backend exposing the ApifyClientAsync interface
+                       (e.g. an AsyncReplayClient).
+        :param media_types: The shared media types (see src.media) to extract, or None for all of them.
+        :param result_cache: An optional ActorResultCache that serves repeated runs of the same input.
+        """
+        super().__init__(api_token, client=client, media_types=media_types, result_cache=result_cache)
+
+    async def scrape_page_posts(self, fb_username, newer_than = None, max_n=20):
+        """
+        Scrapes posts from the given Facebook page.
+
+        :param fb_username: The Facebook page username to scrape.
+        :param max_n: The maximum number of posts to retrieve.
+        :return: A list of MediaPost records containing post details.
+        """
+        return (await self.scrape_pages_batch([fb_username], newer_than, max_n))[fb_username]
+
+    def scrape_page_posts_stream(self, fb_username, newer_than = None, max_n=20):
+        """
+        Scrapes posts from the given Facebook page, yielding each one as soon as its dataset item
+        has been fetched.
+
+        :param fb_username: The Facebook page username to scrape.
+        :param max_n: The maximum number of posts to retrieve.
+        :return: An async generator of MediaPost records containing post details.
+        """
+        return self._scrape_stream(fb_username, newer_than, max_n)
+
+    async def scrape_pages_batch(self, fb_usernames, newer_than = None, max_n=20, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Scrapes posts for many pages, packing them into as few concurrent actor runs as
+        the chunk size allows and splitting the dataset items back out per page.
+
+        :param fb_usernames: A list of Facebook page usernames to scrape.
+        :param max_n: The maximum number of posts to retrieve per page.
+        :param chunk_size: The maximum number of pages packed into a single actor run.
+        :return: A dict mapping each page to its list of posts (None if its run failed).
+        """
+        return await self._scrape_batch(fb_usernames, newer_than, max_n, chunk_size)
+
 if __name__ == "__main__":
     # Initialize the scraper
     api_token = os.getenv("APIFY_API_KEY")
@@ -1,28 +1,51 @@
 import re
-from google.generativeai import GenerativeModel
 from fastapi import HTTPException
 import google.generativeai as genai
-import os
-from dotenv import load_dotenv
-import PIL
-from PIL import Image
-from .utils import download_file
+from .ImageDownloader import ImageDownloader
+from .ImagePreprocessor import ImagePreprocessor
+from .GeminiUploads import FileProcessingError, GeminiUploadManager
+from .RateLimiter import get_limiter
+from .model_registry import IMAGE, TEXT, configure_genai, get_model, resolve_model_name
+from .tracing import span
+from .DescriptionCache import DescriptionCache, canonical_url, image_digest
+from .media import IMAGE_MEDIA_TYPES, VIDEO
 from pillow_heif import register_heif_opener
-import numpy as np
-import time
 import json
 import asyncio
-from .models import ImageDescriptions
-load_dotenv()
+from .models import ImageDescriptions, MediaPost
+
+REQUEST_STRATEGIES = ("all", "window", "single")
 
 register_heif_opener()
 
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# Structured output config of the description requests, shared by every call.
+DESCRIPTIONS_CONFIG = genai.GenerationConfig(response_mime_type="application/json", response_schema=ImageDescriptions)
 
 class GeminiRunnerClass:
-    def __init__(self) -> None:
-            genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-            self.model = GenerativeModel(os.getenv('GEMINI_MODEL_NAME'))
+    def __init__(
+        self,
+        downloader: ImageDownloader = None,
+        cache: DescriptionCache = None,
+        cache_key_by: str = "url",
+        preprocessor: ImagePreprocessor = None,
+        uploads: GeminiUploadManager = None,
+        text_model: str = TEXT,
+        image_model: str = IMAGE,
+    ) -> None:
+            # Model clients come from the process-wide registry (src.model_registry): each model is
+            # created once and shared, and text_model/image_model ("text", "image" or a model name)
+            # are the defaults that the per-request `model` arguments override.
+            configure_genai()
+            self.text_model = text_model
+            self.image_model = image_model
+            self.model = get_model(text_model)
+            self.downloader = downloader or ImageDownloader()
+            self.preprocessor = preprocessor or ImagePreprocessor()
+            self.uploads = uploads or GeminiUploadManager()
+            if cache_key_by not in ("url", "bytes"):
+                raise ValueError("cache_key_by must be either 'url' or 'bytes'")
+            self.cache = cache
+            self.cache_key_by = cache_key_by
     def extract_persona_from_response(self, response_text: str, user_id: str) -> dict:
         """Extract persona details from the Gemini response text."""
         try:
@@ -57,31 +80,29 @@ class GeminiRunnerClass:
             # current_app.logger.error(f"Error extracting persona: {e}")
             raise HTTPException(status_code=500, detail="Error extracting persona")
 
-    async def wait_for_file_active(self, file_uri: str):
-        """Wait until the uploaded file becomes ACTIVE."""
-        while True:
-            file_info = genai.get_file("shityy")
-            print({"file_info": file_info})
-            if file_info.state.name == "ACTIVE":
-                break
-            elif file_info.state.name == "FAILED":
-                genai.delete_file(name="shityy")
-                raise HTTPException(status_code=500, detail="File processing failed")
-            time.sleep(10)
+    async def wait_for_file_active(self, file_name: str):
+        """Wait, without blocking the event loop, until the uploaded file becomes ACTIVE."""
+        try:
+            return await self.uploads.wait_for_active(file_name)
+        except FileProcessingError as e:
+            await self.uploads.delete(file_name)
+            raise HTTPException(status_code=500, detail=str(e))
 
     async def upload_and_verify_file(self, file_path: str):
-        print(f"Uploading file...")
-        uploaded_file = genai.upload_file(path=file_path, name="shityy")
-        print(f"Completed upload: {uploaded_file.uri}")
-        await self.wait_for_file_active(uploaded_file.uri)
-
-        return uploaded_file
+        """Upload a local file under a unique name and wait until it is ACTIVE; the caller deletes it."""
+        try:
+            return await self.uploads.upload(file_path)
+        except FileProcessingError as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
 
-    async def get_gemini_response(self, input_text: str, image_parts: list) -> str:
-        self.model = GenerativeModel(os.getenv('GEMINI_MODEL_NAME'))
+    async def get_gemini_response(self, input_text: str, image_parts: list, model: str = None) -> str:
+        model_name = resolve_model_name(model or self.text_model)
         try:
-            response = self.model.generate_content([input_text, *image_parts])
+            with span("gemini.generate", model=model_name, parts=len(image_parts)) as gemini_span:
+                async with get_limiter(model_name):
+                    response = await get_model(model_name).generate_content_async([input_text, *image_parts])
+                gemini_span.set(response_chars=len(response.text))
             return response.text
         except Exception as e:
             # current_app.logger.error(f"Error fetching Gemini response: {e}")
@@ -90,11 +111,7 @@ class GeminiRunnerClass:
     async def process_image_parts_from_social_media(self, all_images):
         ans = []
         for i in all_images:
-            if i.get("content_urls"):
-                contents = i.get("content_urls")
-                for url in contents:
-                    content_url = {"data": url,"social_media":i['social_media'], "timestamp":i['timestamp'], "location":i['location'], "type":i['type']  }
-                    ans.append(content_url)
+            ans.extend(i.items())
         return ans
     def process_response_text(self, response_text, ):
         
@@ -106,54 +123,224 @@ class GeminiRunnerClass:
         """
         return prompt  + to_append
 
-    async def get_gemini_response_image(self, input_text: str, image_parts_list: list) -> str:
-        self.model = GenerativeModel(os.getenv('GEMINI_IMAGE_MODEL_NAME'))
-        images = []
-        image_parts_list = await self.process_image_parts_from_social_media(image_parts_list)
-        for image_part in image_parts_list:
-            if image_part['type'].lower() == "photo":
-                file_path = download_file(image_part['data'])
-                img = Image.open(file_path)
-                img_arr = np.array(img)
-                image_array = img_arr.astype(np.uint8)  # Ensure array is in uint8 format
-                # Convert the NumPy array back to a PIL Image
-                image = Image.fromarray(image_array)
-                images.append(image)
-                img.close()
-                os.remove(file_path)
+    def image_urls(self, posts: list) -> list:
+        """Collect the URLs of the images (photos and document pages) of the given posts."""
+        return [
+            url
+            for post in posts
+            if post.media_type in IMAGE_MEDIA_TYPES
+            for url in post.content_urls
+        ]
+
+    def window_images(self, urls: list, strategy: str = "all", window_size: int = 8) -> list:
+        """Group image URLs into the windows sent per Gemini request."""
+        if strategy == "all":
+            return [urls] if urls else []
+        if strategy == "single":
+            return [[url] for url in urls]
+        if strategy == "window":
+            if window_size < 1:
+                raise ValueError("window_size must be at least 1")
+            return [urls[i:i + window_size] for i in range(0, len(urls), window_size)]
+        raise ValueError(f"Unknown request strategy: {strategy}. Expected one of {REQUEST_STRATEGIES}")
+
+    async def get_gemini_response_image(
+        self,
+        input_text: str,
+        image_parts_list: list,
+        strategy: str = "all",
+        window_size: int = 8,
+        max_concurrency: int = 4,
+        model: str = None,
+    ) -> list:
+        """
+        Describe the photos of the given posts with Gemini.
+
+        strategy selects how images are packed into requests: "all" sends every image in one
+        call, "window" sends window_size images per call and "single" sends one image per call.
+        Calls run concurrently, at most max_concurrency at a time. Each result carries the
+        content_urls of the images it describes.
+
+        When a DescriptionCache is configured, requests already described for the same prompt
+        and model are served from it, whole or image by image, and only the uncached images of a
+        window are sent. Keying by "url" also skips the download of cached images.
+        """
+        model_name = resolve_model_name(model or self.image_model)
+        windows = self.window_images(self.image_urls(image_parts_list), strategy, window_size)
+        results = [[] for _ in windows]
+        keys = [None] * len(windows)
+
+        if self.cache is not None and self.cache_key_by == "url":
+            self._lookup_cached(windows, results, keys, input_text, model_name, canonical_url)
+
+        needed = list(dict.fromkeys(url for window in windows for url in window))
+        contents = dict(zip(needed, await self.downloader.fetch_all(needed)))
+
+        if self.cache is not None and self.cache_key_by == "bytes":
+            def digest(url):
+                return image_digest(contents[url]) if contents[url] is not None else url
+            self._lookup_cached(windows, results, keys, input_text, model_name, digest)
+
+        images = {}
+        for url in dict.fromkeys(url for window in windows for url in window):
+            image = self._prepare_image(url, contents[url])
+            if image is not None:
+                images[url] = image
 
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def describe(i):
+            sent = [url for url in windows[i] if url in images]
+            if not sent:
+                return
+            async with semaphore:
+                descriptions = await self.describe_images(input_text, model_name, [images[url] for url in sent])
+            if self.cache is not None:
+                self.store_cached({url: keys[i][url] for url in windows[i]}, sent, descriptions, input_text, model_name)
+            results[i].append({"content_urls": sent, "descriptions": descriptions})
 
         try:
-            responses = []
-            for image in images:
-                response = self.model.generate_content([input_text] + images, generation_config=genai.GenerationConfig(
-        response_mime_type="application/json", response_schema=ImageDescriptions
-    ))
-                responses.append(json.loads(response.text).get("descriptions"))
-            
-            #print("Response Revieved", response) 
-            return responses
+            await asyncio.gather(*(describe(i) for i in range(len(windows))))
         except Exception as e:
             # current_app.logger.error(f"Error fetching Gemini response: {e}")
             #print(f"Error fetching Gemini response: {e}")
             raise HTTPException(status_code=500, detail=f"Error fetching Gemini response: {str(e)}")
-        
-    async def get_gemini_response_audio(self, input_prompt, audio_data: list) -> str:
+        return [result for window_results in results for result in window_results]
+
+    async def describe_images(self, input_text: str, model_name: str, images: list) -> list:
+        """Describe one window of prepared images with a single Gemini request."""
+        with span(
+            "gemini.describe",
+            model=model_name,
+            images=len(images),
+            bytes=sum(len(image["data"]) for image in images),
+        ) as gemini_span:
+            async with get_limiter(model_name):
+                response = await get_model(model_name).generate_content_async(
+                    [input_text] + images, generation_config=DESCRIPTIONS_CONFIG
+                )
+            gemini_span.set(response_chars=len(response.text))
+        return json.loads(response.text).get("descriptions")
+
+    def lookup_cached(self, window: list, input_text: str, model_name: str, key_of) -> tuple:
+        """
+        Look a window up in the cache, first as a whole and then image by image.
+
+        Returns (image_keys, cached, missing): the cache key part of each image of the window, the
+        cached {"content_urls", "descriptions"} result (None if nothing is cached) and the URLs
+        that still need a model call. A window hit counts as one cache hit; otherwise each image
+        counts as one hit or miss.
+        """
+        image_keys = {url: key_of(url) for url in window}
+        whole_key = self.cache.make_key(list(image_keys.values()), input_text, model_name)
+        descriptions = self.cache.get(whole_key, count_miss=len(window) == 1)
+        if descriptions is not None:
+            return image_keys, {"content_urls": list(window), "descriptions": descriptions}, []
+        if len(window) == 1:
+            return image_keys, None, list(window)
+        cached_urls, cached_descriptions, missing = [], [], []
+        for url in window:
+            single = self.cache.get(self.cache.make_key([image_keys[url]], input_text, model_name))
+            if isinstance(single, list) and len(single) == 1:
+                cached_urls.append(url)
+                cached_descriptions.append(single[0])
+            else:
+                missing.append(url)
+        cached = {"content_urls": cached_urls, "descriptions": cached_descriptions} if cached_urls else None
+        return image_keys, cached, missing
+
+    def store_cached(self, image_keys: dict, sent: list, descriptions, input_text: str, model_name: str) -> None:
+        """
+        Cache the descriptions of one request, under the images actually sent: as a whole and,
+        when there is one description per image, image by image.
+
+        image_keys maps each requested URL to its cache key part. Nothing is stored when some
+        requested images could not be sent (failed downloads or preprocessing), so a degraded
+        result is never served as the full window's.
+        """
+        if any(url not in sent for url in image_keys):
+            return
+        keys = [image_keys[url] for url in sent]
+        self.cache.set(self.cache.make_key(keys, input_text, model_name), descriptions)
+        if len(keys) > 1 and isinstance(descriptions, list) and len(descriptions) == len(keys):
+            for key, description in zip(keys, descriptions):
+                self.cache.set(self.cache.make_key([key], input_text, model_name), [description])
+
+    def _lookup_cached(self, windows, results, keys, input_text, model_name, key_of) -> None:
+        """Add the cached results of each window and narrow windows to the URLs that still need a model call."""
+        for i, window in enumerate(windows):
+            if not window:
+                continue
+            keys[i], cached, windows[i] = self.lookup_cached(window, input_text, model_name, key_of)
+            if cached is not None:
+                results[i].append(cached)
+
+    def _prepare_image(self, url: str, content: bytes):
+        """Downscale and re-encode downloaded image bytes for upload, or None if unavailable."""
+        if content is None:
+            return None
+        try:
+            return self.preprocessor.process(content)
+        except Exception as e:
+            print(f"An error occurred while preprocessing {url}: {e}")
+            return None
+
+    async def get_gemini_response_audio(self, input_prompt, audio_data: list, model: str = None) -> str:
         audio_data = audio_data[0]
-        file_path = download_file(audio_data['data'], filename="tempaudio.mp3")
-        self.model = GenerativeModel(os.getenv('GEMINI_MODEL_NAME'))
-        audio_answer  = await self.upload_and_verify_file(file_path)
+        model_name = resolve_model_name(model or self.text_model)
         try:
-            response = self.model.generate_content([input_prompt, audio_answer])
-            #print("Response Revieved", response)
-            os.remove(file_path)
-            genai.delete_file(name="shityy")
+            async with self.uploads.uploaded(audio_data.data, kind="audio") as audio_answer:
+                with span("gemini.generate", model=model_name, parts=1) as gemini_span:
+                    async with get_limiter(model_name):
+                        response = await get_model(model_name).generate_content_async([input_prompt, audio_answer])
+                    gemini_span.set(response_chars=len(response.text))
             return response.text
         except Exception as e:
             # current_app.logger.error(f"Error fetching Gemini response: {e}")
-            genai.delete_file(name="shityy")
             #print(f"Error fetching Gemini response: {e}")
             raise HTTPException(status_code=500, detail="Error fetching Gemini response")
+
+    async def get_gemini_response_video(self, input_text: str, posts: list, model: str = None) -> list:
+        """
+        Describe the videos of the given posts with Gemini, one request per video.
+
+        Videos are downloaded, uploaded and described concurrently, at most
+        uploads.max_in_flight at a time; each remote file is deleted once its request is done.
+        Each result carries the content_urls of the video it describes. Videos that fail are
+        left out; the request fails only when every video failed.
+        """
+        model_name = resolve_model_name(model or self.image_model)
+        items = [item for post in posts if post.media_type == VIDEO for item in post.items()]
+        outcomes = await asyncio.gather(
+            *(self.describe_video(input_text, model_name, item) for item in items), return_exceptions=True
+        )
+        # A video that fails is dropped; the others keep their results.
+        results = []
+        errors = []
+        for item, outcome in zip(items, outcomes):
+            if isinstance(outcome, BaseException):
+                print(f"An error occurred while describing {item.data}: {outcome}")
+                errors.append(outcome)
+            else:
+                results.append(outcome)
+        if errors and not results:
+            raise HTTPException(status_code=500, detail=f"Error fetching Gemini response: {str(errors[0])}")
+        return results
+
+    async def describe_video(self, input_text: str, model_name: str, item) -> dict:
+        """Upload one video MediaItem and describe it with a single Gemini request."""
+        async with self.uploads.uploaded(item.data, kind="video") as video:
+            with span("gemini.describe", model=model_name, videos=1) as gemini_span:
+                async with get_limiter(model_name):
+                    response = await get_model(model_name).generate_content_async(
+                        [input_text, video], generation_config=DESCRIPTIONS_CONFIG
+                    )
+                gemini_span.set(response_chars=len(response.text))
+        return {
+            "content_urls": [item.data],
+            "descriptions": json.loads(response.text).get("descriptions"),
+            "social_media": item.social_media,
+        }
 if __name__ =="__main__":
     gem = GeminiRunnerClass()
     prompt = "You are an expert in delivering quality image captions for the given images,you describe details of of what the person in the image is doing and try to describe his personality traits, interest areas and experiences in a story form. limit your response to a single line per image and separate image stories with a single new line character"
@@ -169,7 +356,7 @@ if __name__ =="__main__":
     
     """
     with open("output.json", "r") as f:
-        data = json.loads(f.read())
+        data = [MediaPost.from_dict(post) for post in json.loads(f.read())]
     output = asyncio.run(gem.get_gemini_response_image(prompt_3, data))
     print(output)
 
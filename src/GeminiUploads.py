@@ -0,0 +1,179 @@
+import asyncio
+import contextlib
+import mimetypes
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from urllib.parse import urlparse
+
+import google.generativeai as genai
+
+from .tracing import span
+from .utils import download_file
+
+# MIME types used when the URL has no recognizable extension.
+DEFAULT_MIME_TYPES = {
+    "video": "video/mp4",
+    "audio": "audio/mpeg",
+}
+
+
+class FileProcessingError(Exception):
+    """Raised when an uploaded file ends in the FAILED state or never becomes ACTIVE."""
+
+
+class GeminiUploadManager:
+    def __init__(
+        self,
+        max_in_flight=4,
+        poll_initial_seconds=1.0,
+        poll_max_seconds=30.0,
+        activation_timeout=600.0,
+        download_dir=None,
+    ):
+        """
+        Initializes the manager of files uploaded to the Gemini File API (videos, audio).
+
+        Every upload gets a unique name, so concurrent requests never share a remote file. The
+        blocking genai calls run in worker threads and activation is polled with asyncio.sleep and
+        exponential backoff, so waiting on one file never stalls the event loop. Each file is
+        deleted, remotely and locally, as soon as the request that needed it is done.
+
+        :param max_in_flight: The maximum number of files uploaded or held on the File API at once.
+        :param poll_initial_seconds: The delay before the first activation check; it doubles after
+                                     every check that finds the file still processing.
+        :param poll_max_seconds: The upper bound of the delay between two activation checks.
+        :param activation_timeout: Seconds to wait for a file to become ACTIVE before giving up.
+        :param download_dir: Where media are downloaded before upload (defaults to the system
+                             temporary directory).
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        self.max_in_flight = max_in_flight
+        self.poll_initial_seconds = poll_initial_seconds
+        self.poll_max_seconds = poll_max_seconds
+        self.activation_timeout = activation_timeout
+        self.download_dir = download_dir
+        self._semaphore = None
+        # Cleanup tasks of cancelled uploads, referenced until they finish.
+        self._cleanups = set()
+
+    def _slots(self):
+        # Created lazily so the semaphore belongs to the running event loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    @staticmethod
+    def new_file_name(prefix="media"):
+        """
+        Returns a unique File API name (lowercase alphanumerics and dashes, at most 40 characters).
+
+        :param prefix: A short label, e.g. "video" or "audio".
+        """
+        return f"{prefix}-{uuid.uuid4().hex}"[:40]
+
+    async def upload(self, path, mime_type=None, prefix="media"):
+        """
+        Uploads a local file under a unique name and waits until it is ACTIVE.
+
+        The caller owns the returned file and must delete() it; uploaded() does that for you.
+
+        :param path: The local file to upload.
+        :param mime_type: The file's MIME type (guessed from the extension when None).
+        :param prefix: A short label used in the remote file name.
+        :return: The ACTIVE genai File.
+        """
+        name = self.new_file_name(prefix)
+        upload = asyncio.ensure_future(asyncio.to_thread(genai.upload_file, path=path, mime_type=mime_type, name=name))
+        try:
+            with span("gemini.upload", bytes=os.path.getsize(path), mime_type=mime_type):
+                uploaded_file = await asyncio.shield(upload)
+        except BaseException:
+            # A cancelled task cannot stop the upload thread, which still creates the file: wait
+            # for it and delete the file by its known name. Shielded, so a second cancellation
+            # does not abandon the cleanup.
+            cleanup = asyncio.ensure_future(self._delete_when_uploaded(upload, f"files/{name}"))
+            self._cleanups.add(cleanup)
+            cleanup.add_done_callback(self._cleanups.discard)
+            await asyncio.shield(cleanup)
+            raise
+        try:
+            return await self.wait_for_active(uploaded_file.name)
+        except BaseException:
+            await self.delete(uploaded_file.name)
+            raise
+
+    async def _delete_when_uploaded(self, upload, name):
+        """Waits for an abandoned upload thread and deletes the file it created, if any."""
+        try:
+            await upload
+        except Exception:
+            # The upload failed, so no file was created.
+            return
+        await self.delete(name)
+
+    async def wait_for_active(self, name):
+        """
+        Polls a file until it is ACTIVE, backing off exponentially between checks.
+
+        :param name: The file name, e.g. "files/video-...".
+        :return: The ACTIVE genai File.
+        :raises FileProcessingError: If the file FAILED or did not become ACTIVE in time.
+        """
+        deadline = time.monotonic() + self.activation_timeout
+        delay = self.poll_initial_seconds
+        with span("gemini.activate") as activate_span:
+            while True:
+                file_info = await asyncio.to_thread(genai.get_file, name)
+                activate_span.add("polls")
+                state = file_info.state.name
+                if state == "ACTIVE":
+                    return file_info
+                if state == "FAILED":
+                    raise FileProcessingError(f"File processing failed for {name}")
+                if time.monotonic() + delay > deadline:
+                    raise FileProcessingError(f"File {name} did not become active within {self.activation_timeout} seconds")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.poll_max_seconds)
+
+    async def delete(self, name):
+        """
+        Deletes an uploaded file; failures are reported and otherwise ignored.
+
+        :param name: The file name.
+        """
+        try:
+            await asyncio.to_thread(genai.delete_file, name)
+        except Exception as e:
+            print(f"An error occurred while deleting {name}: {e}")
+
+    @contextlib.asynccontextmanager
+    async def uploaded(self, url, kind="video", mime_type=None):
+        """
+        Downloads a media URL, uploads it and yields the ACTIVE file; on exit, whatever happened,
+        the remote file and the local download are deleted. At most max_in_flight files are held
+        at once; further callers wait for a slot.
+
+        :param url: The media URL, e.g. a MediaItem's data.
+        :param kind: "video" or "audio", used for the default MIME type and the file name.
+        :param mime_type: The MIME type (guessed from the URL when None).
+        :return: An async context manager yielding the genai File.
+        """
+        mime_type = mime_type or mimetypes.guess_type(urlparse(url).path)[0] or DEFAULT_MIME_TYPES.get(kind)
+        async with self._slots():
+            local_dir = tempfile.mkdtemp(prefix="gemini-upload-", dir=self.download_dir)
+            uploaded_file = None
+            try:
+                extension = (mimetypes.guess_extension(mime_type) or "") if mime_type else ""
+                with span("download", kind=kind) as download_span:
+                    path = await asyncio.to_thread(download_file, url, save_dir=local_dir, filename=f"{kind}{extension}")
+                    download_span.set(bytes=os.path.getsize(path))
+                uploaded_file = await self.upload(path, mime_type=mime_type, prefix=kind)
+                yield uploaded_file
+            finally:
+                if uploaded_file is not None:
+                    await self.delete(uploaded_file.name)
+                shutil.rmtree(local_dir, ignore_errors=True)
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .tracing import span
+
+
+class ImageDownloader:
+    def __init__(self, max_workers=8, timeout=30):
+        """
+        Initializes a pooled downloader that fetches files into memory with bounded concurrency.
+
+        :param max_workers: The maximum number of downloads in flight at once.
+        :param timeout: The per-request timeout in seconds.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-download")
+        self.sessions = {}
+        self._sessions_lock = threading.Lock()
+
+    def _session_for(self, url):
+        """
+        Returns the keep-alive session for the URL's host, creating it on first use.
+
+        :param url: The URL that is about to be fetched.
+        :return: A requests.Session whose connection pool is sized for max_workers.
+        """
+        host = urlparse(url).netloc
+        session = self.sessions.get(host)
+        if session is None:
+            with self._sessions_lock:
+                session = self.sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self.sessions[host] = session
+        return session
+
+    def fetch(self, url):
+        """
+        Downloads the given URL into memory.
+
+        :param url: The URL of the file to download.
+        :return: The response body as bytes.
+        """
+        host = urlparse(url).netloc
+        with span("download", host=host) as download_span:
+            response = self._session_for(url).get(url, timeout=self.timeout)
+            response.raise_for_status()
+            download_span.set(bytes=len(response.content), status=response.status_code)
+            return response.content
+
+    async def fetch_all(self, urls):
+        """
+        Downloads all URLs concurrently, at most max_workers at a time.
+
+        :param urls: A list of URLs to download.
+        :return: A list of bytes (None for failed downloads) in the same order as urls.
+        """
+        loop = asyncio.get_running_loop()
+        tasks = [loop.run_in_executor(self.executor, self.fetch, url) for url in urls]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        contents = []
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                print(f"An error occurred while downloading {url}: {result}")
+                contents.append(None)
+            else:
+                contents.append(result)
+        return contents
+
+    def close(self):
+        """
+        Shuts down the worker threads and closes all keep-alive sessions.
+        """
+        self.executor.shutdown(wait=True)
+        with self._sessions_lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
@@ -0,0 +1,80 @@
+import io
+
+from PIL import Image, ImageOps
+
+from .tracing import span
+
+OUTPUT_FORMATS = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+
+class ImagePreprocessor:
+    def __init__(self, max_edge=1024, output_format="JPEG", quality=85):
+        """
+        Initializes the preprocessing stage that shrinks and re-encodes images before upload.
+
+        :param max_edge: The maximum width/height, in pixels, of the uploaded image.
+        :param output_format: The re-encoding format, "JPEG" or "WEBP".
+        :param quality: The encoder quality (1-100).
+        """
+        output_format = output_format.upper()
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}. Expected one of {list(OUTPUT_FORMATS)}")
+        if max_edge < 1:
+            raise ValueError("max_edge must be at least 1.")
+        self.max_edge = max_edge
+        self.output_format = output_format
+        self.quality = quality
+
+    def process(self, content):
+        """
+        Decodes, orients, downscales and re-encodes an image.
+
+        JPEGs are decoded through PIL's draft mode, so the decoder works at the smallest DCT
+        scale that still covers max_edge and the full-resolution bitmap is never built.
+
+        :param content: The encoded image bytes.
+        :return: A Gemini inline image part: {"mime_type": ..., "data": bytes}.
+        """
+        with span("preprocess", bytes_in=len(content)) as preprocess_span, Image.open(io.BytesIO(content)) as img:
+            if img.format == "JPEG":
+                img.draft("RGB", (self.max_edge, self.max_edge))
+            part = self.encode(ImageOps.exif_transpose(img))
+            preprocess_span.set(bytes_out=len(part["data"]))
+        return part
+
+    def encode(self, image):
+        """
+        Downscales and re-encodes an already decoded image, e.g. a video keyframe.
+
+        :param image: A PIL image.
+        :return: A Gemini inline image part: {"mime_type": ..., "data": bytes}.
+        """
+        image = to_rgb(image)
+        image.thumbnail((self.max_edge, self.max_edge), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        buffer = io.BytesIO()
+        image.save(buffer, format=self.output_format, quality=self.quality)
+        return {"mime_type": OUTPUT_FORMATS[self.output_format], "data": buffer.getvalue()}
+
+
+def to_rgb(image):
+    """
+    Normalizes an image to RGB, flattening any transparency onto a white background.
+
+    Parameters:
+    - image (PIL.Image.Image): The image to normalize.
+
+    Returns:
+    - PIL.Image.Image: An RGB image.
+    """
+    if image.mode == "RGB":
+        return image
+    if image.mode == "P" and "transparency" in image.info:
+        image = image.convert("RGBA")
+    if image.mode in ("RGBA", "LA"):
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
@@ -1,20 +1,14 @@
 import re
-from apify_client import ApifyClient
 import os
 import json
-from dotenv import load_dotenv
-load_dotenv()
+from .ActorScraper import DEFAULT_CHUNK_SIZE, ActorScraper, AsyncActorScraper
+from .media import is_wanted, media_type
+from .models import MediaPost
 
-class InstagramPostScraper:
-    def __init__(self, api_token):
-        """
-        Initializes the InstagramPostScraper with the provided Apify API token.
+ACTOR_ID = "apify/instagram-scraper"
 
-        :param api_token: Your Apify API token.
-        """
-        if not api_token:
-            raise ValueError("API token must be provided.")
-        self.client = ApifyClient(api_token)
+class InstagramPostScraper(ActorScraper):
+    ACTOR_ID = ACTOR_ID
 
     def scrape_profile(self, username,newer_than = None,  max_n=5):
         """
@@ -22,19 +16,57 @@ class InstagramPostScraper:
 
         :param profile_url: The URL of the Instagram profile to scrape.
         :param max_n: The maximum number of posts to retrieve.
-        :return: A list of dictionaries containing post type and content URLs.
+        :return: A list of MediaPost records containing post type and content URLs.
+        """
+        return self.scrape_profiles_batch([username], newer_than, max_n)[username]
+
+    def scrape_profile_stream(self, username, newer_than = None, max_n=5):
+        """
+        Scrapes posts from the given Instagram profile, yielding each processed post as soon
+        as its dataset item has been fetched.
+
+        :param username: The Instagram username to scrape.
+        :param max_n: The maximum number of posts to retrieve.
+        :return: A generator of MediaPost records containing post type and content URLs.
+        """
+        return self._scrape_stream(username, newer_than, max_n)
+
+    def scrape_profiles_batch(self, usernames, newer_than = None, max_n=5, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Scrapes posts for many Instagram profiles, packing them into as few actor runs as
+        the chunk size allows and splitting the dataset items back out per profile.
+
+        :param usernames: A list of Instagram usernames to scrape.
+        :param max_n: The maximum number of posts to retrieve per profile.
+        :param chunk_size: The maximum number of profiles packed into a single actor run.
+        :return: A dict mapping each username to its processed posts (None if its run failed).
+        """
+        return self._scrape_batch(usernames, newer_than, max_n, chunk_size)
+
+    def _profile_url(self, username):
         """
+        Builds and validates the profile URL of an Instagram username.
 
-        profile_url =f"https://www.instagram.com/{username}/"
-        # Validate the profile URL
+        :param username: The Instagram username.
+        :return: The profile URL.
+        """
+        profile_url = f"https://www.instagram.com/{username}/"
         if not re.match(r'^https?://(www\.)?instagram\.com/[^/]+/?$', profile_url):
-            raise ValueError("Invalid Instagram profile URL.")
+            raise ValueError(f"Invalid Instagram profile URL: {profile_url}")
+        return profile_url
+
+    def _build_run_input(self, profile_urls, newer_than, max_n):
+        """
+        Prepares the Actor input for the given profile URLs.
 
-        # Prepare the Actor input
-        run_input = {
-            "directUrls": [profile_url],
+        :param profile_urls: The profile URLs to scrape in a single run.
+        :param max_n: The maximum number of posts to retrieve per profile.
+        :return: The Actor input dictionary.
+        """
+        return {
+            "directUrls": profile_urls,
             "resultsType": "posts",
-            "resultsLimit": max_n, # Quantity
+            "resultsLimit": max_n, # Quantity per profile
             "proxyConfiguration": {
                 "useApifyProxy": True,
                 # Uncomment and specify proxy groups if needed
@@ -42,97 +74,137 @@ class InstagramPostScraper:
                 "searchType": "hashtag",
                 "searchLimit": 1,
             },
-            "onlyPostsNewerThan": newer_than # Date 
+            "onlyPostsNewerThan": newer_than # Date
         }
 
-        try:
-            # Run the Actor and wait for it to finish
-            run = self.client.actor("apify/instagram-scraper").call(run_input=run_input)
-        except Exception as e:
-            print(f"An error occurred while running the actor: {e}")
-            return None
+    def _validate_handle(self, username):
+        self._profile_url(username)
 
-        items = self.get_items(run)
-        outputs = self.process_items(items)
-        return outputs
+    def _run_input(self, usernames, newer_than, max_n):
+        return self._build_run_input([self._profile_url(username) for username in usernames], newer_than, max_n)
 
-    def get_items(self, run):
-        """
-        Retrieves items from the dataset associated with the Actor run.
-
-        :param run: The Actor run object.
-        :return: A list of items retrieved from the dataset.
-        """
-        items = []
-        try:
-            dataset_id = run.get("defaultDatasetId")
-            if not dataset_id:
-                print("No dataset ID found in the run object.")
-                return items
-
-            dataset_client = self.client.dataset(dataset_id)
-            for item in dataset_client.iterate_items():
-                items.append(item)
-        except Exception as e:
-            print(f"An error occurred while fetching items from the dataset: {e}")
-
-        return items
+    def _item_url(self, item):
+        return item.get("inputUrl") or item.get("ownerUsername")
 
     def process_items(self, items):
         """
         Processes the items retrieved from the dataset to extract required data.
 
-        :param items: A list of items from the dataset.
+        :param items: An iterable of items from the dataset.
         :return: A list of processed data containing post type and content URLs.
         """
-        outputs = []
+        return list(self.iter_processed_items(items))
+
+    def iter_processed_items(self, items):
+        """
+        Lazily processes the items retrieved from the dataset, one item at a time.
+
+        :param items: An iterable of items from the dataset.
+        :return: A generator of processed data containing post type and content URLs.
+        """
         for item in items:
-            timestamp = item.get("timestamp", None)
-            output = self.get_required_data_for_user(item)
+            output = self._process_item(item)
             if output:
-                timestamp = item.get("timestamp", None)
-                output['timestamp'] = timestamp
-                output['social_media'] = "instagram"
-                location = item.get("location", None)
-                output['location'] = location
-                outputs.append(output)
-        return outputs
+                yield output
+
+    def _posts_from_item(self, item):
+        output = self._process_item(item)
+        return [output] if output else []
+
+    def _process_item(self, item):
+        """
+        Processes a single dataset item.
+
+        :param item: A single item from the dataset.
+        :return: The processed MediaPost, or None if the item carries no supported media.
+        """
+        output = self.get_required_data_for_user(item)
+        if output:
+            output.timestamp = item.get("timestamp", None)
+            output.location = item.get("location", None)
+            output.post_id = item.get("id", None)
+        return output
 
     def get_required_data_for_user(self, item):
         """
         Extracts required data from a single item.
 
         :param item: A single item from the dataset.
-        :return: A dictionary with the post type and content URLs.
+        :return: A MediaPost with the post type and content URLs, or None if the type is
+                 unsupported or filtered out.
         """
         content_type = item.get("type")
-        types = ["Video", "Image", "Sidecar"]
+        kind = media_type("instagram", content_type)
 
-        if content_type in types:
-            output_format = {
-                "type": content_type,
-                "content_urls": [],
-            }
+        if kind is not None and is_wanted(kind, self.media_types):
+            output_format = MediaPost(content_type, kind, "instagram")
             if content_type == "Video":
                 video_url = item.get("videoUrl")
                 if video_url:
-                    output_format["content_urls"] = [video_url]
+                    output_format.content_urls = [video_url]
             elif content_type == "Image":
                 display_url = item.get("displayUrl")
                 if display_url:
-                    output_format["content_urls"] = [display_url]
+                    output_format.content_urls = [display_url]
             elif content_type == "Sidecar":
                 images = item.get("images")
                 if images:
-                    output_format["content_urls"] = images
+                    output_format.content_urls = images
             else:
                 return None
             return output_format
         else:
             return None
 
+class AsyncInstagramPostScraper(AsyncActorScraper, InstagramPostScraper):
+    def __init__(self, api_token, client=None, media_types=None, result_cache=None):
+        """
+        Initializes the AsyncInstagramPostScraper, which runs actors on the async Apify client so that
+        starting, polling and paging never block a thread.
+
+        :param api_token: Your Apify API token.
+        :param client: An optional async backend exposing the ApifyClientAsync interface
+                       (e.g. an AsyncReplayClient).
+        :param media_types: The shared media types (see src.media) to extract, or None for all of them.
+        :param result_cache: An optional ActorResultCache that serves repeated runs of the same input.
+        """
+        super().__init__(api_token, client=client, media_types=media_types, result_cache=result_cache)
+
+    async def scrape_profile(self, username, newer_than = None, max_n=5):
+        """
+        Scrapes posts from the given Instagram profile.
+
+        :param username: The Instagram username to scrape.
+        :param max_n: The maximum number of posts to retrieve.
+        :return: A list of MediaPost records containing post details.
+        """
+        return (await self.scrape_profiles_batch([username], newer_than, max_n))[username]
+
+    def scrape_profile_stream(self, username, newer_than = None, max_n=5):
+        """
+        Scrapes posts from the given Instagram profile, yielding each one as soon as its dataset item
+        has been fetched.
+
+        :param username: The Instagram username to scrape.
+        :param max_n: The maximum number of posts to retrieve.
+        :return: An async generator of MediaPost records containing post details.
+        """
+        return self._scrape_stream(username, newer_than, max_n)
+
+    async def scrape_profiles_batch(self, usernames, newer_than = None, max_n=5, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Scrapes posts for many profiles, packing them into as few concurrent actor runs as
+        the chunk size allows and splitting the dataset items back out per profile.
+
+        :param usernames: A list of Instagram usernames to scrape.
+        :param max_n: The maximum number of posts to retrieve per profile.
+        :param chunk_size: The maximum number of profiles packed into a single actor run.
+        :return: A dict mapping each profile to its list of posts (None if its run failed).
+        """
+        return await self._scrape_batch(usernames, newer_than, max_n, chunk_size)
 
 if __name__ == "__main__":
+    from .Sinks import PartitionedSink
     # Import the class
     # from instagram_post_scraper import InstagramPostScraper
 
@@ -149,8 +221,9 @@ if __name__ == "__main__":
         if outputs:
             for output in outputs:
                 print(output)
-            with open("insta_output_2.json", "w+") as f:
-                json.dump(outputs, f)
+            sink = PartitionedSink("insta_output")
+            sink.write_posts(outputs, handle=profile_url)
+            sink.close()
         else:
             print("No data retrieved.")
     except ValueError as ve:
@@ -0,0 +1,203 @@
+import json
+import random
+import sqlite3
+import time
+import uuid
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class LeaseLostError(Exception):
+    """Raised when a worker acts on a job whose lease it no longer holds."""
+
+
+class SQLiteJobQueue:
+    def __init__(self, path="jobs.sqlite3", lease_seconds=900):
+        """
+        Initializes a local, multi-process safe queue of profiling jobs backed by SQLite.
+
+        Claimed jobs are leased: if a worker dies without completing or failing a job, the job
+        becomes claimable again once its lease expires. Each claim gets a new lease token, which
+        heartbeat, complete and fail require, so a worker whose lease expired cannot extend,
+        complete or fail the attempt of the worker that claimed the job after it.
+
+        :param path: The SQLite file backing the queue.
+        :param lease_seconds: How long a claimed job stays reserved for its worker.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_until REAL,
+                lease_token TEXT,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        if "lease_token" not in {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}:
+            # Queues created before lease tokens existed.
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN lease_token TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs (status, available_at)")
+
+    def enqueue(self, payload):
+        """
+        Adds a job to the queue.
+
+        :param payload: A JSON-serializable job, e.g. a handles dict for scrape_all_social_media.
+        :return: The job id.
+        """
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT INTO jobs (payload, status, available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (json.dumps(payload), PENDING, now, now, now),
+        )
+        return cursor.lastrowid
+
+    def enqueue_file(self, path):
+        """
+        Adds one job per line of a JSONL file.
+
+        :param path: A file with one JSON job payload per line.
+        :return: The list of job ids.
+        """
+        ids = []
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    ids.append(self.enqueue(json.loads(line)))
+        return ids
+
+    def claim(self, max_attempts=3):
+        """
+        Atomically reserves the oldest available job.
+
+        A job whose lease expired was abandoned mid-attempt (e.g. its worker crashed); it is
+        claimed again only while it has attempts left, and marked failed otherwise.
+
+        :param max_attempts: The maximum number of attempts per job (None for no limit).
+        :return: A (job_id, payload, attempts, lease_token) tuple, or None if no job is available.
+        """
+        now = time.time()
+        lease_token = uuid.uuid4().hex
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if max_attempts is not None:
+                self.conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, lease_until = NULL, lease_token = NULL, last_error = ?, updated_at = ?
+                    WHERE status = ? AND lease_until < ? AND attempts >= ?
+                    """,
+                    (FAILED, "Lease expired on the last attempt", now, RUNNING, now, max_attempts),
+                )
+            row = self.conn.execute(
+                """
+                SELECT id, payload, attempts FROM jobs
+                WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?)
+                ORDER BY available_at, id LIMIT 1
+                """,
+                (PENDING, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                """
+                UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, lease_token = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (RUNNING, now + self.lease_seconds, lease_token, now, row[0]),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return row[0], json.loads(row[1]), row[2] + 1, lease_token
+
+    def _update_leased(self, job_id, lease_token, assignments, params):
+        """Applies an UPDATE to a running job only while lease_token still holds its lease."""
+        cursor = self.conn.execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND status = ? AND lease_token = ?",
+            (*params, job_id, RUNNING, lease_token),
+        )
+        if cursor.rowcount != 1:
+            raise LeaseLostError(f"Job {job_id} is no longer leased to this worker")
+
+    def heartbeat(self, job_id, lease_token):
+        """
+        Extends the lease of a claimed job by lease_seconds; call it periodically while the job runs.
+
+        :param job_id: The job id.
+        :param lease_token: The lease token returned by claim.
+        :raises LeaseLostError: If the lease expired and the job was claimed again or finished.
+        """
+        now = time.time()
+        self._update_leased(job_id, lease_token, "lease_until = ?, updated_at = ?", (now + self.lease_seconds, now))
+
+    def complete(self, job_id, lease_token):
+        """
+        Marks a claimed job as done.
+
+        :param job_id: The job id.
+        :param lease_token: The lease token returned by claim.
+        :raises LeaseLostError: If the lease expired and the job was claimed again or finished.
+        """
+        self._update_leased(
+            job_id, lease_token, "status = ?, lease_until = NULL, lease_token = NULL, updated_at = ?", (DONE, time.time())
+        )
+
+    def fail(self, job_id, lease_token, error, attempts, max_attempts=3, backoff_base=2.0, backoff_max=300.0):
+        """
+        Records a failed attempt and schedules a retry with exponential backoff and jitter,
+        or marks the job failed once max_attempts is reached.
+
+        :param job_id: The job id.
+        :param lease_token: The lease token returned by claim.
+        :param error: The error of this attempt.
+        :param attempts: The number of attempts made so far, including this one.
+        :param max_attempts: The maximum number of attempts per job.
+        :param backoff_base: The base of the exponential backoff, in seconds.
+        :param backoff_max: The maximum delay between attempts, in seconds.
+        :return: True if the job will be retried.
+        :raises LeaseLostError: If the lease expired and the job was claimed again or finished.
+        """
+        now = time.time()
+        retry = attempts < max_attempts
+        delay = min(backoff_max, backoff_base ** attempts) * random.uniform(0.5, 1.0)
+        self._update_leased(
+            job_id,
+            lease_token,
+            "status = ?, available_at = ?, lease_until = NULL, lease_token = NULL, last_error = ?, updated_at = ?",
+            (PENDING if retry else FAILED, now + delay if retry else now, str(error), now),
+        )
+        return retry
+
+    def counts(self):
+        """
+        Returns the number of jobs per status.
+
+        :return: A dict mapping each status to its job count.
+        """
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for status, count in self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def close(self):
+        """
+        Closes the underlying SQLite connection.
+        """
+        self.conn.close()
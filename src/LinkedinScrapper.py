@@ -1,25 +1,30 @@
-from apify_client import ApifyClient
 import re
 import os
-from dotenv import load_dotenv
-load_dotenv()
+from .ActorScraper import DEFAULT_CHUNK_SIZE, ActorScraper, AsyncActorScraper
+from .media import is_wanted, media_type
+from .models import MediaPost
 
-class LinkedInPostScraper:
-    def __init__(self, api_token, cookies):
+ACTOR_ID = "curious_coder/linkedin-post-search-scraper"
+
+class LinkedInPostScraper(ActorScraper):
+    ACTOR_ID = ACTOR_ID
+
+    def __init__(self, api_token, cookies, client=None, media_types=None, result_cache=None):
         """
         Initializes the LinkedInPostScraper with the provided Apify API token.
 
         :param api_token: Your Apify API token.
+        :param client: An optional backend exposing the ApifyClient interface (e.g. a ReplayClient)
+                       to run actors on instead of the Apify platform.
+        :param media_types: The shared media types (see src.media) to extract, or None for all of them.
+        :param result_cache: An optional ActorResultCache that serves repeated runs of the same input.
         """
-        if not api_token:
+        if client is None and not api_token:
             raise ValueError("API token must be provided.")
-        
         if not cookies:
             raise ValueError("Cookies Are Required")
-        
-        self.client = ApifyClient(api_token)
+        super().__init__(api_token, client=client, media_types=media_types, result_cache=result_cache)
         self.cookies = cookies
-        self.types = ["image", "document"]
 
     def scrape_profile_posts(self, username,newer_than = None,  max_n=10):
         """
@@ -27,16 +32,58 @@ class LinkedInPostScraper:
 
         :param profile_url: The URL of the LinkedIn profile to scrape.
         :param max_n: The maximum number of posts to retrieve.
-        :return: A list of dictionaries containing post details.
+        :return: A list of MediaPost records containing post details.
+        """
+        return self.scrape_profiles_posts_batch([username], newer_than, max_n)[username]
+
+    def scrape_profile_posts_stream(self, username, newer_than = None, max_n=10):
+        """
+        Scrapes public posts from the given LinkedIn profile, yielding each post as soon as
+        its dataset item has been fetched.
+
+        :param username: The LinkedIn profile username to scrape.
+        :param max_n: The maximum number of posts to retrieve.
+        :return: A generator of MediaPost records containing post details.
+        """
+        return self._scrape_stream(username, newer_than, max_n)
+
+    def scrape_profiles_posts_batch(self, usernames, newer_than = None, max_n=10, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Scrapes public posts for many LinkedIn profiles, packing them into as few actor runs
+        as the chunk size allows and splitting the dataset items back out per profile.
+
+        :param usernames: A list of LinkedIn profile usernames to scrape.
+        :param max_n: The maximum number of posts to retrieve per profile.
+        :param chunk_size: The maximum number of profiles packed into a single actor run.
+        :return: A dict mapping each username to its list of posts (None if its run failed).
+        """
+        return self._scrape_batch(usernames, newer_than, max_n, chunk_size)
+
+    def _profile_url(self, username):
+        """
+        Builds and validates the profile URL of a LinkedIn username.
+
+        :param username: The LinkedIn profile username.
+        :return: The profile URL.
         """
         profile_url = f'https://www.linkedin.com/in/{username}'
-        # Validate the profile URL
         if not self._is_valid_linkedin_profile_url(profile_url):
-            raise ValueError("Invalid LinkedIn profile URL.")
+            raise ValueError(f"Invalid LinkedIn profile URL: {profile_url}")
+        return profile_url
+
+    def _build_run_input(self, profile_urls, max_n):
+        """
+        Prepares the actor input for the given profile URLs.
+
+        The actor takes no date input, so the newer_than window of the scrape methods is not
+        sent; incremental scrapes rely on the state store's seen-ID filter instead.
 
-        # Prepare the actor input
-        run_input = {
-            "urls": [profile_url],
+        :param profile_urls: The profile URLs to scrape in a single run.
+        :param max_n: The maximum number of posts to retrieve per profile.
+        :return: The actor input dictionary.
+        """
+        return {
+            "urls": profile_urls,
             "maxPosts": max_n,
             "resultsLimit": max_n,
             "proxyConfiguration": {
@@ -48,75 +95,66 @@ class LinkedInPostScraper:
             "proxy": {
                 "useApifyProxy": True,
                 "apifyProxyCountry": "US",
-    }
+            }
         }
 
-        try:
-            # Run the Actor and wait for it to finish
-            run = self.client.actor("curious_coder/linkedin-post-search-scraper").call(run_input=run_input)
-        except Exception as e:
-            print(f"An error occurred while running the actor: {e}")
-            return None
-
-        items = self.get_items(run)
-        posts = self.extract_posts(items)
-        return posts
+    def _validate_handle(self, username):
+        self._profile_url(username)
 
-    def get_items(self, run):
-        """
-        Retrieves items from the dataset associated with the Actor run.
+    def _run_input(self, usernames, newer_than, max_n):
+        return self._build_run_input([self._profile_url(username) for username in usernames], max_n)
 
-        :param run: The Actor run object.
-        :return: A list of items retrieved from the dataset.
-        """
-        items = []
-        try:
-            dataset_id = run.get("defaultDatasetId")
-            if not dataset_id:
-                print("No dataset ID found in the run object.")
-                return items
-
-            dataset_client = self.client.dataset(dataset_id)
-            for item in dataset_client.iterate_items():
-                items.append(item)
-        except Exception as e:
-            print(f"An error occurred while fetching items from the dataset: {e}")
-
-        return items
+    def _item_url(self, item):
+        return item.get("inputUrl")
 
     def extract_posts(self, items):
         """
         Extracts posts from the scraped profile data.
 
-        :param items: A list of items from the dataset.
-        :return: A list of dictionaries containing post details.
+        :param items: An iterable of items from the dataset.
+        :return: A list of MediaPost records containing post details.
+        """
+        return list(self.iter_posts(items))
+
+    def iter_posts(self, items):
         """
+        Lazily extracts posts from the scraped profile data, one item at a time.
 
-        posts = []
+        :param items: An iterable of items from the dataset.
+        :return: A generator of MediaPost records containing post details.
+        """
         for item in items:
-            content_type = item.get("type", None)
+            yield from self._posts_from_item(item)
 
+    def _posts_from_item(self, item):
+        post = self._post_from_item(item)
+        return [post] if post else []
 
-            if content_type in self.types:
-                output_format = {
-                "type": content_type,
-                "content_urls": [],
-            }
-                timestamp = item.get("postedAtISO", None)
-                output_format['timestamp'] = timestamp
-                output_format['social_media'] = "linkedin"
-                location = item.get("location", None)
-                output_format['location'] = location
-                if content_type == "image":
-                    output_format['content_urls'] = item['images']
-                elif content_type == "document":
-                    output_format['content_urls'] = item['document']['coverPages']
-                
-                posts.append(output_format)
-            
-
-
-        return posts
+    def _post_from_item(self, item):
+        """
+        Extracts the post of a single dataset item.
+
+        :param item: A single item from the dataset.
+        :return: A MediaPost containing post details, or None for unsupported or filtered out types.
+        """
+        content_type = item.get("type", None)
+        kind = media_type("linkedin", content_type)
+        if kind is None or not is_wanted(kind, self.media_types):
+            return None
+
+        if content_type == "image":
+            content_urls = item['images']
+        else:
+            content_urls = item['document']['coverPages']
+        return MediaPost(
+            content_type,
+            kind,
+            "linkedin",
+            content_urls,
+            item.get("postedAtISO", None),
+            item.get("location", None),
+            item.get("urn", None),
+        )
 
     def _is_valid_linkedin_profile_url(self, url):
         """
@@ -128,6 +166,53 @@ class LinkedInPostScraper:
         pattern = r'^https?://(www\.)?linkedin\.com/in/[^/]+/?$'
         return re.match(pattern, url) is not None
 
+class AsyncLinkedInPostScraper(AsyncActorScraper, LinkedInPostScraper):
+    def __init__(self, api_token, cookies, client=None, media_types=None, result_cache=None):
+        """
+        Initializes the AsyncLinkedInPostScraper, which runs actors on the async Apify client so that
+        starting, polling and paging never block a thread.
+
+        :param api_token: Your Apify API token.
+        :param client: An optional async backend exposing the ApifyClientAsync interface
+                       (e.g. an AsyncReplayClient).
+        :param media_types: The shared media types (see src.media) to extract, or None for all of them.
+        :param result_cache: An optional ActorResultCache that serves repeated runs of the same input.
+        """
+        super().__init__(api_token, cookies, client=client, media_types=media_types, result_cache=result_cache)
+
+    async def scrape_profile_posts(self, username, newer_than = None, max_n=10):
+        """
+        Scrapes posts from the given LinkedIn profile.
+
+        :param username: The LinkedIn profile username to scrape.
+        :param max_n: The maximum number of posts to retrieve.
+        :return: A list of MediaPost records containing post details.
+        """
+        return (await self.scrape_profiles_posts_batch([username], newer_than, max_n))[username]
+
+    def scrape_profile_posts_stream(self, username, newer_than = None, max_n=10):
+        """
+        Scrapes posts from the given LinkedIn profile, yielding each one as soon as its dataset item
+        has been fetched.
+
+        :param username: The LinkedIn profile username to scrape.
+        :param max_n: The maximum number of posts to retrieve.
+        :return: An async generator of MediaPost records containing post details.
+        """
+        return self._scrape_stream(username, newer_than, max_n)
+
+    async def scrape_profiles_posts_batch(self, usernames, newer_than = None, max_n=10, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Scrapes posts for many profiles, packing them into as few concurrent actor runs as
+        the chunk size allows and splitting the dataset items back out per profile.
+
+        :param usernames: A list of LinkedIn profile usernames to scrape.
+        :param max_n: The maximum number of posts to retrieve per profile.
+        :param chunk_size: The maximum number of profiles packed into a single actor run.
+        :return: A dict mapping each profile to its list of posts (None if its run failed).
+        """
+        return await self._scrape_batch(usernames, newer_than, max_n, chunk_size)
+
 if __name__ == "__main__":
     # Import the class
 
@@ -0,0 +1,232 @@
+import io
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from .DescriptionCache import canonical_url
+
+HASH_METHODS = ("dhash", "phash")
+
+# Bit counts of every byte value, for NumPy versions without np.bitwise_count.
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount64(values):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT8[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def load_thumbnail(content, size):
+    """
+    Decodes an image straight to a small grayscale thumbnail.
+
+    JPEGs are decoded through PIL's draft mode, so only a reduced DCT scale is ever decoded.
+
+    Parameters:
+    - content (bytes): The encoded image.
+    - size (tuple): The (width, height) of the thumbnail.
+
+    Returns:
+    - numpy.ndarray: A (height, width) float32 array.
+    """
+    with Image.open(io.BytesIO(content)) as img:
+        if img.format == "JPEG":
+            img.draft("L", (size[0] * 4, size[1] * 4))
+        image = ImageOps.exif_transpose(img).convert("L")
+        image = image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+        return np.asarray(image, dtype=np.float32)
+
+
+def _pack_bits(bits):
+    """Packs an (N, 64) boolean array into N uint64 hashes."""
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def dhash(thumbnails):
+    """
+    Computes 64-bit difference hashes of a batch of 9x8 thumbnails.
+
+    Parameters:
+    - thumbnails (numpy.ndarray): An (N, 8, 9) array.
+
+    Returns:
+    - numpy.ndarray: N uint64 hashes.
+    """
+    bits = thumbnails[:, :, 1:] > thumbnails[:, :, :-1]
+    return _pack_bits(bits.reshape(len(thumbnails), 64))
+
+
+def phash(thumbnails):
+    """
+    Computes 64-bit perceptual (DCT) hashes of a batch of 32x32 thumbnails.
+
+    Parameters:
+    - thumbnails (numpy.ndarray): An (N, 32, 32) array.
+
+    Returns:
+    - numpy.ndarray: N uint64 hashes.
+    """
+    low = (_DCT32 @ thumbnails @ _DCT32.T)[:, :8, :8].reshape(len(thumbnails), 64)
+    # The DC term only encodes overall brightness, so it is left out of the median.
+    medians = np.median(low[:, 1:], axis=1, keepdims=True)
+    return _pack_bits(low > medians)
+
+
+class HammingIndex:
+    def __init__(self, capacity=256):
+        """
+        Initializes an index of 64-bit hashes searchable by Hamming distance.
+
+        Lookups XOR the query against every stored hash at once, so a lookup is a single
+        vectorized pass over a contiguous uint64 buffer.
+
+        :param capacity: The initial number of hashes the buffer holds; it doubles when full.
+        """
+        self._hashes = np.zeros(capacity, dtype=np.uint64)
+        self._values = []
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, hash_value, value):
+        """
+        Stores a hash.
+
+        :param hash_value: The 64-bit hash.
+        :param value: What to return when the hash is matched, e.g. the image URL.
+        """
+        size = len(self._values)
+        if size == len(self._hashes):
+            self._hashes = np.concatenate([self._hashes, np.zeros(size, dtype=np.uint64)])
+        self._hashes[size] = hash_value
+        self._values.append(value)
+
+    def nearest(self, hash_value, max_distance):
+        """
+        Finds the closest stored hash within max_distance bits.
+
+        :param hash_value: The 64-bit hash to look up.
+        :param max_distance: The largest Hamming distance that counts as a match.
+        :return: The value of the closest match, or None.
+        """
+        if not self._values:
+            return None
+        distances = _popcount64(self._hashes[:len(self._values)] ^ np.uint64(hash_value))
+        best = int(np.argmin(distances))
+        return self._values[best] if distances[best] <= max_distance else None
+
+
+class MediaDeduplicator:
+    def __init__(self, method="dhash", max_distance=5):
+        """
+        Initializes a cross-platform image deduplicator.
+
+        Exact duplicates are caught on the canonical URL before anything is downloaded;
+        near-identical images (re-encoded, resized or lightly recompressed cross-posts) are caught
+        on a perceptual hash of the downloaded bytes.
+
+        :param method: "dhash" or "phash".
+        :param max_distance: The largest Hamming distance between two hashes that still counts as
+                             the same image.
+        """
+        if method not in HASH_METHODS:
+            raise ValueError(f"Unknown hash method: {method}. Expected one of {HASH_METHODS}")
+        self.method = method
+        self.max_distance = max_distance
+        self.index = HammingIndex()
+        self.seen_urls = set()
+        # duplicate URL -> the URL of the image that was kept in its place
+        self.duplicates = {}
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def unique_urls(self, urls):
+        """
+        Drops URLs already seen in this run, comparing canonical URLs.
+
+        :param urls: A list of image URLs.
+        :return: The URLs not seen before, in order.
+        """
+        unique = []
+        for url in urls:
+            key = canonical_url(url)
+            if key in self.seen_urls:
+                self.exact_duplicates += 1
+                continue
+            self.seen_urls.add(key)
+            unique.append(url)
+        return unique
+
+    def hash_images(self, contents):
+        """
+        Computes the perceptual hashes of a batch of downloaded images.
+
+        :param contents: A list of encoded images (None entries are skipped).
+        :return: A list of uint64 hashes, None where the image is missing or cannot be decoded.
+        """
+        size = (9, 8) if self.method == "dhash" else (32, 32)
+        thumbnails = []
+        positions = []
+        for position, content in enumerate(contents):
+            if content is None:
+                continue
+            try:
+                thumbnails.append(load_thumbnail(content, size))
+            except Exception as e:
+                print(f"An error occurred while hashing an image: {e}")
+                continue
+            positions.append(position)
+
+        hashes = [None] * len(contents)
+        if thumbnails:
+            batch = np.stack(thumbnails)
+            values = dhash(batch) if self.method == "dhash" else phash(batch)
+            for position, value in zip(positions, values):
+                hashes[position] = int(value)
+        return hashes
+
+    def register(self, urls, hashes):
+        """
+        Adds a batch of hashed images to the index and reports which are near duplicates of
+        images registered earlier (or earlier in the same batch).
+
+        :param urls: The image URLs.
+        :param hashes: Their hashes, as returned by hash_images.
+        :return: The set of URLs that are near duplicates.
+        """
+        duplicates = set()
+        for url, hash_value in zip(urls, hashes):
+            if hash_value is None:
+                continue
+            original = self.index.nearest(hash_value, self.max_distance)
+            if original is not None:
+                self.duplicates[url] = original
+                self.near_duplicates += 1
+                duplicates.add(url)
+            else:
+                self.index.add(hash_value, url)
+        return duplicates
+
+    def stats(self):
+        """
+        Returns the number of duplicates dropped so far.
+
+        :return: A dictionary with the exact and near duplicate counts and the index size.
+        """
+        return {
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "indexed_images": len(self.index),
+        }
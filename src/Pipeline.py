@@ -0,0 +1,321 @@
+import asyncio
+import time
+
+from fastapi import HTTPException
+
+from .DescriptionCache import canonical_url, image_digest
+from .MediaDedup import MediaDeduplicator
+from .VideoKeyframes import keyframe_key
+from .media import VIDEO
+from .model_registry import resolve_model_name
+
+# Marks the end of a stage's input queue.
+_DONE = object()
+
+
+def _keyframes_cache_key(url):
+    # Keyframe descriptions are cached apart from descriptions of the same URL as a whole.
+    return "keyframes:" + canonical_url(url)
+
+
+class StageStats:
+    def __init__(self, name):
+        """
+        Collects the latency of one pipeline stage.
+
+        :param name: The stage name.
+        """
+        self.name = name
+        self.count = 0
+        self.busy_seconds = 0.0
+        self.max_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+
+    def record(self, seconds, queue_wait=0.0):
+        self.count += 1
+        self.busy_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.queue_wait_seconds += queue_wait
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "busy_seconds": self.busy_seconds,
+            "avg_seconds": self.busy_seconds / self.count if self.count else 0.0,
+            "max_seconds": self.max_seconds,
+            "queue_wait_seconds": self.queue_wait_seconds,
+        }
+
+
+class StoryPipeline:
+    def __init__(
+        self,
+        gem,
+        strategy="window",
+        window_size=8,
+        download_workers=4,
+        describe_workers=4,
+        queue_size=16,
+        deduplicate=True,
+        sink=None,
+        describe_videos=False,
+        keyframe_extractor=None,
+        keyframe_workers=2,
+    ):
+        """
+        Initializes a staged scrape -> download -> describe pipeline.
+
+        Each stage runs as its own set of tasks connected by bounded queues, so the images of the
+        first platform to finish are downloaded and described while the other actors are still
+        running, and a slow stage holds back the one before it instead of buffering everything.
+
+        :param gem: The GeminiRunnerClass whose downloader, preprocessor, cache and model are used.
+        :param strategy: How images are packed into requests (see GeminiRunnerClass.window_images).
+                         "all" needs every image, so it only starts downloading once scraping ends.
+        :param window_size: The number of images per request for the "window" strategy.
+        :param download_workers: The number of windows downloaded and preprocessed at once.
+        :param describe_workers: The number of Gemini requests in flight at once.
+        :param queue_size: The maximum number of windows waiting between two stages.
+        :param deduplicate: Whether to drop images cross-posted to several platforms: exact URL
+                            duplicates before windowing, near-identical images (by perceptual
+                            hash) after download, before they reach Gemini.
+        :param sink: An optional PartitionedSink the scraped posts and the descriptions are written
+                     to as they flow through the pipeline.
+        :param describe_videos: Whether to also describe video posts (the scrapers must keep them,
+                                see media_types). Each video is uploaded and described by its own
+                                task as soon as its platform is scraped, alongside the image
+                                windows, at most gem.uploads.max_in_flight at a time.
+        :param keyframe_extractor: An optional KeyframeExtractor. Video posts then go through a
+                                   keyframe stage instead: a few low-resolution keyframes of each
+                                   video are range-read and decoded, and described as one window
+                                   of images, without downloading or uploading the whole file.
+        :param keyframe_workers: The number of videos whose keyframes are extracted at once.
+        """
+        self.gem = gem
+        self.strategy = strategy
+        self.window_size = window_size
+        self.download_workers = download_workers
+        self.describe_workers = describe_workers
+        self.queue_size = queue_size
+        self.deduplicate = deduplicate
+        self.deduplicator = None
+        self.sink = sink
+        self.describe_videos = describe_videos
+        self.keyframe_extractor = keyframe_extractor
+        self.keyframe_workers = keyframe_workers if keyframe_extractor is not None else 0
+        self.stages = {name: StageStats(name) for name in ("scrape", "download", "keyframes", "describe", "video")}
+        self.total_seconds = 0.0
+
+    async def run(self, posts_stream, input_text):
+        """
+        Runs the pipeline to completion.
+
+        :param posts_stream: An async iterable of (platform, handle, posts) tuples, e.g.
+                             SocialMediaScrapper.scrape_all_social_media_stream(...).
+        :param input_text: The prompt sent with every window of images.
+        :return: A list of {"content_urls": [...], "descriptions": ..., "social_media": ...} results,
+                 in completion order (social_media is None for windows mixing platforms). A video
+                 that could not be described has descriptions None and an "error" message.
+        """
+        model_name = resolve_model_name(self.gem.image_model)
+        self._started = time.monotonic()
+        self._results = []
+        self._video_tasks = []
+        self.deduplicator = MediaDeduplicator() if self.deduplicate else None
+        download_queue = asyncio.Queue(self.queue_size)
+        describe_queue = asyncio.Queue(self.queue_size)
+        keyframe_queue = asyncio.Queue(self.queue_size)
+
+        async def downloads():
+            await asyncio.gather(
+                *(self._download(download_queue, describe_queue, input_text, model_name) for _ in range(self.download_workers)),
+                *(self._keyframes(keyframe_queue, describe_queue, input_text, model_name) for _ in range(self.keyframe_workers)),
+            )
+            for _ in range(self.describe_workers):
+                await describe_queue.put(_DONE)
+
+        tasks = [
+            asyncio.ensure_future(self._scrape(posts_stream, download_queue, keyframe_queue, input_text, model_name)),
+            asyncio.ensure_future(downloads()),
+            *(asyncio.ensure_future(self._describe(describe_queue, input_text, model_name)) for _ in range(self.describe_workers)),
+        ]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        failed = [task for task in done if task.exception() is not None]
+        if not failed and self._video_tasks:
+            done, pending = await asyncio.wait(self._video_tasks, return_when=asyncio.FIRST_EXCEPTION)
+            failed = [task for task in done if task.exception() is not None]
+        leftover = [task for task in [*pending, *self._video_tasks] if not task.done()]
+        for task in leftover:
+            task.cancel()
+        # Let the cancelled video tasks delete their uploaded files before returning.
+        await asyncio.gather(*leftover, return_exceptions=True)
+        self.total_seconds = time.monotonic() - self._started
+        if tasks[0] in failed:
+            # Scrape failures (e.g. every platform failed) are not Gemini errors; let them through as is.
+            raise tasks[0].exception()
+        if failed:
+            raise HTTPException(status_code=500, detail=f"Error fetching Gemini response: {failed[0].exception()}")
+        return self._results
+
+    async def _scrape(self, posts_stream, download_queue, keyframe_queue, input_text, model_name):
+        """Window the images of each platform as it arrives and hand the windows to the downloaders."""
+        held = []
+        async for platform, handle, posts in posts_stream:
+            # Scrape latency is the time until the platform's posts became available.
+            self.stages["scrape"].record(time.monotonic() - self._started)
+            if self.sink is not None:
+                self.sink.write_posts(posts, handle=handle)
+            if self.keyframe_extractor is not None:
+                for item in self._new_videos(posts):
+                    await keyframe_queue.put((item, platform, time.monotonic()))
+            elif self.describe_videos:
+                self._start_videos(posts, input_text, model_name)
+            urls = self.gem.image_urls(posts)
+            if self.deduplicator is not None:
+                urls = self.deduplicator.unique_urls(urls)
+            if self.strategy == "all":
+                held.extend(urls)
+                continue
+            for window in self.gem.window_images(urls, self.strategy, self.window_size):
+                await download_queue.put((window, platform, time.monotonic()))
+        for window in self.gem.window_images(held, self.strategy, self.window_size):
+            await download_queue.put((window, None, time.monotonic()))
+        for _ in range(self.download_workers):
+            await download_queue.put(_DONE)
+        for _ in range(self.keyframe_workers):
+            await keyframe_queue.put(_DONE)
+
+    async def _download(self, download_queue, describe_queue, input_text, model_name):
+        """Serve cached windows, or download and preprocess their images for the describers."""
+        gem = self.gem
+        loop = asyncio.get_running_loop()
+        while True:
+            entry = await download_queue.get()
+            if entry is _DONE:
+                return
+            window, platform, queued_at = entry
+            started = time.monotonic()
+            image_keys, cached = None, None
+            if gem.cache is not None and gem.cache_key_by == "url":
+                image_keys, cached, window = gem.lookup_cached(window, input_text, model_name, canonical_url)
+            images = {}
+            if window:
+                contents = dict(zip(window, await gem.downloader.fetch_all(window)))
+                if self.deduplicator is not None:
+                    hashes = await loop.run_in_executor(None, self.deduplicator.hash_images, list(contents.values()))
+                    duplicates = self.deduplicator.register(window, hashes)
+                    window = [url for url in window if url not in duplicates]
+                if gem.cache is not None and gem.cache_key_by == "bytes" and window:
+                    def digest(url):
+                        return image_digest(contents[url]) if contents[url] is not None else url
+                    image_keys, cached, window = gem.lookup_cached(window, input_text, model_name, digest)
+                if window:
+                    images = await loop.run_in_executor(None, self._prepare_images, window, contents)
+            if cached is not None:
+                self._add_result({**cached, "social_media": platform})
+            self.stages["download"].record(time.monotonic() - started, started - queued_at)
+            if images:
+                # The images of the window that still need a model call, for store_cached.
+                requested = {url: image_keys[url] for url in window} if image_keys is not None else None
+                await describe_queue.put((images, requested, list(images), platform, time.monotonic()))
+
+    def _new_videos(self, posts):
+        """The video items of the posts, without the videos already seen in this run."""
+        items = [item for post in posts if post.media_type == VIDEO for item in post.items()]
+        if self.deduplicator is not None:
+            items = [item for item in items if self.deduplicator.unique_urls([item.data])]
+        return items
+
+    def _start_videos(self, posts, input_text, model_name):
+        """Start one describe task per (not yet seen) video of the posts."""
+        for item in self._new_videos(posts):
+            self._video_tasks.append(asyncio.ensure_future(self._describe_video(item, input_text, model_name)))
+
+    async def _describe_video(self, item, input_text, model_name):
+        started = time.monotonic()
+        try:
+            result = await self.gem.describe_video(input_text, model_name, item)
+        except Exception as e:
+            # One failed upload or request must not fail the profile: record it on this video's
+            # result (kept out of the sink) and let the other videos and windows finish.
+            print(f"An error occurred while describing {item.data}: {e}")
+            self._results.append(
+                {"content_urls": [item.data], "descriptions": None, "social_media": item.social_media, "error": str(e)}
+            )
+            return
+        finally:
+            self.stages["video"].record(time.monotonic() - started)
+        self._add_result(result)
+
+    async def _keyframes(self, keyframe_queue, describe_queue, input_text, model_name):
+        """Serve cached videos, or extract and encode their keyframes as one window for the describers."""
+        gem = self.gem
+        loop = asyncio.get_running_loop()
+        while True:
+            entry = await keyframe_queue.get()
+            if entry is _DONE:
+                return
+            item, platform, queued_at = entry
+            started = time.monotonic()
+            image_keys, cached = None, None
+            if gem.cache is not None:
+                image_keys, cached, _ = gem.lookup_cached([item.data], input_text, model_name, _keyframes_cache_key)
+            if cached is not None:
+                self._add_result({**cached, "social_media": platform})
+                self.stages["keyframes"].record(time.monotonic() - started, started - queued_at)
+                continue
+
+            images = await loop.run_in_executor(None, self._prepare_keyframes, item.data)
+            self.stages["keyframes"].record(time.monotonic() - started, started - queued_at)
+            if images:
+                # The keyframes stand for the video: the result is cached under the video's key.
+                await describe_queue.put((images, image_keys, [item.data], platform, time.monotonic()))
+
+    def _prepare_keyframes(self, url):
+        try:
+            frames = self.keyframe_extractor.extract(url)
+        except Exception as e:
+            print(f"An error occurred while extracting keyframes of {url}: {e}")
+            return {}
+        return {keyframe_key(url, seconds): self.gem.preprocessor.encode(image) for seconds, image in frames}
+
+    def _prepare_images(self, window, contents):
+        images = {}
+        for url in window:
+            image = self.gem._prepare_image(url, contents[url])
+            if image is not None:
+                images[url] = image
+        return images
+
+    async def _describe(self, describe_queue, input_text, model_name):
+        """Send each window of prepared images to Gemini and collect the descriptions."""
+        while True:
+            entry = await describe_queue.get()
+            if entry is _DONE:
+                return
+            images, requested, sent, platform, queued_at = entry
+            started = time.monotonic()
+            descriptions = await self.gem.describe_images(input_text, model_name, list(images.values()))
+            self.stages["describe"].record(time.monotonic() - started, started - queued_at)
+            if self.gem.cache is not None and requested is not None:
+                self.gem.store_cached(requested, sent, descriptions, input_text, model_name)
+            self._add_result({"content_urls": list(images), "descriptions": descriptions, "social_media": platform})
+
+    def _add_result(self, result):
+        self._results.append(result)
+        if self.sink is not None:
+            self.sink.write_descriptions([result])
+
+    def stats(self):
+        """
+        Returns the per-stage latency of the last run.
+
+        :return: A dictionary with the total wall time, per stage, the number of items, the busy
+                 and maximum seconds per item, and the time items spent waiting in the stage's queue,
+                 and the deduplication counts.
+        """
+        return {
+            "total_seconds": self.total_seconds,
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+            "dedup": self.deduplicator.stats() if self.deduplicator is not None else None,
+        }
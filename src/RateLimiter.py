@@ -0,0 +1,226 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class RateLimiter:
+    def __init__(self, name, rate=None, burst=None, max_concurrency=None):
+        """
+        Initializes a token-bucket + concurrency limiter for one backend (an actor or a Gemini model).
+
+        Callers that exceed the budget are queued rather than rejected. The same limiter can be used
+        from threads (`with limiter:`) and from coroutines (`async with limiter:`) at the same time.
+
+        :param name: The backend the limiter guards, e.g. "quacker/twitter-scraper".
+        :param rate: The sustained number of calls per second (None for no rate limit).
+        :param burst: The number of calls that may start back to back (defaults to max(1, rate)).
+        :param max_concurrency: The maximum number of calls in flight (None for no limit).
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive.")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self.name = name
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate or 1.0)
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._in_flight = 0
+        self._waiters = deque()
+        self.calls = 0
+        self.waited_calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _reserve_token(self):
+        """Takes a token from the bucket and returns how long to wait before using it."""
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def _refund_token(self):
+        """Returns a reserved token to the bucket, for a call that was cancelled before it started."""
+        if self.rate is None:
+            return
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def _try_take_slot(self, waiter):
+        """Takes a concurrency slot, or queues the waiter; returns True if a slot was taken."""
+        with self._lock:
+            if self.max_concurrency is None or self._in_flight < self.max_concurrency:
+                self._in_flight += 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def _record(self, started):
+        waited = time.monotonic() - started
+        with self._lock:
+            self.calls += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if waited > 0.001:
+                self.waited_calls += 1
+
+    def acquire(self):
+        """
+        Blocks the calling thread until a call may start.
+        """
+        started = time.monotonic()
+        event = threading.Event()
+        if not self._try_take_slot(event):
+            event.wait()
+        delay = self._reserve_token()
+        if delay:
+            time.sleep(delay)
+        self._record(started)
+
+    async def acquire_async(self):
+        """
+        Waits, without blocking the event loop, until a call may start.
+        """
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        if not self._try_take_slot(future):
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    queued = future in self._waiters
+                    if queued:
+                        self._waiters.remove(future)
+                if not queued and future.done() and not future.cancelled():
+                    # The slot was handed over just before the cancellation.
+                    self.release()
+                raise
+        delay = self._reserve_token()
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # __aexit__ never runs when __aenter__ is cancelled, so give back the slot and token here.
+                self.release()
+                self._refund_token()
+                raise
+        self._record(started)
+
+    def release(self):
+        """
+        Frees the concurrency slot of a finished call, handing it to the oldest waiter if any.
+        """
+        with self._lock:
+            if not self._waiters:
+                self._in_flight -= 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter)
+
+    def _hand_over(self, future):
+        if future.done():
+            # The waiter was cancelled in the meantime; pass the slot on.
+            self.release()
+        else:
+            future.set_result(None)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    def stats(self):
+        """
+        Returns the queue-wait metrics of the limiter.
+
+        :return: A dictionary of metrics.
+        """
+        with self._lock:
+            return {
+                "name": self.name,
+                "calls": self.calls,
+                "waited_calls": self.waited_calls,
+                "total_wait_seconds": self.total_wait,
+                "avg_wait_seconds": self.total_wait / self.calls if self.calls else 0.0,
+                "max_wait_seconds": self.max_wait,
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+            }
+
+
+_limiters = {}
+_limits = None
+_registry_lock = threading.Lock()
+
+
+def configure_limits(limits):
+    """
+    Sets the per-backend limits used by get_limiter and drops the limiters created so far.
+
+    Parameters:
+    - limits (dict): Maps a backend name (actor id or Gemini model name) to RateLimiter keyword
+      arguments, e.g. {"quacker/twitter-scraper": {"rate": 0.5, "max_concurrency": 4}}.
+    """
+    global _limits
+    with _registry_lock:
+        _limits = dict(limits)
+        _limiters.clear()
+
+
+def get_limiter(name):
+    """
+    Returns the process-wide limiter of a backend, shared by every scraper and model call.
+
+    Limits come from configure_limits or, failing that, from the RATE_LIMITS environment variable
+    (a JSON object in the configure_limits format). Backends without a configured limit get an
+    unlimited limiter that still records metrics.
+
+    Parameters:
+    - name (str): The backend name.
+
+    Returns:
+    - RateLimiter: The shared limiter.
+    """
+    global _limits
+    limiter = _limiters.get(name)
+    if limiter is not None:
+        return limiter
+    with _registry_lock:
+        if _limits is None:
+            _limits = json.loads(os.getenv("RATE_LIMITS") or "{}")
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(name, **_limits.get(name, {}))
+        return _limiters[name]
+
+
+def limiter_stats():
+    """
+    Returns the queue-wait metrics of every limiter created so far.
+
+    Returns:
+    - dict: Maps each backend name to its metrics.
+    """
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
@@ -0,0 +1,261 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+
+from .ingest import load_dataset
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data original")
+
+# actor id -> recorded dataset, how to read the requested profile URLs from the run input,
+# which item fields carry the profile URL, which carry the post ID, and the run input's per-profile limit.
+ACTOR_FIXTURES = {
+    "quacker/twitter-scraper": {
+        "file": "dataset_twitter-scraper_2024-10-21_08-14-47-308.json",
+        "input_urls": lambda run_input: [f"https://twitter.com/{handle.lstrip('@')}" for handle in run_input.get("handles", [])],
+        "url_fields": ["startUrl"],
+        "id_fields": ["id_str", "id"],
+        "limit_field": "tweetsDesired",
+    },
+    "apify/instagram-scraper": {
+        "file": "insta_post.json",
+        "input_urls": lambda run_input: list(run_input.get("directUrls", [])),
+        "url_fields": ["inputUrl"],
+        "id_fields": ["id"],
+        "limit_field": "resultsLimit",
+    },
+    "apify/facebook-posts-scraper": {
+        "file": "fb_post.json",
+        "input_urls": lambda run_input: [start_url["url"] for start_url in run_input.get("startUrls", [])],
+        "url_fields": ["inputUrl", "facebookUrl"],
+        "id_fields": ["postId"],
+        "limit_field": "resultsLimit",
+    },
+    "curious_coder/linkedin-post-search-scraper": {
+        "file": "linked_post.json",
+        "input_urls": lambda run_input: list(run_input.get("urls", [])),
+        "url_fields": ["inputUrl"],
+        "id_fields": ["urn"],
+        "limit_field": "maxPosts",
+    },
+}
+
+
+class ReplayClient:
+    def __init__(
+        self,
+        data_dir=DATA_DIR,
+        fixtures=None,
+        scale=1,
+        run_latency=0.0,
+        page_latency=0.0,
+        page_size=1000,
+        respect_limits=True,
+        partial_decode=True,
+    ):
+        """
+        Initializes an offline stand-in for ApifyClient that serves recorded actor datasets.
+
+        Every profile URL in a run input gets its own copy of the recorded items, re-pointed at
+        that profile, so batched runs split back out per handle as they would live.
+
+        :param data_dir: The directory holding the recorded datasets.
+        :param fixtures: Overrides for ACTOR_FIXTURES, keyed by actor id.
+        :param scale: How many synthetic copies (with distinct post IDs) of the recording to serve per profile.
+        :param run_latency: Seconds each actor call takes, simulating the actor run.
+        :param page_latency: Seconds each dataset page of page_size items takes to fetch.
+        :param page_size: The number of items per simulated dataset page.
+        :param respect_limits: Whether to cap items per profile at the run input's results limit.
+        :param partial_decode: Whether to decode only the item fields the scrapers read (see src.ingest)
+                               instead of the full recorded items.
+        """
+        if scale < 1:
+            raise ValueError("scale must be at least 1.")
+        self.data_dir = data_dir
+        self.fixtures = {**ACTOR_FIXTURES, **(fixtures or {})}
+        self.scale = scale
+        self.run_latency = run_latency
+        self.page_latency = page_latency
+        self.page_size = page_size
+        self.respect_limits = respect_limits
+        self.partial_decode = partial_decode
+        self.runs = {}
+        self._recordings = {}
+        self._lock = threading.Lock()
+
+    def actor(self, actor_id):
+        """
+        Returns a client for the given actor.
+
+        :param actor_id: The actor id, e.g. "quacker/twitter-scraper".
+        :return: A ReplayActorClient.
+        """
+        if actor_id not in self.fixtures:
+            raise ValueError(f"No recorded dataset for actor: {actor_id}")
+        return ReplayActorClient(self, actor_id)
+
+    def dataset(self, dataset_id):
+        """
+        Returns a client for the dataset of a replayed run.
+
+        :param dataset_id: The defaultDatasetId of a replayed run.
+        :return: A ReplayDatasetClient.
+        """
+        return ReplayDatasetClient(self, dataset_id)
+
+    def recording(self, actor_id):
+        """
+        Loads (once) and returns the recorded items of an actor.
+
+        :param actor_id: The actor id.
+        :return: The list of recorded items.
+        """
+        with self._lock:
+            if actor_id not in self._recordings:
+                path = os.path.join(self.data_dir, self.fixtures[actor_id]["file"])
+                self._recordings[actor_id] = load_dataset(path, actor_id if self.partial_decode else None)
+            return self._recordings[actor_id]
+
+    def start_run(self, actor_id, run_input):
+        """
+        Registers a replayed run and returns its run object.
+
+        :param actor_id: The actor id.
+        :param run_input: The actor input.
+        :return: A run dictionary with a defaultDatasetId.
+        """
+        dataset_id = uuid.uuid4().hex
+        with self._lock:
+            self.runs[dataset_id] = (actor_id, run_input or {})
+        return {"id": dataset_id, "status": "SUCCEEDED", "defaultDatasetId": dataset_id}
+
+    def iter_run_items(self, dataset_id):
+        """
+        Generates the items of a replayed run, without latency.
+
+        :param dataset_id: The defaultDatasetId of the run.
+        :return: A generator of items.
+        """
+        actor_id, run_input = self.runs[dataset_id]
+        fixture = self.fixtures[actor_id]
+        recording = self.recording(actor_id)
+        limit = run_input.get(fixture["limit_field"]) if self.respect_limits else None
+
+        for input_url in fixture["input_urls"](run_input):
+            served = 0
+            for copy in range(self.scale):
+                for item in recording:
+                    if limit is not None and served >= limit:
+                        break
+                    yield self._replayed_item(item, fixture, input_url, copy)
+                    served += 1
+
+    def _replayed_item(self, item, fixture, input_url, copy):
+        item = dict(item)
+        for field in fixture["url_fields"]:
+            item[field] = input_url
+        if copy:
+            for field in fixture["id_fields"]:
+                if item.get(field) is not None:
+                    item[field] = f"{item[field]}-{copy}"
+        return item
+
+
+class ReplayActorClient:
+    def __init__(self, client, actor_id):
+        self.client = client
+        self.actor_id = actor_id
+
+    def call(self, run_input=None, **kwargs):
+        """
+        Replays an actor run, sleeping for the configured run latency.
+
+        :param run_input: The actor input.
+        :return: The run object.
+        """
+        if self.client.run_latency:
+            time.sleep(self.client.run_latency)
+        return self.client.start_run(self.actor_id, run_input)
+
+
+class ReplayDatasetClient:
+    def __init__(self, client, dataset_id):
+        self.client = client
+        self.dataset_id = dataset_id
+
+    def iterate_items(self, **kwargs):
+        """
+        Yields the items of the replayed run, sleeping for the page latency before every page.
+
+        :return: A generator of items.
+        """
+        for index, item in enumerate(self.client.iter_run_items(self.dataset_id)):
+            if self.client.page_latency and index % self.client.page_size == 0:
+                time.sleep(self.client.page_latency)
+            yield item
+
+
+class AsyncReplayClient(ReplayClient):
+    """
+    Offline stand-in for ApifyClientAsync: serves the same recordings as ReplayClient, with
+    latencies simulated by asyncio.sleep so replayed runs never block the event loop.
+    """
+
+    def actor(self, actor_id):
+        if actor_id not in self.fixtures:
+            raise ValueError(f"No recorded dataset for actor: {actor_id}")
+        return AsyncReplayActorClient(self, actor_id)
+
+    def dataset(self, dataset_id):
+        return AsyncReplayDatasetClient(self, dataset_id)
+
+
+class AsyncReplayActorClient(ReplayActorClient):
+    async def call(self, run_input=None, **kwargs):
+        """
+        Replays an actor run, awaiting the configured run latency.
+
+        :param run_input: The actor input.
+        :return: The run object.
+        """
+        if self.client.run_latency:
+            await asyncio.sleep(self.client.run_latency)
+        return self.client.start_run(self.actor_id, run_input)
+
+
+class AsyncReplayDatasetClient(ReplayDatasetClient):
+    async def iterate_items(self, **kwargs):
+        """
+        Yields the items of the replayed run, awaiting the page latency before every page.
+
+        :return: An async generator of items.
+        """
+        for index, item in enumerate(self.client.iter_run_items(self.dataset_id)):
+            if self.client.page_latency and index % self.client.page_size == 0:
+                await asyncio.sleep(self.client.page_latency)
+            yield item
+
+
+def create_client(backend="apify", api_token=None, asynchronous=False, **options):
+    """
+    Creates the backend the scrapers run their actors on.
+
+    Parameters:
+    - backend (str): "apify" for the live Apify platform or "replay" for the recorded datasets.
+    - api_token (str): The Apify API token (required for "apify").
+    - asynchronous (bool): Whether to create the async client used by the Async* scrapers.
+    - options: Extra keyword arguments for ReplayClient.
+
+    Returns:
+    - An object exposing actor(...).call(...) and dataset(...).iterate_items()
+      (ApifyClient, ApifyClientAsync, ReplayClient or AsyncReplayClient).
+    """
+    if backend == "apify":
+        if not api_token:
+            raise ValueError("API token must be provided.")
+        from apify_client import ApifyClient, ApifyClientAsync
+        return ApifyClientAsync(api_token) if asynchronous else ApifyClient(api_token)
+    if backend == "replay":
+        return AsyncReplayClient(**options) if asynchronous else ReplayClient(**options)
+    raise ValueError(f"Unknown scraper backend: {backend}")
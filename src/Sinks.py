@@ -0,0 +1,315 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from .models import to_json_compatible
+from .timestamps import normalize_timestamp
+
+# pyarrow is optional and slow to import, so it is loaded by _load_pyarrow() only once a
+# Parquet sink or reader is created; JSONL-only processes never pay for it.
+pa = None
+pq = None
+_pyarrow_checked = False
+
+FORMATS = ("parquet", "jsonl")
+
+
+class JsonlSink:
+    def __init__(self, path):
+        """
+        Initializes a sink that appends one JSON record per line to a file.
+
+        Each record is written with a single append-mode write, so several worker
+        processes can share the same file without interleaving lines.
+
+        :param path: The JSONL file to append to.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def write(self, record):
+        """
+        Appends a record.
+
+        :param record: A JSON-serializable record; MediaPost records are written in their dict shape.
+        """
+        line = (json.dumps(record, default=to_json_compatible) + "\n").encode("utf-8")
+        with self._lock:
+            os.write(self._fd, line)
+
+    def close(self):
+        """
+        Closes the file.
+        """
+        with self._lock:
+            os.close(self._fd)
+
+
+def _load_pyarrow():
+    """Imports pyarrow on first use; returns whether it is available."""
+    global pa, pq, _pyarrow_checked
+    if not _pyarrow_checked:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            pa, pq = pyarrow, pyarrow.parquet
+        except ImportError:
+            pass
+        _pyarrow_checked = True
+    return pa is not None
+
+
+def _arrow_schemas():
+    # Partition columns live in the directory names, not in the files.
+    return {
+        "posts": pa.schema([
+            ("type", pa.string()),
+            ("media_type", pa.string()),
+            ("content_urls", pa.list_(pa.string())),
+            ("timestamp", pa.string()),
+            ("location", pa.string()),
+            ("post_id", pa.string()),
+            ("handle", pa.string()),
+            ("job_id", pa.int64()),
+        ]),
+        "descriptions": pa.schema([
+            ("content_urls", pa.list_(pa.string())),
+            ("descriptions", pa.string()),
+            ("handle", pa.string()),
+            ("job_id", pa.int64()),
+        ]),
+    }
+
+
+def _partition_date(timestamp, platform):
+    try:
+        return normalize_timestamp(timestamp, platform)[:10]
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, default=str)
+
+
+class PartitionedSink:
+    def __init__(self, root, format="parquet", row_group_size=10000, max_open_writers=64):
+        """
+        Initializes a sink that writes normalized posts and Gemini descriptions as columnar
+        Parquet files, partitioned by platform and date, while the pipeline streams.
+
+        Rows are buffered per partition and written one row group at a time, so memory stays
+        bounded by row_group_size rows per open partition. Files are laid out Hive-style:
+        <root>/<table>/social_media=<platform>/date=<YYYY-MM-DD>/part-<writer>[-<n>].parquet. Each
+        sink writes its own part files, so several worker processes can share a root.
+
+        At most max_open_writers part files are open at once: opening another one closes the
+        least recently used, and a Parquet partition written to again rolls over to a new part
+        file. commit() makes every row written so far durable; callers group many jobs into one
+        commit (see uncommitted_rows) so that part files and row groups stay large.
+
+        When pyarrow is not installed (or format="jsonl"), the same layout is written as JSONL
+        part files instead.
+
+        :param root: The dataset directory.
+        :param format: "parquet" or "jsonl".
+        :param row_group_size: The number of rows per Parquet row group.
+        :param max_open_writers: The most part files kept open at once.
+        """
+        if max_open_writers < 1:
+            raise ValueError("max_open_writers must be at least 1.")
+        if format not in FORMATS:
+            raise ValueError(f"Unknown sink format: {format}. Expected one of {FORMATS}")
+        if format == "parquet" and not _load_pyarrow():
+            print("pyarrow is not installed; writing JSONL part files instead of Parquet.")
+            format = "jsonl"
+        self.root = root
+        self.format = format
+        self.row_group_size = row_group_size
+        self.part_name = f"part-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.schemas = _arrow_schemas() if format == "parquet" else None
+        self._buffers = {}
+        self.max_open_writers = max_open_writers
+        self._writers = OrderedDict()
+        self._parts = {}
+        # Rows added since the last commit.
+        self.uncommitted_rows = 0
+        self._lock = threading.Lock()
+
+    def write_posts(self, posts, handle=None, job_id=None):
+        """
+        Adds normalized posts.
+
+        :param posts: MediaPost records.
+        :param handle: The handle the posts were scraped from.
+        :param job_id: The job the posts belong to.
+        """
+        for post in posts:
+            self._add("posts", post.social_media, _partition_date(post.timestamp, post.social_media), {
+                "type": post.type,
+                "media_type": post.media_type,
+                "content_urls": list(post.content_urls),
+                "timestamp": post.timestamp,
+                "location": _text(post.location),
+                "post_id": _text(post.post_id),
+                "handle": handle,
+                "job_id": job_id,
+            })
+
+    def write_descriptions(self, results, handle=None, job_id=None):
+        """
+        Adds Gemini results, partitioned by their platform and the day they were described.
+
+        :param results: {"content_urls": [...], "descriptions": ..., "social_media": ...} results.
+        :param handle: The handle the images were scraped from.
+        :param job_id: The job the results belong to.
+        """
+        date = time.strftime("%Y-%m-%d", time.gmtime())
+        for result in results:
+            self._add("descriptions", result.get("social_media"), date, {
+                "content_urls": list(result.get("content_urls") or []),
+                "descriptions": _text(result.get("descriptions")),
+                "handle": handle,
+                "job_id": job_id,
+            })
+
+    def _add(self, table, platform, date, row):
+        partition = (table, platform or "unknown", date or "unknown")
+        with self._lock:
+            self.uncommitted_rows += 1
+            if self.format == "jsonl":
+                self._writer(partition).write({"social_media": partition[1], "date": partition[2], **row})
+                return
+            rows = self._buffers.setdefault(partition, [])
+            rows.append(row)
+            if len(rows) >= self.row_group_size:
+                self._flush_partition(partition)
+
+    def _writer(self, partition):
+        writer = self._writers.get(partition)
+        if writer is not None:
+            self._writers.move_to_end(partition)
+            return writer
+        while len(self._writers) >= self.max_open_writers:
+            self._close_writer(next(iter(self._writers)))
+        table, platform, date = partition
+        directory = os.path.join(self.root, table, f"social_media={platform}", f"date={date}")
+        os.makedirs(directory, exist_ok=True)
+        if self.format == "jsonl":
+            # JSONL part files can simply be appended to again after being closed.
+            writer = JsonlSink(os.path.join(directory, f"{self.part_name}.jsonl"))
+        else:
+            # A closed Parquet file is final, so each reopening gets the next part number.
+            part = self._parts.get(partition, 0)
+            self._parts[partition] = part + 1
+            name = f"{self.part_name}-{part}" if part else self.part_name
+            writer = pq.ParquetWriter(os.path.join(directory, f"{name}.parquet"), self.schemas[table], compression="zstd")
+        self._writers[partition] = writer
+        return writer
+
+    def _close_writer(self, partition):
+        writer = self._writers.pop(partition, None)
+        if writer is not None:
+            writer.close()
+
+    def _flush_partition(self, partition):
+        rows = self._buffers.pop(partition, None)
+        if rows:
+            batch = pa.Table.from_pylist(rows, schema=self.schemas[partition[0]])
+            self._writer(partition).write_table(batch, row_group_size=self.row_group_size)
+
+    def flush(self):
+        """
+        Writes every buffered partition out as a (possibly short) row group.
+        """
+        with self._lock:
+            for partition in list(self._buffers):
+                self._flush_partition(partition)
+
+    def commit(self):
+        """
+        Makes every row written so far durable: the buffers are flushed and the part files
+        closed (finalizing the Parquet footers), so the jobs that wrote them can be acknowledged.
+        Each commit ends the current part files, so commit once per batch of jobs, not per job.
+        """
+        with self._lock:
+            for partition in list(self._buffers):
+                self._flush_partition(partition)
+            while self._writers:
+                self._close_writer(next(iter(self._writers)))
+            self.uncommitted_rows = 0
+
+    def close(self):
+        """
+        Flushes the buffers and closes every part file, which finalizes the Parquet footers.
+        """
+        self.commit()
+
+
+def read_table(root, table="posts", columns=None, filter=None):
+    """
+    Reads a partitioned Parquet table written by PartitionedSink through memory-mapped files.
+
+    Parameters:
+    - root (str): The dataset directory.
+    - table (str): "posts" or "descriptions".
+    - columns (list): The columns to read (all by default), including the social_media and date
+      partition columns.
+    - filter (pyarrow.dataset.Expression): A row filter; filters on social_media/date skip
+      whole partitions, e.g. pyarrow.dataset.field("social_media") == "x".
+
+    Returns:
+    - pyarrow.Table: The matching rows.
+    """
+    if not _load_pyarrow():
+        raise ImportError("pyarrow is required to read Parquet tables; use iter_jsonl_table for JSONL sinks.")
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    dataset = ds.dataset(
+        os.path.abspath(os.path.join(root, table)),
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("social_media", pa.string()), ("date", pa.string())]), flavor="hive"),
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+    return dataset.to_table(columns=columns, filter=filter)
+
+
+def iter_jsonl_table(root, table="posts", platform=None, date=None):
+    """
+    Reads back a table written by PartitionedSink in JSONL format, one partition at a time.
+
+    Parameters:
+    - root (str): The dataset directory.
+    - table (str): "posts" or "descriptions".
+    - platform (str): Only read this platform's partitions.
+    - date (str): Only read this date's partitions ('YYYY-MM-DD').
+
+    Returns:
+    - A generator of row dictionaries.
+    """
+    table_dir = os.path.join(root, table)
+    if not os.path.isdir(table_dir):
+        return
+    for platform_dir in sorted(os.listdir(table_dir)):
+        if platform is not None and platform_dir != f"social_media={platform}":
+            continue
+        for date_dir in sorted(os.listdir(os.path.join(table_dir, platform_dir))):
+            if date is not None and date_dir != f"date={date}":
+                continue
+            directory = os.path.join(table_dir, platform_dir, date_dir)
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".jsonl"):
+                    with open(os.path.join(directory, name), "r") as f:
+                        for line in f:
+                            if line.strip():
+                                yield json.loads(line)
@@ -0,0 +1,126 @@
+import json
+import sqlite3
+import threading
+
+
+class HighWaterMarkStore:
+    def __init__(self, path="scrape_state.sqlite3", max_seen_ids=1000):
+        """
+        Initializes a local store of per-(platform, handle) high-water marks, used to scrape
+        only posts newer than the last run and to drop posts that were already seen.
+
+        The store is backed by SQLite and every update is merged inside a write transaction, so
+        several worker processes can share it without overwriting each other's marks.
+
+        :param path: The SQLite file backing the store.
+        :param max_seen_ids: The number of most recent post IDs remembered per handle.
+        """
+        self.path = path
+        self.max_seen_ids = max_seen_ids
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS marks (
+                key TEXT PRIMARY KEY,
+                timestamp TEXT,
+                seen_ids TEXT NOT NULL
+            )
+            """
+        )
+
+    def _key(self, platform, handle):
+        return f"{platform}:{handle.lstrip('@').lower()}"
+
+    def _read(self, key):
+        row = self.conn.execute("SELECT timestamp, seen_ids FROM marks WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return {"timestamp": None, "seen_ids": []}
+        return {"timestamp": row[0], "seen_ids": json.loads(row[1])}
+
+    def get(self, platform, handle):
+        """
+        Returns the recorded state of a handle.
+
+        :param platform: The social media platform, e.g. "x" or "instagram".
+        :param handle: The handle on that platform.
+        :return: A dict with the newest seen "timestamp" (or None) and the "seen_ids" list.
+        """
+        with self._lock:
+            return self._read(self._key(platform, handle))
+
+    def newer_than(self, platform, handle, default=None):
+        """
+        Computes the start of the delta window to request from the actor for a handle.
+
+        :param platform: The social media platform.
+        :param handle: The handle on that platform.
+        :param default: The 'YYYY-MM-DD' date to use when nothing newer was recorded.
+        :return: The later of default and the date of the newest seen post, as 'YYYY-MM-DD'.
+        """
+        timestamp = self.get(platform, handle)["timestamp"]
+        if not timestamp:
+            return default
+        newest_date = timestamp[:10]
+        if default is None or newest_date > default:
+            return newest_date
+        return default
+
+    def filter_new(self, platform, handle, posts):
+        """
+        Drops posts that were already seen for a handle.
+
+        :param platform: The social media platform.
+        :param handle: The handle on that platform.
+        :param posts: MediaPost records carrying a post_id and a UTC timestamp.
+        :return: The posts that were not seen before.
+        """
+        seen = set(self.get(platform, handle)["seen_ids"])
+        return [post for post in posts if post.post_id is None or post.post_id not in seen]
+
+    def update(self, platform, handle, posts):
+        """
+        Records the newest timestamp and the post IDs of posts that were fully processed.
+
+        Call it only once the posts are safely handled (described, written to the sink, ...):
+        posts recorded here are skipped by later runs.
+
+        :param platform: The social media platform.
+        :param handle: The handle on that platform.
+        :param posts: MediaPost records carrying a post_id and a UTC timestamp.
+        """
+        if not posts:
+            return
+        key = self._key(platform, handle)
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock before reading, so concurrent processes merge
+            # their updates instead of the last writer winning.
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                entry = self._read(key)
+                timestamps = [post.timestamp for post in posts if post.timestamp]
+                if entry["timestamp"]:
+                    timestamps.append(entry["timestamp"])
+                seen_ids = entry["seen_ids"]
+                seen = set(seen_ids)
+                for post in posts:
+                    post_id = post.post_id
+                    if post_id is not None and post_id not in seen:
+                        seen_ids.append(post_id)
+                        seen.add(post_id)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO marks (key, timestamp, seen_ids) VALUES (?, ?, ?)",
+                    (key, max(timestamps) if timestamps else None, json.dumps(seen_ids[-self.max_seen_ids:])),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        """
+        Closes the underlying SQLite connection.
+        """
+        with self._lock:
+            self.conn.close()
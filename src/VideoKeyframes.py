@@ -0,0 +1,206 @@
+import io
+import threading
+
+import requests
+
+from .tracing import span
+
+try:
+    import av
+except ImportError:
+    av = None
+
+
+class HttpRangeFile(io.RawIOBase):
+    def __init__(self, url, session=None, block_size=256 * 1024, max_bytes=16 * 1024 * 1024, timeout=30):
+        """
+        Initializes a read-only, seekable file over HTTP that fetches only the byte ranges read.
+
+        Reads are served from fixed-size blocks fetched with Range requests, so a demuxer that
+        reads the MP4 index and then seeks to a few keyframes downloads just those parts. Servers
+        that ignore Range get a single streamed download, capped at max_bytes.
+
+        :param url: The file URL.
+        :param session: The requests.Session to use (a new one when None).
+        :param block_size: The size of each fetched block.
+        :param max_bytes: The most bytes fetched for this file; reading past it raises IOError.
+        :param timeout: The per-request timeout in seconds.
+        """
+        super().__init__()
+        self.url = url
+        self.session = session or requests.Session()
+        self.block_size = block_size
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.blocks = {}
+        self.bytes_fetched = 0
+        self.requests = 0
+        self.position = 0
+        self.size = None
+        self._fetch(0, 0)
+
+    def _fetch(self, first, last):
+        """Fetches blocks first..last (inclusive) with one Range request."""
+        start = first * self.block_size
+        end = (last + 1) * self.block_size - 1
+        if self.size is not None:
+            end = min(end, self.size - 1)
+        if self.bytes_fetched + end - start + 1 > self.max_bytes:
+            raise IOError(f"Reading {self.url} would exceed {self.max_bytes} bytes")
+        response = self.session.get(
+            self.url, headers={"Range": f"bytes={start}-{end}"}, timeout=self.timeout, stream=True
+        )
+        self.requests += 1
+        with response:
+            response.raise_for_status()
+            if response.status_code == 206:
+                data = response.content
+                if self.size is None:
+                    self.size = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+            else:
+                # No range support: the whole file arrives; keep it only if it fits the budget.
+                data = bytearray()
+                for chunk in response.iter_content(chunk_size=self.block_size):
+                    data += chunk
+                    if self.bytes_fetched + len(data) > self.max_bytes:
+                        raise IOError(f"{self.url} does not support range requests and exceeds {self.max_bytes} bytes")
+                data = bytes(data)
+                self.size = len(data)
+                first = 0
+        self.bytes_fetched += len(data)
+        for offset in range(0, len(data), self.block_size):
+            self.blocks[first + offset // self.block_size] = data[offset:offset + self.block_size]
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"Unsupported whence: {whence}")
+        return self.position
+
+    def readinto(self, buffer):
+        if self.position >= self.size:
+            return 0
+        end = min(self.position + len(buffer), self.size)
+        first = self.position // self.block_size
+        last = (end - 1) // self.block_size
+        missing = [block for block in range(first, last + 1) if block not in self.blocks]
+        if missing:
+            self._fetch(missing[0], missing[-1])
+        data = b"".join(self.blocks[block] for block in range(first, last + 1))
+        offset = self.position - first * self.block_size
+        chunk = data[offset:offset + end - self.position]
+        buffer[:len(chunk)] = chunk
+        self.position += len(chunk)
+        return len(chunk)
+
+
+class KeyframeExtractor:
+    def __init__(self, frames_per_video=4, max_edge=512, max_bytes=16 * 1024 * 1024, block_size=256 * 1024, timeout=30):
+        """
+        Initializes an extractor that turns a video URL into a few low-resolution keyframes.
+
+        The video is read through HttpRangeFile, so only the container index and the packets of
+        the chosen keyframes are downloaded. The decoder skips every non-key frame and the frames
+        are scaled down while converting to RGB. Requires PyAV (`pip install av`).
+
+        :param frames_per_video: The number of keyframes taken, spread evenly over the video.
+        :param max_edge: The maximum width/height, in pixels, of the returned frames.
+        :param max_bytes: The most bytes downloaded per video.
+        :param block_size: The size of each range request.
+        :param timeout: The per-request timeout in seconds.
+        """
+        if av is None:
+            raise ImportError("PyAV is required to extract video keyframes: pip install av")
+        if frames_per_video < 1:
+            raise ValueError("frames_per_video must be at least 1.")
+        self.frames_per_video = frames_per_video
+        self.max_edge = max_edge
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        # One keep-alive session per worker thread; requests.Session is not thread-safe.
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def extract(self, url):
+        """
+        Decodes up to frames_per_video keyframes of a video.
+
+        :param url: The video URL, e.g. an X video/mp4 variant or an Instagram videoUrl.
+        :return: A list of (seconds, PIL.Image) tuples in time order; may hold fewer frames when
+                 the video has fewer keyframes.
+        """
+        frames = []
+        with span("keyframes") as keyframes_span:
+            source = HttpRangeFile(url, self._session(), self.block_size, self.max_bytes, self.timeout)
+            try:
+                with av.open(source) as container:
+                    frames = self._decode_keyframes(container)
+            finally:
+                keyframes_span.set(frames=len(frames), bytes=source.bytes_fetched, requests=source.requests, size=source.size)
+                source.close()
+        return frames
+
+    def _decode_keyframes(self, container):
+        stream = container.streams.video[0]
+        stream.codec_context.skip_frame = "NONKEY"
+        time_base = stream.time_base
+        if stream.duration is not None:
+            duration = float(stream.duration * time_base)
+        elif container.duration is not None:
+            duration = container.duration / av.time_base
+        else:
+            duration = 0.0
+
+        frames = []
+        seen = set()
+        targets = [duration * (i + 0.5) / self.frames_per_video for i in range(self.frames_per_video)] if duration else [0.0]
+        for target in targets:
+            container.seek(int(target / time_base), stream=stream, backward=True, any_frame=False)
+            for frame in container.decode(stream):
+                if frame.pts is not None and frame.pts not in seen:
+                    seen.add(frame.pts)
+                    frames.append((float(frame.pts * time_base), self._to_image(frame)))
+                break
+        return sorted(frames, key=lambda entry: entry[0])
+
+    def _to_image(self, frame):
+        """Converts a frame to RGB, scaled down so its longest edge is at most max_edge."""
+        scale = min(1.0, self.max_edge / max(frame.width, frame.height))
+        width = max(2, int(frame.width * scale) // 2 * 2)
+        height = max(2, int(frame.height * scale) // 2 * 2)
+        return frame.to_image(width=width, height=height)
+
+
+def keyframe_key(url, seconds):
+    """
+    Returns the key of a keyframe in the image results: the video URL with a media fragment
+    (#t=<seconds>), so descriptions can be traced back to the video and moment they show.
+
+    Parameters:
+    - url (str): The video URL.
+    - seconds (float): The frame's timestamp.
+
+    Returns:
+    - str: The keyframe key.
+    """
+    return f"{url}#t={seconds:.2f}"
@@ -1,18 +1,14 @@
-from apify_client import ApifyClient
 import re
 import os
-from dotenv import load_dotenv
-load_dotenv()
-class XScraper:
-    def __init__(self, api_token):
-        """
-        Initializes the XScraper with the provided Apify API token.
+from .ActorScraper import DEFAULT_CHUNK_SIZE, ActorScraper, AsyncActorScraper
+from .tracing import increment
+from .media import PHOTO, VIDEO, is_wanted, media_type
+from .models import MediaPost
 
-        :param api_token: Your Apify API token.
-        """
-        if not api_token:
-            raise ValueError("API token must be provided.")
-        self.client = ApifyClient(api_token)
+ACTOR_ID = "quacker/twitter-scraper"
+
+class XScraper(ActorScraper):
+    ACTOR_ID = ACTOR_ID
 
     def scrape_tweets(self, twitter_handle, newer_than = None, max_n=100 ):
         """
@@ -20,123 +16,134 @@ class XScraper:
 
         :param twitter_handle: The Twitter handle of the user to scrape tweets from.
         :param max_n: The maximum number of tweets to retrieve.
-        :return: A list of dictionaries containing tweet details.
+        :return: A list of MediaPost records containing tweet details.
         """
-        # Validate the Twitter handle
-        if not self._is_valid_twitter_handle(twitter_handle):
-            raise ValueError("Invalid Twitter handle.")
+        return self.scrape_tweets_batch([twitter_handle], newer_than, max_n)[twitter_handle]
+
+    def scrape_tweets_stream(self, twitter_handle, newer_than = None, max_n=100):
+        """
+        Scrapes tweets from the given Twitter handle, yielding each normalized tweet as soon
+        as its dataset item has been fetched.
+
+        :param twitter_handle: The Twitter handle of the user to scrape tweets from.
+        :param max_n: The maximum number of tweets to retrieve.
+        :return: A generator of MediaPost records containing tweet details.
+        """
+        return self._scrape_stream(twitter_handle, newer_than, max_n)
+
+    def scrape_tweets_batch(self, twitter_handles, newer_than = None, max_n=100, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Scrapes tweets for many Twitter handles, packing them into as few actor runs as
+        the chunk size allows and splitting the dataset items back out per handle.
+
+        :param twitter_handles: A list of Twitter handles to scrape tweets from.
+        :param max_n: The maximum number of tweets to retrieve per handle.
+        :param chunk_size: The maximum number of handles packed into a single actor run.
+        :return: A dict mapping each handle to its list of tweets (None if its run failed).
+        """
+        return self._scrape_batch(twitter_handles, newer_than, max_n, chunk_size)
+
+    def _build_run_input(self, twitter_handles, max_n):
+        """
+        Prepares the Actor input for the given Twitter handles.
+
+        The actor takes no date input, so the newer_than window of the scrape methods is not
+        sent; incremental scrapes rely on the state store's seen-ID filter instead.
 
-        # Prepare the Actor input
-        run_input = {
-            "handles": [twitter_handle],
+        :param twitter_handles: The Twitter handles to scrape in a single run.
+        :param max_n: The maximum number of tweets to retrieve per handle.
+        :return: The Actor input dictionary.
+        """
+        return {
+            "handles": twitter_handles,
             "tweetsDesired": max_n,
             "proxyConfig": { "useApifyProxy": True },
         }
 
-        try:
-            # Run the Actor and wait for it to finish
-            run = self.client.actor("quacker/twitter-scraper").call(run_input=run_input)
-        except Exception as e:
-            print(f"An error occurred while running the actor: {e}")
-            return None
+    def _validate_handle(self, twitter_handle):
+        if not self._is_valid_twitter_handle(twitter_handle):
+            raise ValueError(f"Invalid Twitter handle: {twitter_handle}")
 
-        items = self.get_items(run)
-        
-        tweets = self.extract_tweets(items)
-        return tweets
+    def _run_input(self, twitter_handles, newer_than, max_n):
+        return self._build_run_input(twitter_handles, max_n)
+
+    def _item_url(self, item):
+        return item.get("startUrl")
 
-    def get_items(self, run):
+    def extract_tweets(self, items):
         """
-        Retrieves items from the dataset associated with the Actor run.
+        Extracts tweets from the scraped dataset.
 
-        :param run: The Actor run object.
-        :return: A list of items retrieved from the dataset.
+        :param items: An iterable of items from the dataset.
+        :return: A list of MediaPost records containing tweet details.
         """
-        items = []
-        try:
-            dataset_id = run.get("defaultDatasetId")
-            if not dataset_id:
-                print("No dataset ID found in the run object.")
-                return items
+        return list(self.iter_tweets(items))
 
-            dataset_client = self.client.dataset(dataset_id)
-            for item in dataset_client.iterate_items():
-                items.append(item)
-        except Exception as e:
-            print(f"An error occurred while fetching items from the dataset: {e}")
+    def iter_tweets(self, items):
+        """
+        Lazily extracts tweets from the scraped dataset, one item at a time.
 
-        return items
+        :param items: An iterable of items from the dataset.
+        :return: A generator of MediaPost records containing tweet details.
+        """
+        for item in items:
+            yield from self._posts_from_item(item)
 
-    def extract_tweets(self, items):
+    def _posts_from_item(self, item):
         """
-        Extracts tweets from the scraped dataset.
+        Extracts the media entries of a single tweet (and of the tweet it quotes).
 
-        :param items: A list of items from the dataset.
-        :return: A list of dictionaries containing tweet details.
+        :param item: A single item from the dataset.
+        :return: A list of MediaPost records containing tweet details.
         """
         tweets = []
-        for item in items:
-           output_format = {
-               "type": "",
-               "content_urls": []
-               
-           }
-           output_format['social_media'] = "x"
-           timestamp = item.get("created_at", None)
-           location = item.get("location", None)
-           output_format['timestamp'] = timestamp
-           output_format['location'] = location
-                
-           if item.get("entities"):
-               if item['entities'].get("media"):
-                   for med in  item['entities'].get("media"):
-                       output_format['type'] = med['type']
-
-                       if med['type'] == "photo":
-                           print("entered photo")
-                           output_format['content_urls'] = [med['media_url_https']]
-                       elif med['type'] == "video":
-                           video_info_variants = med['video_info']['variants']
-                           for vid in video_info_variants:
-                               if vid['content_type' ] == "video/mp4":
-                                    output_format['content_urls'] = [vid['url']]
-                                    break
-                       else:
-                           print("Triggered a different Media-type")
-                       tweets.append(output_format)
-               else:
-                   print("No media")
-           if item.get('quoted_status'):
-               if item['quoted_status'].get("entities"):
-                   for med in  item['quoted_status']['entities']['media']:
-                       output_format['type'] = med['type']
-
-                       if med['type'] == "photo":
-                           print("entered photo")
-                           output_format['content_urls'] = [med['media_url_https']]
-                       elif med['type'] == "video":
-                           video_info_variants = med['video_info']['variants']
-                           for vid in video_info_variants:
-                               if vid['content_type' ] == "video/mp4":
-                                    output_format['content_urls'] = [vid['url']]
-                                    break
-                       else:
-                           print("Triggered a different Media-type")
-                       tweets.append(output_format)
-               else:
-                   print("No qouted texted entities")
-           else:
-               print("Neither entities nor quoted status found")
-               
-                   
+        timestamp = item.get("created_at", None)
+        location = item.get("location", None)
+        post_id = item.get("id_str", None)
+
+        if item.get("entities"):
+            if item['entities'].get("media"):
+                for med in item['entities'].get("media"):
+                    output = self._media_to_output(med, timestamp, location, post_id)
+                    if output:
+                        tweets.append(output)
+            else:
+                increment("normalize_skipped", platform="x", reason="no_media")
+        if item.get('quoted_status'):
+            if item['quoted_status'].get("entities"):
+                for med in item['quoted_status']['entities'].get('media', []):
+                    output = self._media_to_output(med, timestamp, location, post_id)
+                    if output:
+                        tweets.append(output)
+            else:
+                increment("normalize_skipped", platform="x", reason="no_quoted_entities")
+        else:
+            increment("normalize_skipped", platform="x", reason="no_quoted_status")
         return tweets
-                                   
-                               
-                               
 
-                           
-                           
-               
+    def _media_to_output(self, med, timestamp, location, post_id=None):
+        """
+        Builds the post of a single media entity of a tweet.
+
+        :param med: A media entity from the tweet's entities.
+        :return: A MediaPost carrying the media type and content URLs, or None if the
+                 media type is filtered out.
+        """
+        kind = media_type("x", med['type'])
+        if not is_wanted(kind, self.media_types):
+            return None
+        content_urls = []
+        if kind == PHOTO:
+            content_urls = [med['media_url_https']]
+        elif kind == VIDEO:
+            video_info_variants = med['video_info']['variants']
+            for vid in video_info_variants:
+                if vid['content_type'] == "video/mp4":
+                    content_urls = [vid['url']]
+                    break
+        else:
+            increment("normalize_skipped", platform="x", reason="unknown_media_type")
+        return MediaPost(med['type'], kind, "x", content_urls, timestamp, location, post_id)
 
     def _is_valid_twitter_handle(self, handle):
         """
@@ -148,10 +155,56 @@ class XScraper:
         pattern = r'^@?(\w){1,15}$'
         return re.match(pattern, handle) is not None
 
+class AsyncXScraper(AsyncActorScraper, XScraper):
+    def __init__(self, api_token, client=None, media_types=None, result_cache=None):
+        """
+        Initializes the AsyncXScraper, which runs actors on the async Apify client so that
+        starting, polling and paging never block a thread.
+
+        :param api_token: Your Apify API token.
+        :param client: An optional async backend exposing the ApifyClientAsync interface
+                       (e.g. an AsyncReplayClient).
+        :param media_types: The shared media types (see src.media) to extract, or None for all of them.
+        :param result_cache: An optional ActorResultCache that serves repeated runs of the same input.
+        """
+        super().__init__(api_token, client=client, media_types=media_types, result_cache=result_cache)
+
+    async def scrape_tweets(self, twitter_handle, newer_than = None, max_n=100):
+        """
+        Scrapes tweets from the given Twitter handle.
+
+        :param twitter_handle: The Twitter handle of the user to scrape tweets from.
+        :param max_n: The maximum number of tweets to retrieve.
+        :return: A list of MediaPost records containing tweet details.
+        """
+        return (await self.scrape_tweets_batch([twitter_handle], newer_than, max_n))[twitter_handle]
+
+    def scrape_tweets_stream(self, twitter_handle, newer_than = None, max_n=100):
+        """
+        Scrapes tweets from the given Twitter handle, yielding each one as soon as its dataset item
+        has been fetched.
+
+        :param twitter_handle: The Twitter handle of the user to scrape tweets from.
+        :param max_n: The maximum number of tweets to retrieve.
+        :return: An async generator of MediaPost records containing tweet details.
+        """
+        return self._scrape_stream(twitter_handle, newer_than, max_n)
+
+    async def scrape_tweets_batch(self, twitter_handles, newer_than = None, max_n=100, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Scrapes tweets for many handles, packing them into as few concurrent actor runs as
+        the chunk size allows and splitting the dataset items back out per handle.
+
+        :param twitter_handles: A list of Twitter handles to scrape tweets from.
+        :param max_n: The maximum number of tweets to retrieve per handle.
+        :param chunk_size: The maximum number of handles packed into a single actor run.
+        :return: A dict mapping each handle to its list of tweets (None if its run failed).
+        """
+        return await self._scrape_batch(twitter_handles, newer_than, max_n, chunk_size)
 
 if __name__ == "__main__":
     # Example usage of the XScraper class
-    import json
+    from .Sinks import PartitionedSink
     # Initialize the scraper with your Apify API token
     api_token = os.getenv("APIFY_API_KEY")
     scraper = XScraper(api_token)
@@ -166,7 +219,8 @@ if __name__ == "__main__":
     # Check if tweets were successfully retrieved
     if tweets:
         print(tweets)
-        with open("x_output_2.json", "w+") as f:
-                json.dump(tweets, f)
+        sink = PartitionedSink("x_output")
+        sink.write_posts(tweets, handle=twitter_handle)
+        sink.close()
     else:
         print("No tweets were retrieved.")
@@ -1,6 +1,76 @@
-from .FacebookScrapper import FacebookPostScraper
-from .GeminiModel import GeminiRunnerClass
-from .InstgramScrapper import InstagramPostScraper
-from .XScrapper import XScraper
-from .LinkedinScrapper import LinkedInPostScraper
-from .utils import get_date_7_days_before_today
\ No newline at end of file
+import importlib
+import sys
+import time
+import types
+
+_import_started = time.perf_counter()
+
+from .config import load_config, record_import, record_package_import, startup_timings
+
+load_config()
+
+# Public names and the submodule defining each. Submodules are imported on first access, so a
+# scraper-only process never loads google.generativeai, fastapi, PIL, numpy or pyarrow.
+_EXPORTS = {
+    "FacebookScrapper": ["FacebookPostScraper", "AsyncFacebookPostScraper"],
+    "GeminiModel": ["GeminiRunnerClass"],
+    "GeminiUploads": ["GeminiUploadManager", "FileProcessingError"],
+    "VideoKeyframes": ["KeyframeExtractor", "HttpRangeFile"],
+    "model_registry": ["TEXT", "IMAGE", "configure_genai", "get_model", "preload_models", "resolve_model_name", "reset_models"],
+    "InstgramScrapper": ["InstagramPostScraper", "AsyncInstagramPostScraper"],
+    "XScrapper": ["XScraper", "AsyncXScraper"],
+    "LinkedinScrapper": ["LinkedInPostScraper", "AsyncLinkedInPostScraper"],
+    "utils": ["get_date_7_days_before_today"],
+    "DescriptionCache": ["DescriptionCache"],
+    "ActorCache": ["ActorResultCache", "MemoryResultStore", "SQLiteResultStore"],
+    "StateStore": ["HighWaterMarkStore"],
+    "ReplayClient": ["ReplayClient", "AsyncReplayClient", "create_client"],
+    "timestamps": ["normalize_timestamp", "normalize_post_timestamps"],
+    "JobQueue": ["SQLiteJobQueue", "LeaseLostError"],
+    "Sinks": ["JsonlSink", "PartitionedSink", "read_table", "iter_jsonl_table"],
+    "RateLimiter": ["RateLimiter", "configure_limits", "get_limiter", "limiter_stats"],
+    "media": ["PHOTO", "VIDEO", "DOCUMENT", "IMAGE_MEDIA_TYPES", "media_type"],
+    "Pipeline": ["StoryPipeline"],
+    "MediaDedup": ["MediaDeduplicator"],
+    "ingest": ["load_dataset", "decode_items"],
+    "tracing": ["enable_tracing", "disable_tracing", "get_tracer", "span", "increment", "export_json_trace", "export_prometheus"],
+}
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = ["load_config", "startup_timings", *_MODULE_OF]
+
+
+def __getattr__(name):
+    module_name = _MODULE_OF.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    qualified_name = f"{__name__}.{module_name}"
+    if qualified_name in sys.modules:
+        module = sys.modules[qualified_name]
+    else:
+        started = time.perf_counter()
+        module = importlib.import_module(qualified_name)
+        record_import(module_name, time.perf_counter() - started)
+    value = getattr(module, name)
+    # Cache the name so later lookups are plain attribute reads.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # Importing a submodule binds it on the package. Keep the public names that share a
+        # submodule's name (DescriptionCache, ReplayClient, RateLimiter) resolving to the class.
+        if name in _MODULE_OF and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
+
+
+record_package_import(time.perf_counter() - _import_started)
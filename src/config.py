@@ -0,0 +1,71 @@
+import os
+import time
+
+from dotenv import load_dotenv
+
+_loaded = False
+_config_seconds = 0.0
+_lazy_imports = {}
+_package_import_seconds = None
+
+
+def load_config(path=None, override=False):
+    """
+    Loads the .env file into the environment. It runs once per process: the package calls it
+    on import and later calls are no-ops, unless a path is given.
+
+    Parameters:
+    - path (str): An explicit .env file (defaults to the nearest .env found by python-dotenv).
+    - override (bool): Whether .env values replace variables already set in the environment.
+
+    Returns:
+    - bool: Whether a file was loaded by this call.
+    """
+    global _loaded, _config_seconds
+    if _loaded and path is None:
+        return False
+    started = time.perf_counter()
+    loaded = load_dotenv(path, override=override)
+    _config_seconds += time.perf_counter() - started
+    _loaded = True
+    return loaded
+
+
+def record_import(name, seconds):
+    """
+    Records how long a lazily imported subsystem took to import.
+
+    Parameters:
+    - name (str): The module name.
+    - seconds (float): The import time.
+    """
+    _lazy_imports[name] = seconds
+
+
+def record_package_import(seconds):
+    """
+    Records how long importing the package itself took.
+
+    Parameters:
+    - seconds (float): The import time.
+    """
+    global _package_import_seconds
+    _package_import_seconds = seconds
+
+
+def startup_timings():
+    """
+    Returns where this process's cold start went: the package import, the .env load, and each
+    subsystem imported on first use so far.
+
+    Returns:
+    - dict: {"package_import_seconds", "config_seconds", "lazy_imports": {module: seconds},
+      "lazy_import_seconds", "pid"}.
+    """
+    return {
+        "package_import_seconds": _package_import_seconds,
+        "config_seconds": _config_seconds,
+        "lazy_imports": dict(_lazy_imports),
+        "lazy_import_seconds": sum(_lazy_imports.values()),
+        "pid": os.getpid(),
+    }
@@ -0,0 +1,175 @@
+import json
+from typing import Any, List, Optional, TypedDict
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = "msgspec" if msgspec is not None else "orjson" if orjson is not None else "json"
+
+# The fields the normalizers (and the replay backend's per-profile splitting) read from each
+# actor's dataset items. None keeps a value as is, a dict descends into an object and a
+# one-element list descends into every object of an array; everything else is dropped.
+_X_MEDIA_FIELDS = {
+    "type": None,
+    "media_url_https": None,
+    "video_info": {"variants": [{"content_type": None, "url": None}]},
+}
+_FB_MEDIA_FIELDS = {
+    "__typename": None,
+    "image": {"uri": None},
+    "photo_image": {"uri": None},
+    "browser_native_hd_url": None,
+    "browser_native_sd_url": None,
+}
+ACTOR_FIELDS = {
+    "quacker/twitter-scraper": {
+        "id": None,
+        "id_str": None,
+        "created_at": None,
+        "location": None,
+        "startUrl": None,
+        "entities": {"media": [_X_MEDIA_FIELDS]},
+        "quoted_status": {"entities": {"media": [_X_MEDIA_FIELDS]}},
+    },
+    "apify/instagram-scraper": {
+        "id": None,
+        "type": None,
+        "timestamp": None,
+        "location": None,
+        "displayUrl": None,
+        "videoUrl": None,
+        "images": None,
+        "inputUrl": None,
+        "ownerUsername": None,
+    },
+    "apify/facebook-posts-scraper": {
+        "postId": None,
+        "time": None,
+        "location": None,
+        "inputUrl": None,
+        "facebookUrl": None,
+        "media": [_FB_MEDIA_FIELDS],
+    },
+    "curious_coder/linkedin-post-search-scraper": {
+        "urn": None,
+        "type": None,
+        "postedAtISO": None,
+        "location": None,
+        "images": None,
+        "document": {"coverPages": None},
+        "inputUrl": None,
+    },
+}
+
+
+def loads(data):
+    """
+    Parses a JSON document with the fastest installed backend (msgspec, orjson or stdlib json).
+
+    Parameters:
+    - data (bytes): The encoded document.
+
+    Returns:
+    - The decoded value.
+    """
+    if msgspec is not None:
+        return msgspec.json.decode(data)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def project(value, fields):
+    """
+    Keeps only the given fields of a decoded value.
+
+    Parameters:
+    - value: A decoded JSON value.
+    - fields: A field spec (see ACTOR_FIELDS).
+
+    Returns:
+    - The projected value; values whose shape does not match the spec are kept as they are.
+    """
+    if fields is None:
+        return value
+    if isinstance(fields, list):
+        if not isinstance(value, list):
+            return value
+        return [project(element, fields[0]) for element in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: project(value[key], spec) for key, spec in fields.items() if key in value}
+
+
+_decoders = {}
+
+
+def _typed(fields, name):
+    """Builds the msgspec type that decodes only the given fields."""
+    if fields is None:
+        return Any
+    if isinstance(fields, list):
+        return Optional[List[_typed(fields[0], name)]]
+    members = {key: _typed(spec, f"{name}_{key.strip('_')}") for key, spec in fields.items()}
+    return Optional[TypedDict(name, members, total=False)]
+
+
+def _decoder(actor_id):
+    decoder = _decoders.get(actor_id)
+    if decoder is None:
+        item_type = _typed(ACTOR_FIELDS[actor_id], actor_id.replace("/", "_").replace("-", "_"))
+        decoder = _decoders[actor_id] = msgspec.json.Decoder(List[item_type])
+    return decoder
+
+
+def decode_items(data, actor_id=None):
+    """
+    Decodes an exported actor dataset (a JSON array of items).
+
+    For known actors only the fields the normalizers read are kept. With msgspec installed, the
+    other fields are skipped by the parser itself and never materialized as Python objects; with
+    orjson or stdlib json the full items are parsed and then projected.
+
+    Parameters:
+    - data (bytes): The encoded dataset.
+    - actor_id (str): The actor that produced the dataset, or None to keep every field.
+
+    Returns:
+    - list: The items, as dictionaries.
+    """
+    fields = ACTOR_FIELDS.get(actor_id)
+    if fields is not None and msgspec is not None:
+        try:
+            return [item for item in _decoder(actor_id).decode(data) if item is not None]
+        except msgspec.ValidationError as e:
+            print(f"Falling back to a full parse of the {actor_id} dataset: {e}")
+    items = loads(data)
+    if fields is None:
+        return items
+    return [project(item, fields) for item in items]
+
+
+def load_dataset(path, actor_id=None):
+    """
+    Loads an exported actor dataset from a .json (array) or .jsonl (one item per line) file.
+
+    Parameters:
+    - path (str): The dataset file.
+    - actor_id (str): The actor that produced the dataset, to decode only the fields the
+      normalizers read; None keeps every field.
+
+    Returns:
+    - list: The items, as dictionaries.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".jsonl"):
+        data = b"[" + b",".join(line for line in data.splitlines() if line.strip()) + b"]"
+    return decode_items(data, actor_id)
@@ -0,0 +1,42 @@
+PHOTO = "photo"
+VIDEO = "video"
+DOCUMENT = "document"
+
+# platform -> the platform's own media type label -> the shared media type
+MEDIA_TYPES = {
+    "x": {"photo": PHOTO, "video": VIDEO, "animated_gif": VIDEO},
+    "instagram": {"Image": PHOTO, "Sidecar": PHOTO, "Video": VIDEO},
+    "facebook": {"Photo": PHOTO, "Video": VIDEO},
+    "linkedin": {"image": PHOTO, "document": DOCUMENT},
+}
+
+# Media the image stage can describe: photos, and documents (scraped as their cover page images).
+IMAGE_MEDIA_TYPES = frozenset({PHOTO, DOCUMENT})
+
+
+def media_type(platform, label):
+    """
+    Maps a platform's media type label onto the shared taxonomy.
+
+    Parameters:
+    - platform (str): "x", "instagram", "facebook" or "linkedin".
+    - label (str): The type label the platform's actor reports, e.g. "Sidecar".
+
+    Returns:
+    - str: PHOTO, VIDEO or DOCUMENT, or None for labels outside the taxonomy.
+    """
+    return MEDIA_TYPES.get(platform, {}).get(label)
+
+
+def is_wanted(kind, media_types=None):
+    """
+    Checks a shared media type against a filter spec.
+
+    Parameters:
+    - kind (str): The shared media type (see media_type).
+    - media_types (set): The media types to keep, or None to keep everything.
+
+    Returns:
+    - bool: Whether media of this type should be built.
+    """
+    return media_types is None or kind in media_types
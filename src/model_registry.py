@@ -0,0 +1,103 @@
+import os
+import threading
+
+import google.generativeai as genai
+
+# Model roles and the environment variables naming their model.
+TEXT = "text"
+IMAGE = "image"
+MODEL_ENV_VARS = {
+    TEXT: "GEMINI_MODEL_NAME",
+    IMAGE: "GEMINI_IMAGE_MODEL_NAME",
+}
+
+_models = {}
+_names = {}
+_configured = False
+_lock = threading.Lock()
+
+
+def configure_genai(api_key=None):
+    """
+    Configures the genai client once per process; later calls are no-ops unless an api_key is given.
+
+    Parameters:
+    - api_key (str): The API key (defaults to GEMINI_API_KEY, then GOOGLE_API_KEY).
+    """
+    global _configured
+    if _configured and api_key is None:
+        return
+    with _lock:
+        if _configured and api_key is None:
+            return
+        genai.configure(api_key=api_key or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY"))
+        _configured = True
+
+
+def resolve_model_name(model):
+    """
+    Resolves a model role ("text" or "image") to its configured model name; any other value is
+    taken as a model name already. Roles are looked up in the environment only once.
+
+    Parameters:
+    - model (str): A role or a model name.
+
+    Returns:
+    - str: The model name.
+    """
+    name = _names.get(model)
+    if name is None:
+        env_var = MODEL_ENV_VARS.get(model)
+        name = os.getenv(env_var) if env_var else model
+        if not name:
+            raise ValueError(f"No model configured for {model!r}: set {env_var}")
+        _names[model] = name
+    return name
+
+
+def get_model(model=TEXT):
+    """
+    Returns the process-wide GenerativeModel for a role or model name, creating it on first use.
+
+    Models are shared by every request (and every GeminiRunnerClass) of the process, so a request
+    never pays for client setup; the generation config is passed per request instead.
+
+    Parameters:
+    - model (str): "text", "image" or a model name.
+
+    Returns:
+    - google.generativeai.GenerativeModel: The shared model client.
+    """
+    name = resolve_model_name(model)
+    client = _models.get(name)
+    if client is None:
+        configure_genai()
+        with _lock:
+            client = _models.get(name)
+            if client is None:
+                client = _models[name] = genai.GenerativeModel(name)
+    return client
+
+
+def preload_models(models=(TEXT, IMAGE)):
+    """
+    Creates the given models up front, e.g. at worker start, so the first request finds them ready.
+
+    Parameters:
+    - models (iterable): Roles or model names.
+
+    Returns:
+    - dict: The model name of each role.
+    """
+    return {model: get_model(model).model_name for model in models}
+
+
+def reset_models():
+    """
+    Drops every cached model and role resolution, e.g. after changing the model environment variables.
+    """
+    global _configured
+    with _lock:
+        _models.clear()
+        _names.clear()
+        _configured = False
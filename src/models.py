@@ -1,5 +1,110 @@
+import sys
 import typing_extensions as typing
-from typing import List
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from .media import media_type as shared_media_type
 
 class ImageDescriptions(typing.TypedDict):
-    descriptions: str
\ No newline at end of file
+    # One description per image (or video) sent, in the order they were sent.
+    descriptions: list[str]
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
+class MediaPost:
+    """
+    A normalized post (one media entity) as produced by the scrapers.
+
+    The platform and type labels come from a handful of values, so they are interned and every
+    post shares the same string objects. to_dict() returns the JSON shape the scrapers used to emit.
+    """
+    type: Optional[str]
+    media_type: Optional[str]
+    social_media: str
+    content_urls: List[str] = field(default_factory=list)
+    timestamp: Optional[str] = None
+    location: Optional[str] = None
+    post_id: Optional[str] = None
+
+    def __post_init__(self):
+        self.type = _intern(self.type)
+        self.media_type = _intern(self.media_type)
+        self.social_media = _intern(self.social_media)
+
+    def to_dict(self):
+        return {
+            "type": self.type,
+            "media_type": self.media_type,
+            "content_urls": self.content_urls,
+            "social_media": self.social_media,
+            "timestamp": self.timestamp,
+            "location": self.location,
+            "post_id": self.post_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Builds a post from its dict shape (see to_dict), e.g. a saved scraper output. Dumps made
+        before media_type existed get it from the platform's type label.
+        """
+        social_media = data.get("social_media")
+        kind = data.get("media_type") or shared_media_type(social_media, data.get("type"))
+        return cls(
+            data.get("type"),
+            kind,
+            social_media,
+            list(data.get("content_urls") or []),
+            data.get("timestamp"),
+            data.get("location"),
+            data.get("post_id"),
+        )
+
+    def items(self):
+        """Splits the post into one MediaItem per content URL."""
+        return [
+            MediaItem(url, self.type, self.media_type, self.social_media, self.timestamp, self.location)
+            for url in self.content_urls
+        ]
+
+
+@dataclass(slots=True)
+class MediaItem:
+    """
+    A single piece of media (one content URL) of a MediaPost, as sent to the Gemini stage.
+    """
+    data: str
+    type: Optional[str]
+    media_type: Optional[str]
+    social_media: str
+    timestamp: Optional[str] = None
+    location: Optional[str] = None
+
+    def to_dict(self):
+        return {
+            "data": self.data,
+            "social_media": self.social_media,
+            "timestamp": self.timestamp,
+            "location": self.location,
+            "type": self.type,
+            "media_type": self.media_type,
+        }
+
+
+def to_json_compatible(value):
+    """
+    `default` hook for json.dumps that serializes MediaPost/MediaItem records (and anything else
+    with a to_dict method) to their dictionary shape, and everything else with str().
+
+    Parameters:
+    - value: The object json could not serialize.
+
+    Returns:
+    - A JSON-serializable value.
+    """
+    to_dict = getattr(value, "to_dict", None)
+    return to_dict() if to_dict is not None else str(value)
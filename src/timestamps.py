@@ -0,0 +1,150 @@
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+MONTHS = {
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+    "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12,
+}
+WEEKDAYS = {"Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"}
+LEGACY_FORMATS = [
+    '%Y-%m-%dT%H:%M:%S.%f%z',
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%a %b %d %H:%M:%S %z %Y',
+]
+OFFSET_PATTERN = re.compile(r'([+-]\d{2})(\d{2})$')
+
+
+@lru_cache(maxsize=64)
+def _fixed_offset(offset):
+    """Returns the tzinfo of a '+HHMM' offset, shared across calls."""
+    sign = -1 if offset[0] == "-" else 1
+    minutes = sign * (int(offset[1:3]) * 60 + int(offset[3:5]))
+    return timezone.utc if minutes == 0 else timezone(timedelta(minutes=minutes))
+
+
+def parse_iso(timestamp):
+    """
+    Parses an ISO 8601 timestamp with a UTC offset (Instagram, Facebook, LinkedIn).
+
+    Parameters:
+    - timestamp (str): e.g. '2024-09-19T22:15:42.000Z'.
+
+    Returns:
+    - datetime: An offset-aware datetime.
+    """
+    dt = datetime.fromisoformat(timestamp)
+    if dt.tzinfo is None:
+        raise ValueError(f"Timestamp has no UTC offset: {timestamp}")
+    return dt
+
+
+def parse_twitter(timestamp):
+    """
+    Parses a Twitter 'created_at' timestamp without going through strptime.
+
+    Parameters:
+    - timestamp (str): e.g. 'Wed Sep 25 11:48:37 +0000 2024'.
+
+    Returns:
+    - datetime: An offset-aware datetime.
+    """
+    parts = timestamp.split()
+    if len(parts) != 6 or parts[0] not in WEEKDAYS or parts[1] not in MONTHS or len(parts[4]) != 5:
+        raise ValueError(f"Not a Twitter timestamp: {timestamp}")
+    hour, minute, second = parts[3].split(":")
+    return datetime(
+        int(parts[5]), MONTHS[parts[1]], int(parts[2]),
+        int(hour), int(minute), int(second),
+        tzinfo=_fixed_offset(parts[4]),
+    )
+
+
+def parse_legacy(timestamp):
+    """
+    Parses a timestamp by trying every known strptime format in turn.
+
+    Parameters:
+    - timestamp (str): A timestamp in any of LEGACY_FORMATS.
+
+    Returns:
+    - datetime: An offset-aware datetime.
+    """
+    if timestamp.endswith('Z'):
+        timestamp = timestamp[:-1] + '+0000'
+    else:
+        timestamp = OFFSET_PATTERN.sub(r'\1:\2', timestamp)
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(timestamp, fmt)
+        except ValueError:
+            continue
+    raise ValueError('Timestamp format not recognized')
+
+
+PLATFORM_PARSERS = {
+    "x": parse_twitter,
+    "instagram": parse_iso,
+    "facebook": parse_iso,
+    "linkedin": parse_iso,
+}
+
+
+def format_utc(dt):
+    """
+    Formats a datetime as a UTC 'YYYY-MM-DDTHH:MM:SS.mmmZ' string.
+
+    Parameters:
+    - dt (datetime): An offset-aware datetime.
+
+    Returns:
+    - str: The formatted timestamp.
+    """
+    dt = dt.astimezone(timezone.utc)
+    return (
+        f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}T"
+        f"{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}.{dt.microsecond // 1000:03d}Z"
+    )
+
+
+@lru_cache(maxsize=65536)
+def normalize_timestamp(timestamp, platform=None):
+    """
+    Converts a scraped timestamp into a UTC 'YYYY-MM-DDTHH:MM:SS.mmmZ' string.
+
+    The parser is picked from the source platform, so each timestamp is parsed once instead
+    of being retried against every format; results are memoized since the same timestamp
+    repeats across the media entries of a post and across runs.
+
+    Parameters:
+    - timestamp (str): The timestamp as returned by the actor.
+    - platform (str): The source platform ("x", "instagram", "facebook", "linkedin"), if known.
+
+    Returns:
+    - str: The normalized timestamp, or None if timestamp is None.
+    """
+    if timestamp is None:
+        return None
+    timestamp = timestamp.strip()
+    parser = PLATFORM_PARSERS.get(platform)
+    if parser is not None:
+        try:
+            return format_utc(parser(timestamp))
+        except ValueError:
+            pass
+    return format_utc(parse_legacy(timestamp))
+
+
+def normalize_post_timestamps(posts):
+    """
+    Normalizes the timestamp of every post in place, using each post's social_media platform.
+
+    Parameters:
+    - posts (list): MediaPost records.
+
+    Returns:
+    - list: The same posts.
+    """
+    for post in posts:
+        post.timestamp = normalize_timestamp(post.timestamp, post.social_media)
+    return posts
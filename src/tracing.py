@@ -0,0 +1,359 @@
+import contextvars
+import json
+import os
+import threading
+import time
+
+_tracer = None
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    """Returned by span()/start_span() while tracing is disabled; every operation does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+    def add(self, name, value=1):
+        pass
+
+    def end(self, duration=None, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "attributes", "span_id", "parent_id", "thread_id", "start", "duration", "_token")
+
+    def __init__(self, tracer, name, attributes, parent_id):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span_id = tracer.next_id()
+        self.parent_id = parent_id
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.duration = None
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.end()
+        return False
+
+    def set(self, **attributes):
+        """Sets attributes, e.g. counts and byte sizes, on the span."""
+        self.attributes.update(attributes)
+
+    def add(self, name, value=1):
+        """Adds value to a numeric attribute."""
+        self.attributes[name] = self.attributes.get(name, 0) + value
+
+    def end(self, duration=None, **attributes):
+        """Finishes the span (spans used as context managers end on exit)."""
+        if self.duration is not None:
+            return
+        self.attributes.update(attributes)
+        self.duration = time.perf_counter() - self.start if duration is None else duration
+        self.tracer.record(self)
+
+
+class Tracer:
+    def __init__(self, max_spans=100000):
+        """
+        Initializes an in-process tracer that keeps finished spans for the JSON trace and
+        aggregates them per span name for the Prometheus export.
+
+        :param max_spans: The number of spans kept for the JSON trace; aggregates keep counting
+                          past it.
+        """
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped_spans = 0
+        self.aggregates = {}
+        self.counters = {}
+        self.origin = time.perf_counter()
+        self.wall_origin = time.time()
+        self._ids = iter(range(1, 2 ** 63))
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def record(self, span):
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+            aggregate = self.aggregates.setdefault(span.name, {"count": 0, "seconds": 0.0, "totals": {}})
+            aggregate["count"] += 1
+            aggregate["seconds"] += span.duration
+            for name, value in span.attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and not name.endswith("_id"):
+                    aggregate["totals"][name] = aggregate["totals"].get(name, 0) + value
+
+    def increment(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+def enable_tracing(max_spans=100000):
+    """
+    Starts collecting spans and counters in this process.
+
+    Parameters:
+    - max_spans (int): The number of spans kept for the JSON trace.
+
+    Returns:
+    - Tracer: The active tracer.
+    """
+    global _tracer
+    _tracer = Tracer(max_spans)
+    return _tracer
+
+
+def disable_tracing():
+    """
+    Stops collecting; span() and increment() become no-ops again.
+    """
+    global _tracer
+    _tracer = None
+
+
+def get_tracer():
+    """
+    Returns the active Tracer, or None while tracing is disabled.
+    """
+    return _tracer
+
+
+def span(name, **attributes):
+    """
+    Opens a span to be used as a context manager. Spans opened inside it (in the same thread or
+    asyncio task) become its children.
+
+    Parameters:
+    - name (str): The span name, e.g. "gemini.describe".
+    - attributes: Initial attributes; numeric ones (except identifiers, named *_id) are summed per
+      span name in the Prometheus export.
+
+    Returns:
+    - Span: The span, or a shared no-op span while tracing is disabled.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    parent = _current_span.get()
+    return Span(tracer, name, attributes, parent.span_id if parent is not None else None)
+
+
+def start_span(name, **attributes):
+    """
+    Starts a span that is ended explicitly with span.end(...) and never becomes the parent of
+    other spans, for work that spans generator yields.
+
+    Parameters:
+    - name (str): The span name.
+    - attributes: Initial attributes.
+
+    Returns:
+    - Span: The span, or a shared no-op span while tracing is disabled.
+    """
+    return span(name, **attributes)
+
+
+def increment(name, value=1, **labels):
+    """
+    Adds to a labelled counter, e.g. increment("normalize_skipped", platform="x", reason="no_media").
+
+    Parameters:
+    - name (str): The counter name.
+    - value (int): The amount to add.
+    - labels: The counter labels.
+    """
+    tracer = _tracer
+    if tracer is not None:
+        tracer.increment(name, value, labels)
+
+
+def _split_source_time(name, attributes, started, source_seconds, items):
+    """Records the paging and the consumer (normalization) share of a traced iteration."""
+    elapsed = time.perf_counter() - started
+    # Both shares are interleaved item by item; the trace lays them out back to back.
+    for span_name, offset, duration in ((name, 0.0, source_seconds), ("normalize", source_seconds, max(0.0, elapsed - source_seconds))):
+        traced = start_span(span_name, **attributes)
+        if traced is not NOOP_SPAN:
+            traced.start = started + offset
+        traced.end(duration=duration, items=items)
+
+
+def traced_items(items, name="dataset.page", **attributes):
+    """
+    Wraps a dataset item iterator to record the time spent fetching items (a `name` span) and
+    the time the consumer spent on them in between (a "normalize" span), with the item count.
+
+    Parameters:
+    - items: An iterable of items.
+    - name (str): The span name of the fetching side.
+    - attributes: Attributes of both spans, e.g. actor=ACTOR_ID.
+
+    Returns:
+    - The iterable itself while tracing is disabled, otherwise a generator of the same items.
+    """
+    if _tracer is None:
+        return items
+    return _traced_items(items, name, attributes)
+
+
+def _traced_items(items, name, attributes):
+    started = time.perf_counter()
+    source_seconds = 0.0
+    count = 0
+    iterator = iter(items)
+    try:
+        while True:
+            fetch_started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                source_seconds += time.perf_counter() - fetch_started
+                return
+            source_seconds += time.perf_counter() - fetch_started
+            count += 1
+            yield item
+    finally:
+        _split_source_time(name, attributes, started, source_seconds, count)
+
+
+def atraced_items(items, name="dataset.page", **attributes):
+    """
+    Async counterpart of traced_items for async item iterators.
+    """
+    if _tracer is None:
+        return items
+    return _atraced_items(items, name, attributes)
+
+
+async def _atraced_items(items, name, attributes):
+    started = time.perf_counter()
+    source_seconds = 0.0
+    count = 0
+    iterator = items.__aiter__()
+    try:
+        while True:
+            fetch_started = time.perf_counter()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                source_seconds += time.perf_counter() - fetch_started
+                return
+            source_seconds += time.perf_counter() - fetch_started
+            count += 1
+            yield item
+    finally:
+        _split_source_time(name, attributes, started, source_seconds, count)
+
+
+def export_json_trace(path, tracer=None):
+    """
+    Writes the collected spans as a Chrome trace event file (open it in chrome://tracing or
+    https://ui.perfetto.dev).
+
+    Parameters:
+    - path (str): The file to write.
+    - tracer (Tracer): The tracer to export (defaults to the active one).
+    """
+    tracer = tracer or _tracer
+    if tracer is None:
+        return
+    with tracer._lock:
+        spans = list(tracer.spans)
+        dropped = tracer.dropped_spans
+    pid = os.getpid()
+    events = [
+        {
+            "name": span.name,
+            "ph": "X",
+            "ts": (span.start - tracer.origin) * 1e6,
+            "dur": span.duration * 1e6,
+            "pid": pid,
+            "tid": span.thread_id,
+            "args": {**span.attributes, "span_id": span.span_id, "parent_id": span.parent_id},
+        }
+        for span in spans
+    ]
+    with open(path, "w") as f:
+        json.dump(
+            {"traceEvents": events, "otherData": {"started_at": tracer.wall_origin, "dropped_spans": dropped}},
+            f,
+            default=str,
+        )
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def export_prometheus(path, tracer=None, prefix="social_scraper"):
+    """
+    Writes the per-span aggregates and the counters in the Prometheus text exposition format,
+    e.g. for node_exporter's textfile collector. The file is replaced atomically.
+
+    Parameters:
+    - path (str): The file to write.
+    - tracer (Tracer): The tracer to export (defaults to the active one).
+    - prefix (str): The metric name prefix.
+    """
+    tracer = tracer or _tracer
+    if tracer is None:
+        return
+    with tracer._lock:
+        aggregates = {name: {**aggregate, "totals": dict(aggregate["totals"])} for name, aggregate in tracer.aggregates.items()}
+        counters = dict(tracer.counters)
+
+    lines = [
+        f"# HELP {prefix}_span_seconds Time spent in each kind of span.",
+        f"# TYPE {prefix}_span_seconds summary",
+    ]
+    for name, aggregate in sorted(aggregates.items()):
+        lines.append(f'{prefix}_span_seconds_sum{{span="{_label(name)}"}} {aggregate["seconds"]}')
+        lines.append(f'{prefix}_span_seconds_count{{span="{_label(name)}"}} {aggregate["count"]}')
+    lines += [
+        f"# HELP {prefix}_span_attribute_total Sum of the numeric span attributes (items, bytes, ...).",
+        f"# TYPE {prefix}_span_attribute_total counter",
+    ]
+    for name, aggregate in sorted(aggregates.items()):
+        for attribute, total in sorted(aggregate["totals"].items()):
+            lines.append(f'{prefix}_span_attribute_total{{span="{_label(name)}",attribute="{_label(attribute)}"}} {total}')
+    declared = None
+    for (name, labels), value in sorted(counters.items()):
+        metric = f"{prefix}_{name}_total"
+        if metric != declared:
+            lines.append(f"# TYPE {metric} counter")
+            declared = metric
+        label_text = ",".join(f'{key}="{_label(label)}"' for key, label in labels)
+        lines.append(f"{metric}{{{label_text}}} {value}")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
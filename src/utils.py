@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 import os
 import requests
+from urllib.parse import urlparse
 
 def get_date_7_days_before_today():
     # Get today's date
@@ -43,4 +44,91 @@ def download_file(url, save_dir='./', filename=None):
     else:
         response.raise_for_status()  # Raise an error on bad status
 
-    return file_path
\ No newline at end of file
+    return file_path
+
+def chunked(items, size):
+    """
+    Splits a list into consecutive chunks of at most `size` elements.
+
+    Parameters:
+    - items (list): The items to split.
+    - size (int): The maximum number of items per chunk.
+
+    Returns:
+    - list: A list of chunks (lists).
+    """
+    if size < 1:
+        raise ValueError("Chunk size must be at least 1.")
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def handle_from_url(url):
+    """
+    Extracts the normalized handle (last path segment, lower-cased) from a profile URL.
+
+    Parameters:
+    - url (str): A profile URL such as 'https://twitter.com/apify' or a bare handle.
+
+    Returns:
+    - str: The normalized handle, or None if it cannot be determined.
+    """
+    if not url:
+        return None
+    path = urlparse(url).path if "://" in url else url
+    segments = [segment for segment in path.split("/") if segment]
+    if not segments:
+        return None
+    return segments[-1].lstrip("@").lower()
+
+
+def handle_resolver(handles, url_getter):
+    """
+    Builds a function that tells which requested handle a dataset item of a batched run belongs to.
+
+    Parameters:
+    - handles (list): The handles that were packed into the run.
+    - url_getter (callable): Returns the input/profile URL an item was scraped from.
+
+    Returns:
+    - callable: Maps an item to its handle, or to None if it matches none of them.
+    """
+    if len(handles) == 1:
+        return lambda item: handles[0]
+
+    lookup = {handle_from_url(handle): handle for handle in handles}
+    return lambda item: lookup.get(handle_from_url(url_getter(item)))
+
+
+def iter_items_by_handle(items, handles, url_getter):
+    """
+    Pairs the dataset items of a batched actor run with the requested handle they belong to,
+    one item at a time, so callers can normalize them while the dataset is still paging.
+
+    Parameters:
+    - items (iterable): The raw dataset items of the run.
+    - handles (list): The handles that were packed into the run.
+    - url_getter (callable): Returns the input/profile URL an item was scraped from.
+
+    Yields:
+    - tuple: (handle, item) for every item that can be matched to a handle.
+    """
+    resolve = handle_resolver(handles, url_getter)
+    for item in items:
+        handle = resolve(item)
+        if handle is not None:
+            yield handle, item
+
+
+async def aiterate(items):
+    """
+    Yields the elements of a plain iterable from an async generator, so that a list of items
+    (e.g. from the actor result cache) can be consumed like a paged dataset.
+
+    Parameters:
+    - items (iterable): The items.
+
+    Yields:
+    - object: Each item in order.
+    """
+    for item in items:
+        yield item
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.ActorCache import ActorResultCache, MemoryResultStore, SQLiteResultStore, canonical_run_input
+
+ACTOR_ID = "example/actor"
+ITEMS = [{"id": "1", "full_text": "hello", "startUrl": "https://twitter.com/nasa"}]
+
+
+class FakeActor:
+    def __init__(self, delay=0.0, status="SUCCEEDED"):
+        self.delay = delay
+        self.status = status
+        self.runs = 0
+
+    def run_actor(self, run_input):
+        self.runs += 1
+        time.sleep(self.delay)
+        return {"status": self.status, "defaultDatasetId": "d"}
+
+    def get_items(self, run):
+        yield from ITEMS
+
+    async def run_actor_async(self, run_input):
+        self.runs += 1
+        await asyncio.sleep(self.delay)
+        return {"status": self.status, "defaultDatasetId": "d"}
+
+    async def get_items_async(self, run):
+        for item in ITEMS:
+            yield item
+
+
+def test_canonical_run_input_ignores_key_and_profile_order():
+    assert canonical_run_input({"handles": ["a", "b"], "tweetsDesired": 5}) == canonical_run_input(
+        {"tweetsDesired": 5, "handles": ["b", "a"]}
+    )
+    assert canonical_run_input({"handles": ["a"]}) != canonical_run_input({"handles": ["b"]})
+
+
+def test_hit_within_ttl_and_miss_after():
+    actor = FakeActor()
+    cache = ActorResultCache(ttl_seconds=0.1)
+    assert cache.fetch(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor, actor.get_items) == ITEMS
+    assert cache.fetch(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor, actor.get_items) == ITEMS
+    assert actor.runs == 1
+    time.sleep(0.15)
+    cache.fetch(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor, actor.get_items)
+    assert actor.runs == 2
+
+
+def test_failed_runs_are_not_cached():
+    actor = FakeActor(status="FAILED")
+    cache = ActorResultCache()
+    cache.fetch(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor, actor.get_items)
+    cache.fetch(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor, actor.get_items)
+    assert actor.runs == 2
+    assert cache.fetch(ACTOR_ID, {"handles": ["nasa"]}, lambda run_input: None, actor.get_items) is None
+
+
+def test_runs_without_a_status_are_not_cached():
+    actor = FakeActor(status=None)
+    cache = ActorResultCache()
+    cache.fetch(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor, actor.get_items)
+    cache.fetch(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor, actor.get_items)
+    assert actor.runs == 2
+
+
+class BrokenDataset:
+    def iterate_items(self):
+        yield {"id_str": "1", "startUrl": "https://twitter.com/nasa"}
+        raise ConnectionError("page 2 failed")
+
+
+class BrokenClient:
+    def __init__(self):
+        self.runs = 0
+
+    def actor(self, actor_id):
+        return self
+
+    def call(self, run_input):
+        self.runs += 1
+        return {"status": "SUCCEEDED", "defaultDatasetId": "d"}
+
+    def dataset(self, dataset_id):
+        return BrokenDataset()
+
+
+def test_truncated_dataset_is_not_cached():
+    from src import XScraper
+
+    client = BrokenClient()
+    scraper = XScraper(None, client=client, result_cache=ActorResultCache())
+    # The paging error fails the run instead of caching the first page as the whole dataset.
+    assert scraper.scrape_tweets_batch(["nasa"]) == {"nasa": None}
+    assert scraper.scrape_tweets_batch(["nasa"]) == {"nasa": None}
+    assert client.runs == 2
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryResultStore(max_entries=2)
+    store.set("a", [1], None)
+    store.set("b", [2], None)
+    store.get("a")
+    store.set("c", [3], None)
+    assert store.get("b") is None and store.get("a") == ([1], None)
+
+
+def test_sqlite_store_persists_across_instances(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    actor = FakeActor()
+    ActorResultCache(SQLiteResultStore(path)).fetch(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor, actor.get_items)
+    cache = ActorResultCache(SQLiteResultStore(path))
+    assert cache.fetch(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor, actor.get_items) == ITEMS
+    assert actor.runs == 1 and cache.stats()["hits"] == 1
+
+
+def test_concurrent_threads_share_one_run():
+    actor = FakeActor(delay=0.1)
+    cache = ActorResultCache()
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.fetch(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor, actor.get_items)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert actor.runs == 1
+    assert results == [ITEMS] * 8
+
+
+def test_concurrent_tasks_share_one_run():
+    actor = FakeActor(delay=0.1)
+    cache = ActorResultCache()
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.fetch_async(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor_async, actor.get_items_async) for _ in range(8))
+        )
+
+    assert asyncio.run(main()) == [ITEMS] * 8
+    assert actor.runs == 1
+    assert cache.stats() == {"hits": 0, "misses": 1, "shared": 7}
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    actor = FakeActor(delay=0.1)
+    cache = ActorResultCache()
+
+    async def main():
+        fetch = lambda: cache.fetch_async(ACTOR_ID, {"handles": ["nasa"]}, actor.run_actor_async, actor.get_items_async)
+        leader = asyncio.ensure_future(fetch())
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(fetch())
+        await asyncio.sleep(0.02)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == ITEMS
+    # The follower took over and started its own run.
+    assert actor.runs == 2
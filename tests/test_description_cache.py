@@ -0,0 +1,66 @@
+import asyncio
+
+from src.DescriptionCache import DescriptionCache
+from src.GeminiModel import GeminiRunnerClass
+from src.models import MediaPost
+
+MODEL = "test-model"
+
+
+class FakeDownloader:
+    async def fetch_all(self, urls):
+        return [url.encode("utf-8") for url in urls]
+
+
+class FakePreprocessor:
+    def process(self, content):
+        return {"mime_type": "image/jpeg", "data": content}
+
+
+def _runner(tmp_path):
+    gem = GeminiRunnerClass(
+        downloader=FakeDownloader(),
+        preprocessor=FakePreprocessor(),
+        cache=DescriptionCache(str(tmp_path / "descriptions.sqlite3")),
+        text_model=MODEL,
+        image_model=MODEL,
+    )
+    gem.sent = []
+
+    async def describe_images(input_text, model_name, images):
+        gem.sent.append([image["data"].decode("utf-8") for image in images])
+        return [f"about {image['data'].decode('utf-8')}" for image in images]
+
+    gem.describe_images = describe_images
+    return gem
+
+
+def _post(urls):
+    return MediaPost("Image", "photo", "instagram", list(urls))
+
+
+def test_new_image_in_window_sends_only_that_image(tmp_path):
+    gem = _runner(tmp_path)
+    urls = [f"https://example.com/{i}.jpg" for i in range(5)]
+    asyncio.run(gem.get_gemini_response_image("prompt", [_post(urls)]))
+    assert gem.sent == [urls]
+
+    results = asyncio.run(gem.get_gemini_response_image("prompt", [_post(urls + ["https://example.com/5.jpg"])]))
+    assert gem.sent[1:] == [["https://example.com/5.jpg"]]
+    described = {
+        url: description
+        for result in results
+        for url, description in zip(result["content_urls"], result["descriptions"])
+    }
+    assert described == {f"https://example.com/{i}.jpg": f"about https://example.com/{i}.jpg" for i in range(6)}
+
+
+def test_window_hit_counts_once(tmp_path):
+    gem = _runner(tmp_path)
+    urls = [f"https://example.com/{i}.jpg" for i in range(3)]
+    asyncio.run(gem.get_gemini_response_image("prompt", [_post(urls)]))
+    assert gem.cache.stats()["misses"] == 3 and gem.cache.stats()["hits"] == 0
+
+    asyncio.run(gem.get_gemini_response_image("prompt", [_post(urls)]))
+    assert len(gem.sent) == 1
+    assert gem.cache.stats()["hits"] == 1 and gem.cache.stats()["misses"] == 3
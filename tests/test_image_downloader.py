@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.ImageDownloader import ImageDownloader
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/slow.jpg":
+            time.sleep(1.0)
+        if self.path == "/missing.jpg":
+            self.send_error(404)
+            return
+        body = self.path.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_all_keeps_order(server):
+    downloader = ImageDownloader(max_workers=2)
+    urls = [f"{server}/{i}.jpg" for i in range(4)]
+    assert asyncio.run(downloader.fetch_all(urls)) == [f"/{i}.jpg".encode("utf-8") for i in range(4)]
+    # Every download reused the host's keep-alive session.
+    assert len(downloader.sessions) == 1
+    downloader.close()
+
+
+def test_not_found_is_none(server, capsys):
+    downloader = ImageDownloader()
+    contents = asyncio.run(downloader.fetch_all([f"{server}/missing.jpg", f"{server}/1.jpg"]))
+    assert contents == [None, b"/1.jpg"]
+    assert "404" in capsys.readouterr().out
+    downloader.close()
+
+
+def test_timeout_is_none(server):
+    downloader = ImageDownloader(timeout=0.2)
+    started = time.monotonic()
+    assert asyncio.run(downloader.fetch_all([f"{server}/slow.jpg"])) == [None]
+    assert time.monotonic() - started < 1.0
+    downloader.close()
@@ -0,0 +1,174 @@
+import asyncio
+import time
+
+import pytest
+
+from src.JobQueue import DONE, FAILED, PENDING, RUNNING, LeaseLostError, SQLiteJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=60)
+    yield queue
+    queue.close()
+
+
+def _status(queue, job_id):
+    return queue.conn.execute("SELECT status, attempts, available_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+
+def test_claim_complete(queue):
+    job_id = queue.enqueue({"x_username": "nasa"})
+    claimed_id, payload, attempts, lease_token = queue.claim()
+    assert (claimed_id, payload, attempts) == (job_id, {"x_username": "nasa"}, 1)
+    assert queue.claim() is None
+    queue.complete(job_id, lease_token)
+    assert queue.counts()[DONE] == 1
+
+
+def test_fail_retries_with_backoff_then_gives_up(queue):
+    job_id = queue.enqueue({"x_username": "nasa"})
+    _, _, attempts, lease_token = queue.claim()
+    assert queue.fail(job_id, lease_token, "boom", attempts, max_attempts=2, backoff_base=10.0)
+    status, _, available_at = _status(queue, job_id)
+    assert status == PENDING and available_at > time.time()
+    # Backing off: not claimable yet.
+    assert queue.claim() is None
+
+    queue.conn.execute("UPDATE jobs SET available_at = 0 WHERE id = ?", (job_id,))
+    _, _, attempts, lease_token = queue.claim()
+    assert attempts == 2
+    assert not queue.fail(job_id, lease_token, "boom", attempts, max_attempts=2)
+    assert _status(queue, job_id)[0] == FAILED
+
+
+def test_expired_lease_is_reclaimed_until_attempts_run_out(queue):
+    job_id = queue.enqueue({"x_username": "nasa"})
+    for attempt in (1, 2):
+        assert queue.claim(max_attempts=2)[2] == attempt
+        # The worker died: let the lease expire.
+        queue.conn.execute("UPDATE jobs SET lease_until = 0 WHERE id = ?", (job_id,))
+
+    assert queue.claim(max_attempts=2) is None
+    status, attempts, _ = _status(queue, job_id)
+    assert (status, attempts) == (FAILED, 2)
+
+
+def test_active_lease_is_not_reclaimed(queue):
+    job_id = queue.enqueue({"x_username": "nasa"})
+    queue.claim()
+    assert queue.claim() is None
+    assert _status(queue, job_id)[0] == RUNNING
+
+
+def test_stale_worker_cannot_finish_the_new_attempt(queue):
+    job_id = queue.enqueue({"x_username": "nasa"})
+    stale_token = queue.claim()[3]
+    queue.conn.execute("UPDATE jobs SET lease_until = 0 WHERE id = ?", (job_id,))
+    _, _, attempts, lease_token = queue.claim()
+    assert attempts == 2
+
+    for act in (
+        lambda: queue.heartbeat(job_id, stale_token),
+        lambda: queue.complete(job_id, stale_token),
+        lambda: queue.fail(job_id, stale_token, "boom", 1),
+    ):
+        with pytest.raises(LeaseLostError):
+            act()
+    assert _status(queue, job_id)[0] == RUNNING
+    queue.complete(job_id, lease_token)
+    assert _status(queue, job_id)[0] == DONE
+
+
+def test_heartbeat_extends_the_lease(queue):
+    job_id = queue.enqueue({"x_username": "nasa"})
+    lease_token = queue.claim()[3]
+    queue.conn.execute("UPDATE jobs SET lease_until = ? WHERE id = ?", (time.time() + 1, job_id))
+    queue.heartbeat(job_id, lease_token)
+    lease_until = queue.conn.execute("SELECT lease_until FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+    assert lease_until > time.time() + 30
+
+
+def _worker(tmp_path, **overrides):
+    from worker import ProfilingWorker
+
+    config = {"max_attempts": 2, "backoff_base": 0.0, "poll_interval": 0.01, "exit_when_empty": True, "scrape_only": True}
+    config.update(overrides)
+    worker = ProfilingWorker(config)
+    worker.queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.3)
+    return worker
+
+
+def test_worker_heartbeats_long_jobs(tmp_path):
+    worker = _worker(tmp_path)
+    job_id = worker.queue.enqueue({"x_username": "nasa"})
+    written = []
+
+    async def process(payload, scraped):
+        # Runs for several leases; a second consumer must not claim the job meanwhile.
+        await asyncio.sleep(1.0)
+        return ["post"]
+
+    worker._process = process
+    worker._write = lambda *args: written.append(args[0])
+    async def consume():
+        await asyncio.gather(worker._consume(), worker._consume())
+
+    asyncio.run(asyncio.wait_for(consume(), 5))
+    assert written == [job_id]
+    assert _status(worker.queue, job_id)[:2] == (DONE, 1)
+
+
+def test_worker_routes_write_errors_to_fail(tmp_path):
+    worker = _worker(tmp_path)
+    job_id = worker.queue.enqueue({"x_username": "nasa"})
+
+    async def process(payload, scraped):
+        return ["post"]
+
+    def write(*args):
+        raise OSError("disk full")
+
+    worker._process = process
+    worker._write = write
+    asyncio.run(asyncio.wait_for(worker._consume(), 5))
+    status, attempts, _ = _status(worker.queue, job_id)
+    assert (status, attempts) == (FAILED, 2)
+
+
+def test_worker_acknowledges_jobs_once_their_batch_is_committed(tmp_path):
+    from src.models import MediaPost
+    from src.Sinks import PartitionedSink
+
+    worker = _worker(tmp_path, commit_rows=3)
+    worker.sink = PartitionedSink(str(tmp_path / "dataset"), format="jsonl")
+    job_ids = [worker.queue.enqueue({"x_username": "nasa"}) for _ in range(4)]
+    done = []
+
+    async def process(payload, scraped):
+        done.append(_status(worker.queue, job_ids[0])[0])
+        return [MediaPost("tweet", "photo", "x", ["https://example.com/1.jpg"], "2024-01-01T10:00:00Z")]
+
+    worker._process = process
+    asyncio.run(asyncio.wait_for(worker._consume(), 5))
+    # The first three jobs share a commit; the fourth is committed once the queue runs dry.
+    assert done == [RUNNING, RUNNING, RUNNING, DONE]
+    assert all(_status(worker.queue, job_id)[0] == DONE for job_id in job_ids)
+    worker.sink.close()
+    parts = list((tmp_path / "dataset").rglob("*.jsonl"))
+    assert len(parts) == 1
+
+
+def test_stream_raises_when_every_platform_fails():
+    from main import ScrapeError, SocialMediaScrapper
+    from src import AsyncReplayClient
+
+    sm = SocialMediaScrapper(None, client=AsyncReplayClient())
+
+    async def scrape(**handles):
+        return await sm.scrape_all_social_media(**handles)
+
+    with pytest.raises(ScrapeError):
+        asyncio.run(scrape(x_username="@@bad"))
+    # A partial failure still returns the platforms that succeeded.
+    assert asyncio.run(scrape(x_username="@@bad", instgram_username="natgeo"))
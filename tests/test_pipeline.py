@@ -0,0 +1,47 @@
+import asyncio
+
+from src.GeminiModel import GeminiRunnerClass
+from src.Pipeline import StoryPipeline
+from src.models import MediaPost
+
+MODEL = "test-model"
+
+
+class FakeDownloader:
+    async def fetch_all(self, urls):
+        return [url.encode("utf-8") for url in urls]
+
+
+class FakePreprocessor:
+    def process(self, content):
+        return {"mime_type": "image/jpeg", "data": content}
+
+
+def test_failed_video_keeps_the_other_results():
+    gem = GeminiRunnerClass(downloader=FakeDownloader(), preprocessor=FakePreprocessor(), text_model=MODEL, image_model=MODEL)
+
+    async def describe_images(input_text, model_name, images):
+        return ["an image" for _ in images]
+
+    async def describe_video(input_text, model_name, item):
+        if item.data.endswith("bad.mp4"):
+            raise RuntimeError("upload failed")
+        await asyncio.sleep(0.01)
+        return {"content_urls": [item.data], "descriptions": ["a video"], "social_media": item.social_media}
+
+    gem.describe_images = describe_images
+    gem.describe_video = describe_video
+
+    async def stream():
+        yield "instagram", "nasa", [
+            MediaPost("Image", "photo", "instagram", ["https://example.com/1.jpg"]),
+            MediaPost("Video", "video", "instagram", ["https://example.com/bad.mp4"]),
+            MediaPost("Video", "video", "instagram", ["https://example.com/good.mp4"]),
+        ]
+
+    pipeline = StoryPipeline(gem, describe_videos=True, deduplicate=False)
+    results = {result["content_urls"][0]: result for result in asyncio.run(pipeline.run(stream(), "prompt"))}
+    assert results["https://example.com/1.jpg"]["descriptions"] == ["an image"]
+    assert results["https://example.com/good.mp4"]["descriptions"] == ["a video"]
+    assert results["https://example.com/bad.mp4"]["descriptions"] is None
+    assert "upload failed" in results["https://example.com/bad.mp4"]["error"]
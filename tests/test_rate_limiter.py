@@ -0,0 +1,60 @@
+import asyncio
+
+from src.RateLimiter import RateLimiter
+
+
+def test_cancel_while_waiting_for_token_releases_slot():
+    limiter = RateLimiter("test", rate=1, burst=1, max_concurrency=1)
+
+    async def main():
+        async with limiter:
+            pass
+        # The bucket is empty, so this acquire holds the slot while sleeping for a token.
+        waiter = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert limiter.stats()["in_flight"] == 0
+        # The slot is free again: the next call does not deadlock.
+        await asyncio.wait_for(limiter.acquire_async(), timeout=2)
+        limiter.release()
+
+    asyncio.run(main())
+
+
+def test_cancel_while_queued_for_slot_does_not_leak():
+    limiter = RateLimiter("test", max_concurrency=1)
+
+    async def main():
+        await limiter.acquire_async()
+        waiter = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limiter.release()
+        stats = limiter.stats()
+        assert (stats["in_flight"], stats["queued"]) == (0, 0)
+        await asyncio.wait_for(limiter.acquire_async(), timeout=1)
+        limiter.release()
+
+    asyncio.run(main())
+
+
+def test_concurrency_limit_is_respected():
+    limiter = RateLimiter("test", max_concurrency=2)
+    in_flight = []
+    peak = []
+
+    async def call():
+        async with limiter:
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(10)))
+
+    asyncio.run(main())
+    assert max(peak) == 2
+    assert limiter.stats()["calls"] == 10
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from src import (
+    AsyncFacebookPostScraper,
+    AsyncInstagramPostScraper,
+    AsyncLinkedInPostScraper,
+    AsyncReplayClient,
+    AsyncXScraper,
+    FacebookPostScraper,
+    InstagramPostScraper,
+    LinkedInPostScraper,
+    ReplayClient,
+    XScraper,
+)
+
+SCRAPERS = [
+    (lambda client: XScraper(None, client=client), lambda client: AsyncXScraper(None, client=client), "scrape_tweets", "scrape_tweets_batch"),
+    (
+        lambda client: InstagramPostScraper(None, client=client),
+        lambda client: AsyncInstagramPostScraper(None, client=client),
+        "scrape_profile",
+        "scrape_profiles_batch",
+    ),
+    (
+        lambda client: FacebookPostScraper(None, client=client),
+        lambda client: AsyncFacebookPostScraper(None, client=client),
+        "scrape_page_posts",
+        "scrape_pages_batch",
+    ),
+    (
+        lambda client: LinkedInPostScraper(None, "cookies", client=client),
+        lambda client: AsyncLinkedInPostScraper(None, "cookies", client=client),
+        "scrape_profile_posts",
+        "scrape_profiles_posts_batch",
+    ),
+]
+
+
+def _dicts(posts):
+    return [post.to_dict() for post in posts]
+
+
+@pytest.mark.parametrize("make_sync, make_async, scrape, batch", SCRAPERS)
+def test_sync_async_stream_and_batch_agree(make_sync, make_async, scrape, batch):
+    sync, asynchronous = make_sync(ReplayClient()), make_async(AsyncReplayClient())
+    stream = getattr(sync, f"{scrape}_stream")
+
+    posts = _dicts(getattr(sync, scrape)("nasa", None, 3))
+    assert posts
+    assert _dicts(stream("nasa", None, 3)) == posts
+
+    async def run():
+        one = _dicts(await getattr(asynchronous, scrape)("nasa", None, 3))
+        streamed = _dicts([post async for post in getattr(asynchronous, f"{scrape}_stream")("nasa", None, 3)])
+        return one, streamed
+
+    assert asyncio.run(run()) == (posts, posts)
+    results = getattr(sync, batch)(["nasa", "natgeo"], None, 3, chunk_size=1)
+    assert _dicts(results["nasa"]) == posts and results["natgeo"]
+    results = asyncio.run(getattr(asynchronous, batch)(["nasa", "natgeo"], None, 3, chunk_size=1))
+    assert _dicts(results["nasa"]) == posts and results["natgeo"]
+
+
+def test_invalid_handle_is_rejected_before_any_run():
+    client = ReplayClient()
+    with pytest.raises(ValueError):
+        XScraper(None, client=client).scrape_tweets_batch(["nasa", "@@not a handle"])
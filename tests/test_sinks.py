@@ -0,0 +1,55 @@
+import pytest
+
+from src.Sinks import PartitionedSink, iter_jsonl_table, read_table
+from src.models import MediaPost
+
+
+def _posts(days):
+    return [
+        MediaPost("tweet", "photo", "x", [f"https://example.com/{day}.jpg"], f"2024-01-{day:02d}T10:00:00Z", post_id=str(day))
+        for day in range(1, days + 1)
+    ]
+
+
+def test_jsonl_round_trip_with_capped_writers(tmp_path):
+    sink = PartitionedSink(str(tmp_path), format="jsonl", max_open_writers=3)
+    sink.write_posts(_posts(20), handle="nasa", job_id=1)
+    assert len(sink._writers) <= 3
+    sink.write_posts(_posts(20), handle="nasa", job_id=2)
+    sink.close()
+
+    rows = list(iter_jsonl_table(str(tmp_path), "posts", platform="x"))
+    assert len(rows) == 40
+    assert {row["date"] for row in rows} == {f"2024-01-{day:02d}" for day in range(1, 21)}
+
+
+def test_parquet_round_trip_with_capped_writers(tmp_path):
+    pytest.importorskip("pyarrow")
+    sink = PartitionedSink(str(tmp_path), format="parquet", row_group_size=2, max_open_writers=3)
+    for job_id in range(3):
+        sink.write_posts(_posts(20), handle="nasa", job_id=job_id)
+        assert len(sink._writers) <= 3
+    sink.close()
+
+    table = read_table(str(tmp_path), "posts")
+    assert table.num_rows == 60
+    assert sorted(set(table.column("date").to_pylist())) == [f"2024-01-{day:02d}" for day in range(1, 21)]
+
+
+def test_commit_makes_rows_readable_before_close(tmp_path):
+    pytest.importorskip("pyarrow")
+    sink = PartitionedSink(str(tmp_path), format="parquet")
+    for job_id in (6, 7):
+        sink.write_posts(_posts(3), handle="nasa", job_id=job_id)
+    assert sink.uncommitted_rows == 6
+    sink.commit()
+    assert sink.uncommitted_rows == 0
+    table = read_table(str(tmp_path), "posts")
+    assert table.num_rows == 6
+    # Both jobs share one part file per partition.
+    assert len(list((tmp_path / "posts").rglob("*.parquet"))) == 3
+
+    # The partitions are written again after the commit, into new part files.
+    sink.write_posts(_posts(3), handle="nasa", job_id=8)
+    sink.close()
+    assert sorted(read_table(str(tmp_path), "posts").column("job_id").to_pylist()) == [6, 6, 6, 7, 7, 7, 8, 8, 8]
@@ -0,0 +1,52 @@
+import asyncio
+import multiprocessing
+
+from src.StateStore import HighWaterMarkStore
+from src.models import MediaPost
+
+
+def _post(post_id, timestamp):
+    return MediaPost("tweet", "photo", "x", [f"https://example.com/{post_id}.jpg"], timestamp, post_id=post_id)
+
+
+def test_update_and_filter(tmp_path):
+    store = HighWaterMarkStore(str(tmp_path / "state.sqlite3"))
+    assert store.newer_than("x", "@NASA", "2024-01-01") == "2024-01-01"
+    store.update("x", "nasa", [_post("1", "2024-02-01T10:00:00Z"), _post("2", "2024-02-03T10:00:00Z")])
+    assert store.newer_than("x", "@NASA", "2024-01-01") == "2024-02-03"
+    posts = [_post("2", "2024-02-03T10:00:00Z"), _post("3", "2024-02-04T10:00:00Z")]
+    assert [post.post_id for post in store.filter_new("x", "nasa", posts)] == ["3"]
+
+
+def _update(path, post_id):
+    HighWaterMarkStore(path).update("x", "nasa", [_post(post_id, f"2024-02-01T10:00:{int(post_id):02d}Z")])
+
+
+def test_concurrent_processes_merge_updates(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    HighWaterMarkStore(path)
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_update, args=(path, str(i))) for i in range(8)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert sorted(HighWaterMarkStore(path).get("x", "nasa")["seen_ids"], key=int) == [str(i) for i in range(8)]
+
+
+def test_marks_advance_only_on_commit(tmp_path):
+    from main import SocialMediaScrapper
+    from src import AsyncReplayClient
+
+    store = HighWaterMarkStore(str(tmp_path / "state.sqlite3"))
+    sm = SocialMediaScrapper(None, client=AsyncReplayClient(), state_store=store)
+    scraped = []
+    first = asyncio.run(sm.scrape_all_social_media(x_username="nasa", scraped=scraped))
+    assert first and store.get("x", "nasa")["timestamp"] is None
+
+    # The consumer failed before committing: the same posts come back.
+    assert len(asyncio.run(sm.scrape_all_social_media(x_username="nasa", scraped=[]))) == len(first)
+
+    for platform, handle, posts in scraped:
+        sm.commit_scraped(platform, handle, posts)
+    assert asyncio.run(sm.scrape_all_social_media(x_username="nasa")) == []
@@ -0,0 +1,382 @@
+import time
+
+_started = time.perf_counter()
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from main import SocialMediaScrapper
+from src import (
+    ActorResultCache,
+    HighWaterMarkStore,
+    IMAGE_MEDIA_TYPES,
+    JsonlSink,
+    LeaseLostError,
+    PartitionedSink,
+    SQLiteResultStore,
+    SQLiteJobQueue,
+    configure_limits,
+    create_client,
+    enable_tracing,
+    export_json_trace,
+    export_prometheus,
+    get_tracer,
+    limiter_stats,
+    load_config,
+    span,
+    startup_timings,
+)
+
+load_config()
+
+
+class ProfilingWorker:
+    def __init__(self, config) -> None:
+        """
+        A worker process that claims profiling jobs from the queue, runs
+        scrape_all_social_media -> Gemini for each of them and writes the results to the sink.
+
+        :param config: The pool configuration (see run_pool).
+        """
+        self.config = config
+        self.queue = None
+        self.sink = None
+        self.sm = None
+        # Jobs whose rows are written to the PartitionedSink but not committed yet, acknowledged
+        # together by the next _commit().
+        self._uncommitted = []
+
+    async def run(self):
+        config = self.config
+        self.queue = SQLiteJobQueue(config["queue_path"], lease_seconds=config["lease_seconds"])
+        if config["sink_format"] == "records":
+            self.sink = JsonlSink(config["sink_path"])
+        else:
+            self.sink = PartitionedSink(config["sink_path"], format=config["sink_format"])
+        api_key = os.getenv("APIFY_API_KEY")
+        client = create_client(config["backend"], api_key, asynchronous=True, **config["replay_options"])
+        result_cache = None
+        if config["result_cache_path"]:
+            # One SQLite file for the whole pool: a profile scraped by any worker process within
+            # the TTL is served to the others without another actor run.
+            result_cache = ActorResultCache(
+                SQLiteResultStore(config["result_cache_path"]), ttl_seconds=config["result_cache_ttl"]
+            )
+        state_store = HighWaterMarkStore(config["state_path"]) if config["state_path"] else None
+        self.sm = SocialMediaScrapper(
+            api_key,
+            cookies=config["cookies"],
+            client=client,
+            platform_limits=config["platform_limits"],
+            media_types=None if config["scrape_only"] else IMAGE_MEDIA_TYPES,
+            result_cache=result_cache,
+            state_store=state_store,
+        )
+        print(f"Worker ready in {time.perf_counter() - _started:.3f}s: {json.dumps(startup_timings())}")
+        committer = asyncio.ensure_future(self._commit_periodically()) if isinstance(self.sink, PartitionedSink) else None
+        try:
+            await asyncio.gather(*(self._consume() for _ in range(config["concurrency"])))
+        finally:
+            if committer is not None:
+                committer.cancel()
+            self._commit()
+            self.sink.close()
+            self.queue.close()
+            print(f"Rate limiter queue waits: {json.dumps(limiter_stats())}")
+            if result_cache is not None:
+                print(f"Actor result cache: {json.dumps(result_cache.stats())}")
+                result_cache.store.close()
+            if state_store is not None:
+                state_store.close()
+            if get_tracer() is not None:
+                self._export_trace()
+
+    async def _consume(self):
+        while True:
+            job = self.queue.claim(max_attempts=self.config["max_attempts"])
+            if job is None:
+                # Idle: acknowledge the jobs waiting for a commit rather than keep them running.
+                self._commit()
+                counts = self.queue.counts()
+                if self.config["exit_when_empty"] and not counts["pending"] and not counts["running"]:
+                    return
+                await asyncio.sleep(self.config["poll_interval"])
+                continue
+
+            job_id, payload, attempts, lease_token = job
+            started = time.time()
+            scraped = []
+            try:
+                with span("job", job_id=job_id, attempt=attempts):
+                    result = await self._with_heartbeat(job_id, lease_token, self._process(payload, scraped))
+                self._write(job_id, payload, attempts, started, result)
+            except LeaseLostError as e:
+                print(f"Job {job_id} attempt {attempts} abandoned: {e}")
+                continue
+            except Exception as e:
+                self._fail(job_id, lease_token, attempts, e)
+                continue
+
+            if isinstance(self.sink, PartitionedSink):
+                # Partitioned rows are committed in batches (see _commit) to keep part files large.
+                self._uncommitted.append((job_id, lease_token, attempts, scraped))
+                if self.sink.uncommitted_rows >= self.config["commit_rows"]:
+                    self._commit()
+            else:
+                self._acknowledge(job_id, lease_token, attempts, scraped)
+
+    def _acknowledge(self, job_id, lease_token, attempts, scraped):
+        # Advance the high-water marks only once the results are stored, so a failed or
+        # retried job scrapes the same posts again.
+        for platform, handle, posts in scraped:
+            self.sm.commit_scraped(platform, handle, posts)
+        try:
+            self.queue.complete(job_id, lease_token)
+        except LeaseLostError as e:
+            print(f"Job {job_id} attempt {attempts} finished after losing its lease: {e}")
+
+    def _commit(self):
+        """
+        Commits the PartitionedSink and acknowledges every job whose rows it made durable. Called
+        once commit_rows rows are waiting, every commit_seconds, when the worker is idle and at
+        shutdown, so that each commit covers many jobs.
+        """
+        batch, self._uncommitted = self._uncommitted, []
+        if not batch:
+            return
+        try:
+            self.sink.commit()
+        except Exception as e:
+            for job_id, lease_token, attempts, _ in batch:
+                self._fail(job_id, lease_token, attempts, e)
+            return
+        for entry in batch:
+            self._acknowledge(*entry)
+
+    async def _commit_periodically(self):
+        # Bounds how long a written job waits for its acknowledgement (and holds its lease).
+        while True:
+            await asyncio.sleep(self.config["commit_seconds"])
+            self._commit()
+
+    async def _with_heartbeat(self, job_id, lease_token, coro):
+        """
+        Runs a job's coroutine while renewing its lease every third of lease_seconds, so a long
+        job is not claimed again by another worker. If the lease is lost anyway (e.g. the loop
+        stalled past the lease), the job is cancelled and LeaseLostError raised.
+        """
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(self.queue.lease_seconds / 3)
+                self.queue.heartbeat(job_id, lease_token)
+
+        task = asyncio.ensure_future(coro)
+        beat = asyncio.ensure_future(heartbeat())
+        try:
+            await asyncio.wait({task, beat}, return_when=asyncio.FIRST_COMPLETED)
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                beat.result()
+            return task.result()
+        finally:
+            task.cancel()
+            beat.cancel()
+
+    def _fail(self, job_id, lease_token, attempts, error):
+        try:
+            retry = self.queue.fail(
+                job_id,
+                lease_token,
+                error,
+                attempts,
+                max_attempts=self.config["max_attempts"],
+                backoff_base=self.config["backoff_base"],
+            )
+        except LeaseLostError as e:
+            print(f"Job {job_id} attempt {attempts} failed after losing its lease ({e}): {error}")
+            return
+        print(f"Job {job_id} attempt {attempts} failed ({'retrying' if retry else 'giving up'}): {error}")
+
+    def _write(self, job_id, payload, attempts, started, result):
+        if isinstance(self.sink, JsonlSink):
+            self.sink.write({
+                "job_id": job_id,
+                "job": payload,
+                "attempts": attempts,
+                "seconds": time.time() - started,
+                "result": result,
+            })
+        else:
+            if self.config["scrape_only"]:
+                self.sink.write_posts(result, job_id=job_id)
+            else:
+                self.sink.write_descriptions(result, job_id=job_id)
+
+    def _export_trace(self):
+        trace_dir = self.config["trace_dir"]
+        os.makedirs(trace_dir, exist_ok=True)
+        export_json_trace(os.path.join(trace_dir, f"trace-{os.getpid()}.json"))
+        export_prometheus(os.path.join(trace_dir, f"metrics-{os.getpid()}.prom"))
+
+    async def _process(self, payload, scraped):
+        if self.config["scrape_only"]:
+            return await self.sm.scrape_all_social_media(**payload, scraped=scraped)
+        return await self.sm.get_stories_from_social_media(payload, scraped=scraped)
+
+
+def _worker_main(config):
+    if config["rate_limits"]:
+        configure_limits(config["rate_limits"])
+    if config["trace_dir"]:
+        enable_tracing()
+    if not config["scrape_only"]:
+        # Build the Gemini model clients once, before the first job needs them.
+        from src import preload_models
+        preload_models()
+    asyncio.run(ProfilingWorker(config).run())
+
+
+def run_pool(
+    queue_path="jobs.sqlite3",
+    sink_path="results.jsonl",
+    sink_format="records",
+    processes=None,
+    concurrency=8,
+    platform_limits=None,
+    rate_limits=None,
+    max_attempts=3,
+    backoff_base=2.0,
+    lease_seconds=900,
+    poll_interval=1.0,
+    exit_when_empty=True,
+    scrape_only=False,
+    backend="apify",
+    replay_options=None,
+    cookies=None,
+    trace_dir=None,
+    result_cache_path=None,
+    result_cache_ttl=600,
+    state_path=None,
+    commit_rows=10000,
+    commit_seconds=60.0,
+):
+    """
+    Runs a pool of worker processes over the job queue until it is drained.
+
+    :param queue_path: The SQLite job queue.
+    :param sink_path: The JSONL file results are appended to, or the dataset directory for
+                      the "parquet" and "jsonl" formats.
+    :param sink_format: "records" for one JSONL record per job, or "parquet"/"jsonl" for posts
+                        and descriptions partitioned by platform and date (see PartitionedSink).
+    :param processes: The number of worker processes (defaults to the number of cores).
+    :param concurrency: The number of jobs each worker process runs at once.
+    :param platform_limits: Concurrent actor calls allowed per platform, per worker process.
+    :param rate_limits: Per-backend RateLimiter settings, per worker process (see configure_limits).
+    :param max_attempts: The number of attempts per job before it is marked failed.
+    :param backoff_base: The base, in seconds, of the exponential backoff between attempts.
+    :param lease_seconds: How long a claimed job stays reserved before another worker may retry it.
+    :param poll_interval: Seconds to wait before polling an empty queue again.
+    :param exit_when_empty: Whether workers exit once no job is pending or running.
+    :param scrape_only: Whether to skip the Gemini stage and write the scraped posts.
+    :param backend: "apify" or "replay".
+    :param replay_options: Keyword arguments for the replay backend.
+    :param cookies: LinkedIn cookies; LinkedIn handles are skipped without them.
+    :param trace_dir: A directory each worker process writes its spans (trace-<pid>.json, Chrome
+                      trace format) and metrics (metrics-<pid>.prom, Prometheus text format) to
+                      when it exits; tracing is off when None.
+    :param result_cache_path: A SQLite file caching actor results by actor and input, shared by
+                              the worker processes; no caching when None.
+    :param result_cache_ttl: How long, in seconds, a cached actor result is served.
+    :param state_path: A SQLite HighWaterMarkStore shared by the worker processes, to scrape
+                       only posts newer than each handle's last completed job; off when None.
+    :param commit_rows: For the "parquet" and "jsonl" sinks, the number of written rows after which
+                        the sink is committed and the jobs that wrote them are acknowledged.
+    :param commit_seconds: The longest a written job waits for that commit; it must stay below
+                           lease_seconds, as the waiting job keeps its lease.
+    """
+    if commit_seconds >= lease_seconds:
+        raise ValueError("commit_seconds must be less than lease_seconds.")
+    config = {
+        "queue_path": queue_path,
+        "sink_path": sink_path,
+        "sink_format": sink_format,
+        "concurrency": concurrency,
+        "platform_limits": platform_limits or {},
+        "rate_limits": rate_limits or {},
+        "max_attempts": max_attempts,
+        "backoff_base": backoff_base,
+        "lease_seconds": lease_seconds,
+        "poll_interval": poll_interval,
+        "exit_when_empty": exit_when_empty,
+        "scrape_only": scrape_only,
+        "backend": backend,
+        "replay_options": replay_options or {},
+        "cookies": cookies,
+        "trace_dir": trace_dir,
+        "result_cache_path": result_cache_path,
+        "result_cache_ttl": result_cache_ttl,
+        "state_path": state_path,
+        "commit_rows": commit_rows,
+        "commit_seconds": commit_seconds,
+    }
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_worker_main, args=(config,), name=f"profiling-worker-{i}")
+        for i in range(processes or os.cpu_count() or 1)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run profiling jobs from a local queue with a pool of worker processes.")
+    parser.add_argument("--queue", default="jobs.sqlite3", help="The SQLite job queue.")
+    parser.add_argument("--enqueue", help="A JSONL file of handle dicts to add to the queue before starting.")
+    parser.add_argument("--sink", default="results.jsonl", help="The JSONL file results are appended to, or the dataset directory.")
+    parser.add_argument("--sink-format", default="records", choices=["records", "parquet", "jsonl"])
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--platform-limits", type=json.loads, default={}, help='e.g. \'{"x": 2, "linkedin": 1}\'')
+    parser.add_argument("--rate-limits", type=json.loads, default={}, help='e.g. \'{"gemini-1.5-flash": {"rate": 1, "max_concurrency": 4}}\'')
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--scrape-only", action="store_true")
+    parser.add_argument("--backend", default=os.getenv("SCRAPER_BACKEND", "apify"), choices=["apify", "replay"])
+    parser.add_argument("--trace-dir", help="Write per-process JSON traces and Prometheus metrics to this directory.")
+    parser.add_argument("--result-cache", help="A SQLite file caching actor results by actor and input.")
+    parser.add_argument("--result-cache-ttl", type=float, default=600, help="Seconds a cached actor result is served.")
+    parser.add_argument("--state", help="A SQLite file of per-handle high-water marks for incremental scraping.")
+    parser.add_argument("--commit-rows", type=int, default=10000, help="Rows written to a partitioned sink per commit.")
+    parser.add_argument("--commit-seconds", type=float, default=60.0, help="Seconds between commits of a partitioned sink.")
+    args = parser.parse_args()
+
+    if args.enqueue:
+        queue = SQLiteJobQueue(args.queue)
+        print(f"Enqueued {len(queue.enqueue_file(args.enqueue))} jobs")
+        queue.close()
+
+    run_pool(
+        queue_path=args.queue,
+        sink_path=args.sink,
+        sink_format=args.sink_format,
+        processes=args.processes,
+        concurrency=args.concurrency,
+        platform_limits=args.platform_limits,
+        rate_limits=args.rate_limits,
+        max_attempts=args.max_attempts,
+        scrape_only=args.scrape_only,
+        backend=args.backend,
+        trace_dir=args.trace_dir,
+        result_cache_path=args.result_cache,
+        result_cache_ttl=args.result_cache_ttl,
+        state_path=args.state,
+        commit_rows=args.commit_rows,
+        commit_seconds=args.commit_seconds,
+    )
+    queue = SQLiteJobQueue(args.queue)
+    print(queue.counts())
+    queue.close()